@@ -1,12 +1,36 @@
-from flask import Flask, render_template, jsonify, request, session, url_for
+from flask import Flask, render_template, jsonify, request, session, url_for, g
 import pymysql
 import os
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import hashlib
 import secrets
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+import atexit
+import logging
+import threading
+import time
+import functools
+import posixpath
+from catalog_cache import CatalogCache
+from presign import PresignedUrlCache, presigner_from_client
+from s3_listing import ParallelLister, parse_sources, split_key
+from feed import page_indices, page_indices_skipping, encode_cursor, decode_cursor
+from catalog_sync import CatalogChangeWatcher, CatalogSync, CatalogSyncWorker
+from db_pool import ConnectionPool, PoolTimeout
+from db_routing import ReplicaRouter, parse_hosts
+from serialization import FastJSONProvider, compress_response, compact_reels, encoder_name
+from media import send_local_file
+from static_assets import AssetManifest
+from local_index import LocalReelIndex, scan_directory
+from view_tracking import ViewBuffer
+from reel_ids import ReelIdRegistry, is_provisional
+from seen_reels import SeenReels
+from search_index import SearchIndex
+from warmup import WarmUp
+import metrics
+import structured_logging
+from structured_logging import clean_request_id, request_id_var
+from werkzeug.security import safe_join
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,221 +38,1151 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', secrets.token_hex(16))
 
+# Logging Configuration
+LOGGING_CONFIG = {
+    'level': os.getenv('LOG_LEVEL', 'INFO').upper(),
+    'format': os.getenv('LOG_FORMAT', 'json'),  # 'json' or 'text'
+    'queue_size': int(os.getenv('LOG_QUEUE_SIZE', '10000')),  # Records buffered before new ones are dropped
+    'rate_limit': int(os.getenv('LOG_RATE_LIMIT', '20')),  # Records per second per event type (0 = unlimited)
+    # event=N pairs: log one in N of those events (errors are always logged)
+    'sample_rates': {
+        name: int(rate)
+        for name, rate in (
+            pair.split('=', 1) for pair in os.getenv('LOG_SAMPLE_RATES', 'request=100,presign=100').split(',') if '=' in pair
+        )
+    }
+}
+
+structured_logging.setup_logging(
+    level=LOGGING_CONFIG['level'],
+    fmt=LOGGING_CONFIG['format'],
+    queue_size=LOGGING_CONFIG['queue_size'],
+    sample_rates=LOGGING_CONFIG['sample_rates'],
+    rate_limit=LOGGING_CONFIG['rate_limit']
+)
+logger = logging.getLogger('reels')
+
+# Hot-path metrics, exposed on /metrics
+REQUEST_SECONDS = metrics.Histogram('http_request_duration_seconds', 'Request latency by route', ('route', 'method'))
+REQUESTS_TOTAL = metrics.Counter('http_requests_total', 'Requests by route, method and status', ('route', 'method', 'status'))
+S3_CALL_SECONDS = metrics.Histogram('s3_call_duration_seconds', 'S3 API call latency by operation', ('operation',))
+S3_CALL_ERRORS = metrics.Counter('s3_call_errors_total', 'Failed S3 API calls by operation', ('operation',))
+DB_CHECKOUT_SECONDS = metrics.Histogram('db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled MySQL connection')
+DB_QUERY_SECONDS = metrics.Histogram('db_query_duration_seconds', 'MySQL statement latency by statement type', ('statement',))
+S3_LIST_ERRORS = metrics.Counter('s3_list_source_errors_total', 'S3 listing failures by configured source', ('source',))
+CATALOG_FALLBACKS = metrics.Counter('catalog_fallbacks_total', 'Feed requests that fell through an empty or failing catalog source', ('source',))
+
+class TimedCursor(pymysql.cursors.DictCursor):
+    """DictCursor that records the duration of every statement"""
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, query.split(None, 1)[0].upper())
+
 # MySQL Configuration
 MYSQL_CONFIG = {
     'host': os.getenv('MYSQL_HOST', 'localhost'),
+    'port': int(os.getenv('MYSQL_PORT', '3306')),
     'user': os.getenv('MYSQL_USER', 'root'),
     'password': os.getenv('MYSQL_PASSWORD', ''),
     'database': os.getenv('MYSQL_DB', 'reels_db'),
-    'cursorclass': pymysql.cursors.DictCursor,
+    'cursorclass': TimedCursor,
     'autocommit': False
 }
 
+# MySQL connection pool Configuration
+DB_POOL_CONFIG = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+    'max_lifetime': int(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),  # Seconds before a connection is recycled
+    'checkout_timeout': float(os.getenv('DB_POOL_TIMEOUT', '5')),  # Seconds to wait for a free connection
+    'pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+}
+
+# MySQL read replica Configuration (reads go to the primary when none are set)
+DB_ROUTING_CONFIG = {
+    'replicas': parse_hosts(os.getenv('MYSQL_REPLICA_HOSTS', ''), MYSQL_CONFIG['port']),  # host[:port],...
+    'health_interval': float(os.getenv('DB_REPLICA_HEALTH_INTERVAL', '5')),  # Seconds between replica health checks
+    'max_lag': float(os.getenv('DB_REPLICA_MAX_LAG', '0')),  # Seconds of replication lag before a replica is skipped (0 = no check)
+    'read_your_writes': float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'))  # Seconds a session reads from the primary after writing
+}
+
 # S3 Configuration
 S3_CONFIG = {
     'bucket_name': os.getenv('S3_BUCKET_NAME', ''),
     'region': os.getenv('S3_REGION', 'us-east-1'),
     'folder_prefix': os.getenv('S3_REELS_FOLDER', 'reels/'),
     'use_presigned_urls': os.getenv('S3_USE_PRESIGNED_URLS', 'false').lower() == 'true',
-    'presigned_url_expiry': int(os.getenv('S3_PRESIGNED_URL_EXPIRY', '3600'))  # Default 1 hour
+    'presigned_url_expiry': int(os.getenv('S3_PRESIGNED_URL_EXPIRY', '3600')),  # Default 1 hour
+    'presigned_url_safety_margin': int(os.getenv('S3_PRESIGNED_URL_SAFETY_MARGIN', '300')),  # Re-sign 5 min before expiry
+    'presigned_url_cache_size': int(os.getenv('S3_PRESIGNED_URL_CACHE_SIZE', '10000')),
+    'posters_prefix': os.getenv('S3_POSTERS_FOLDER', 'posters/'),  # Written by video_metadata.py
+    'hls_prefix': os.getenv('S3_HLS_FOLDER', 'hls/'),  # Written by hls_packaging.py
+    'list_concurrency': int(os.getenv('S3_LIST_CONCURRENCY', '8')),  # Sources/shards listed at once
+    'list_shard_depth': int(os.getenv('S3_LIST_SHARD_DEPTH', '0'))  # Sub-prefix levels listed as separate shards
 }
+# Comma-separated prefixes and/or s3://bucket/prefix entries; defaults to S3_REELS_FOLDER
+S3_CONFIG['sources'] = parse_sources(os.getenv('S3_SOURCES', ''), S3_CONFIG['bucket_name'], S3_CONFIG['folder_prefix'])
+
+# Catalog cache Configuration
+CATALOG_CONFIG = {
+    'ttl': int(os.getenv('CATALOG_CACHE_TTL', '60')),  # Seconds before a background refresh
+    'source': os.getenv('CATALOG_SOURCE', 'live').lower(),  # 'live' (S3/local listing) or 'db' (synced reels table)
+    'sync_interval': int(os.getenv('CATALOG_SYNC_INTERVAL', '0')),  # Seconds between background syncs, 0 = off
+    'change_check_interval': float(os.getenv('CATALOG_CHANGE_CHECK_INTERVAL', '5')),  # Seconds between reels table change checks, 0 = off
+    'local_poll_interval': float(os.getenv('LOCAL_INDEX_POLL_INTERVAL', '2'))  # static/reels mtime polling without watchdog
+}
+
+# Feed pagination Configuration
+FEED_CONFIG = {
+    'page_size': int(os.getenv('FEED_PAGE_SIZE', '10')),
+    'max_page_size': int(os.getenv('FEED_MAX_PAGE_SIZE', '100'))
+}
+
+# Title search Configuration
+SEARCH_CONFIG = {
+    'cache_size': int(os.getenv('SEARCH_CACHE_SIZE', '256')),  # queries whose ranked results are kept
+    'cache_depth': int(os.getenv('SEARCH_CACHE_DEPTH', '200'))  # ranked results kept per query
+}
+
+# Startup warm-up Configuration
+WARMUP_CONFIG = {
+    'enabled': os.getenv('WARMUP_ENABLED', 'true').lower() == 'true',
+    # Reels whose video/poster URLs are signed before the process reports ready
+    'presign_reels': int(os.getenv('WARMUP_PRESIGN_REELS', str(S3_CONFIG['presigned_url_cache_size'] // 2)))
+}
+
+# View tracking Configuration
+VIEWS_CONFIG = {
+    'flush_interval': float(os.getenv('VIEWS_FLUSH_INTERVAL', '5')),  # Seconds between write-behind flushes
+    'max_pending': int(os.getenv('VIEWS_MAX_PENDING', '1000'))  # Pending view events that trigger an early flush
+}
+
+# Seen reels Configuration (logged-in users' feeds skip reels they have watched)
+SEEN_CONFIG = {
+    'cache_users': int(os.getenv('SEEN_CACHE_USERS', '1000')),  # Users whose seen bitmaps are kept in memory
+    'flush_interval': float(os.getenv('SEEN_FLUSH_INTERVAL', '5')),  # Seconds between write-behind flushes
+    'max_scan': int(os.getenv('SEEN_MAX_SCAN', '500'))  # Feed positions tested per page before seen reels are served again
+}
+
+# API response serialization Configuration
+JSON_CONFIG = {
+    'encoder': os.getenv('JSON_ENCODER', 'auto').lower(),  # 'auto' (orjson if installed) or 'stdlib'
+    'compression': os.getenv('API_COMPRESSION', 'true').lower() == 'true',
+    'compression_min_size': int(os.getenv('API_COMPRESSION_MIN_SIZE', '1024')),  # Bytes
+    'compression_level': int(os.getenv('API_COMPRESSION_LEVEL', '6'))
+}
+
+if JSON_CONFIG['encoder'] != 'stdlib':
+    app.json = FastJSONProvider(app)
+
+# Local media serving Configuration
+MEDIA_CONFIG = {
+    'max_age': int(os.getenv('LOCAL_MEDIA_MAX_AGE', '31536000')),  # Cache lifetime for versioned URLs (1 year)
+    'chunk_size': int(os.getenv('LOCAL_MEDIA_CHUNK_SIZE', str(256 * 1024)))
+}
+
+# Fingerprinted CSS/JS Configuration (built by static_assets.py)
+ASSET_CONFIG = {
+    'build_dir': os.getenv('STATIC_ASSETS_DIR', os.path.join(app.static_folder, 'dist')),
+    'max_age': int(os.getenv('STATIC_ASSETS_MAX_AGE', '31536000'))  # Cache lifetime of fingerprinted files (1 year)
+}
+
+def instrument_s3_client(client):
+    """Record the latency and failures of every S3 API call made through ``client``"""
+    def before_call(model, context, **kwargs):
+        context['metrics_operation'] = model.name
+        context['metrics_started'] = time.perf_counter()
+
+    def after_call(http_response, model, context, **kwargs):
+        S3_CALL_SECONDS.observe(time.perf_counter() - context['metrics_started'], model.name)
+        if http_response.status_code >= 300:
+            S3_CALL_ERRORS.inc(model.name)
+
+    def after_call_error(context, **kwargs):
+        operation = context.get('metrics_operation', 'unknown')
+        S3_CALL_SECONDS.observe(time.perf_counter() - context.get('metrics_started', time.perf_counter()), operation)
+        S3_CALL_ERRORS.inc(operation)
+
+    client.meta.events.register('before-call.s3', before_call)
+    client.meta.events.register('after-call.s3', after_call)
+    client.meta.events.register('after-call-error.s3', after_call_error)
 
 # Initialize S3 client
-s3_client = None
-if S3_CONFIG['bucket_name']:
+def create_s3_client():
+    """Create the S3 client, or return None if S3 is not configured"""
+    if not S3_CONFIG['bucket_name']:
+        return None
     try:
-        s3_client = boto3.client(
+        # boto3/botocore are a large share of import time, so they are only loaded here
+        import boto3
+        from botocore.config import Config as BotoConfig
+        client = boto3.client(
             's3',
             region_name=S3_CONFIG['region'],
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            # Room for every concurrent listing task plus request-time calls
+            config=BotoConfig(max_pool_connections=max(10, S3_CONFIG['list_concurrency'] + 2))
         )
+        instrument_s3_client(client)
+        return client
     except Exception as e:
-        print(f"Warning: Could not initialize S3 client: {e}")
-        s3_client = None
+        logger.warning("Could not initialize S3 client: %s", e)
+        return None
+
+s3_client = None  # Built by get_s3_client() on first use
+s3_client_created = False
+s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    """The shared S3 client, created on first use (None if S3 is not configured)"""
+    global s3_client, s3_client_created
+    if not s3_client_created:
+        with s3_client_lock:
+            if not s3_client_created:
+                s3_client = create_s3_client()
+                s3_client_created = True
+    return s3_client
 
-def get_db_connection():
-    """Create and return a MySQL database connection"""
+def get_db_connection(host=None, port=None):
+    """Create and return a MySQL database connection (to the primary unless ``host`` is given)"""
     try:
-        return pymysql.connect(**MYSQL_CONFIG)
+        if host is None:
+            return pymysql.connect(**MYSQL_CONFIG)
+        return pymysql.connect(**dict(MYSQL_CONFIG, host=host, port=port or MYSQL_CONFIG['port']))
     except pymysql.Error as e:
         error_code, error_msg = e.args
         if error_code == 1045:
-            print(f"MySQL Authentication Error: {error_msg}")
-            print(f"Attempted connection with user: {MYSQL_CONFIG['user']}")
-            print("Please check your MySQL credentials in .env file:")
-            print(f"  MYSQL_USER={MYSQL_CONFIG['user']}")
-            print(f"  MYSQL_PASSWORD={'*' * len(MYSQL_CONFIG['password']) if MYSQL_CONFIG['password'] else '(empty)'}")
-            print("\nIf using Docker, ensure you're using the correct user:")
-            print("  MYSQL_USER=reels_user (not root)")
-            print("  MYSQL_PASSWORD=reels_password")
+            logger.error(
+                "MySQL authentication failed for user %s: %s. Check MYSQL_USER/MYSQL_PASSWORD in .env "
+                "(with Docker, use MYSQL_USER=reels_user, not root)",
+                MYSQL_CONFIG['user'], error_msg,
+                extra={'event': 'mysql_auth_error', 'mysql_user': MYSQL_CONFIG['user'],
+                       'password_set': bool(MYSQL_CONFIG['password'])}
+            )
         raise
 
+# Shared pool used by request handlers; get_db_connection() opens its connections
+db_pool = ConnectionPool(
+    get_db_connection,
+    min_size=DB_POOL_CONFIG['min_size'],
+    max_size=DB_POOL_CONFIG['max_size'],
+    max_lifetime=DB_POOL_CONFIG['max_lifetime'],
+    checkout_timeout=DB_POOL_CONFIG['checkout_timeout'],
+    pre_ping=DB_POOL_CONFIG['pre_ping'],
+    on_checkout=DB_CHECKOUT_SECONDS.observe
+)
+
+# Read-only queries go to MYSQL_REPLICA_HOSTS while they pass health checks
+db_router = ReplicaRouter(
+    db_pool,
+    [
+        (
+            f'{host}:{port}',
+            ConnectionPool(
+                functools.partial(get_db_connection, host, port),
+                min_size=0,
+                max_size=DB_POOL_CONFIG['max_size'],
+                max_lifetime=DB_POOL_CONFIG['max_lifetime'],
+                checkout_timeout=DB_POOL_CONFIG['checkout_timeout'],
+                pre_ping=DB_POOL_CONFIG['pre_ping'],
+                on_checkout=DB_CHECKOUT_SECONDS.observe
+            )
+        )
+        for host, port in DB_ROUTING_CONFIG['replicas']
+    ],
+    health_interval=DB_ROUTING_CONFIG['health_interval'],
+    max_lag=DB_ROUTING_CONFIG['max_lag']
+)
+db_router.start()
+
+def db_read_one(query, args=()):
+    """Run a read-only query for a request and return its first row
+
+    It runs on a replica, unless this session wrote within the last
+    DB_READ_YOUR_WRITES_SECONDS: replicas may not have applied that write
+    yet, so those reads go to the primary.
+    """
+    def run(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(query, args)
+            return cursor.fetchone()
+    return db_router.read(run, read_only=time.time() >= session.get('db_primary_until', 0))
+
+def db_write():
+    """Primary connection for a request that writes; pins the session's reads to the primary for a while"""
+    if db_router.replicas:
+        session['db_primary_until'] = time.time() + DB_ROUTING_CONFIG['read_your_writes']
+    return db_router.connection()
+
+# Per-reel view counts are buffered in memory and written to reel_views in batches
+view_buffer = ViewBuffer(
+    db_pool.connection,
+    max_pending=VIEWS_CONFIG['max_pending'],
+    flush_interval=VIEWS_CONFIG['flush_interval']
+)
+view_buffer.start()
+atexit.register(view_buffer.close)
+
+# Which reels each logged-in user has watched, as bitmaps over reel IDs
+seen_reels = SeenReels(
+    db_pool.connection,
+    max_users=SEEN_CONFIG['cache_users'],
+    flush_interval=SEEN_CONFIG['flush_interval']
+)
+seen_reels.start()
+atexit.register(seen_reels.close)
+
+def reel_ids_assigned(source):
+    """Rebuild a live catalog once the reels it was holding back have IDs"""
+    if source == 'S3':
+        s3_catalog.invalidate()
+    else:
+        local_index.invalidate()
+
+# Live catalogs take their reel IDs from the reels table, so IDs do not
+# shift when the bucket or static/reels changes. New keys are registered in
+# the background; until then their reels are left out of the feed.
+reel_ids = ReelIdRegistry(db_pool.connection, on_assigned=reel_ids_assigned)
+reel_ids.start()
+
+def prefill_db_pool():
+    """Open the minimum number of pooled connections ahead of the first request"""
+    try:
+        db_pool.prefill()
+    except pymysql.Error as e:
+        logger.warning("Could not prefill MySQL connection pool: %s", e)
+
+if DB_POOL_CONFIG['min_size'] > 0:
+    threading.Thread(target=prefill_db_pool, name='db-pool-prefill', daemon=True).start()
+
+@app.before_request
+def start_request():
+    """Start the request timer and assign the ID that tags this request's log lines"""
+    g.request_started = time.perf_counter()
+    g.request_id = clean_request_id(request.headers.get('X-Request-ID')) or secrets.token_hex(8)
+    g.request_id_token = request_id_var.set(g.request_id)
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request, record its latency and write the (sampled) access log line"""
+    started = g.get('request_started')
+    if started is not None:
+        duration = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(duration, route, request.method)
+        REQUESTS_TOTAL.inc(route, request.method, str(response.status_code))
+        logger.log(
+            logging.ERROR if response.status_code >= 500 else logging.INFO,
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={'event': 'request', 'route': route, 'status': response.status_code,
+                   'duration_ms': round(duration * 1000, 2)}
+        )
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.teardown_request
+def end_request(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
+
+@app.after_request
+def compress_api_response(response):
+    """gzip/brotli-compress API responses and the page for clients that accept it"""
+    if JSON_CONFIG['compression'] and (request.path.startswith('/api/') or request.endpoint == 'index'):
+        compress_response(
+            response,
+            request.accept_encodings,
+            min_size=JSON_CONFIG['compression_min_size'],
+            level=JSON_CONFIG['compression_level']
+        )
+    return response
+
+# Built CSS/JS; templates link them through asset_url()
+assets = AssetManifest(app.static_folder, ASSET_CONFIG['build_dir']).load()
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a CSS/JS file: its fingerprinted build if there is one, else the file under /static"""
+    return assets.url(filename) or url_for('static', filename=filename)
+
 @app.route('/')
 def index():
     """Main page to display reels"""
-    return render_template('index.html')
+    response = app.make_response(render_template('index.html'))
+    # The page names the current asset builds, so it is revalidated on every
+    # visit; the assets themselves are cached for good
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
-def get_s3_video_url(filename):
-    """Generate S3 URL for a video file (presigned or public)"""
-    if not s3_client or not S3_CONFIG['bucket_name']:
-        return None
-    
-    # Construct S3 key (path in bucket)
-    s3_key = f"{S3_CONFIG['folder_prefix'].rstrip('/')}/{filename}"
+@app.route('/assets/<path:filename>', methods=['GET'])
+def serve_asset(filename):
+    """Serve a fingerprinted CSS/JS build, precompressed, with immutable caching"""
+    response = assets.send(request, filename, max_age=ASSET_CONFIG['max_age'])
+    if response is None:
+        return jsonify({
+            'success': False,
+            'error': 'Asset not found'
+        }), 404
+    return response
+
+def get_s3_key(filename):
+    """Construct S3 key (path in bucket) for a video file"""
+    return f"{S3_CONFIG['folder_prefix'].rstrip('/')}/{filename}"
+
+def get_s3_presigner(bucket):
+    """Bulk signer for a bucket (None if it cannot be used), built on first use"""
+    if bucket not in s3_presigners:
+        s3_presigners[bucket] = presigner_from_client(get_s3_client(), bucket, S3_CONFIG['region'])
+    return s3_presigners[bucket]
+
+def presign_s3_keys(s3_keys, expires_in):
+    """Presign a batch of S3 keys, grouped by bucket, using the bulk signer when available"""
+    logger.debug("Generated presigned URLs", extra={'event': 'presign', 'count': len(s3_keys)})
+    by_bucket = {}
+    for s3_key in s3_keys:
+        bucket, key = split_key(s3_key, S3_CONFIG['bucket_name'])
+        by_bucket.setdefault(bucket, []).append((s3_key, key))
     
-    try:
-        if S3_CONFIG['use_presigned_urls']:
-            # Generate presigned URL (temporary, secure)
-            url = s3_client.generate_presigned_url(
+    urls = {}
+    for bucket, keys in by_bucket.items():
+        presigner = get_s3_presigner(bucket)
+        if presigner is not None:
+            signed = presigner.presign_many([key for _, key in keys], expires_in)
+            urls.update((s3_key, signed[key]) for s3_key, key in keys)
+            continue
+        for s3_key, key in keys:
+            urls[s3_key] = get_s3_client().generate_presigned_url(
                 'get_object',
                 Params={
-                    'Bucket': S3_CONFIG['bucket_name'],
-                    'Key': s3_key
+                    'Bucket': bucket,
+                    'Key': key
                 },
-                ExpiresIn=S3_CONFIG['presigned_url_expiry']
+                ExpiresIn=expires_in
             )
-            print(f"Generated presigned URL for {filename}")
-            return url
+    return urls
+
+# Presigned URLs are reused until shortly before they expire
+s3_presigners = {}  # bucket -> SigV4Presigner or None
+presigned_url_cache = PresignedUrlCache(
+    presign_s3_keys,
+    expires_in=S3_CONFIG['presigned_url_expiry'],
+    safety_margin=S3_CONFIG['presigned_url_safety_margin'],
+    max_size=S3_CONFIG['presigned_url_cache_size']
+)
+
+def get_s3_video_urls(s3_keys):
+    """Generate S3 URLs for many objects at once (presigned or public)
+
+    Returns a dict of S3 key -> URL; keys whose URL could not be
+    generated are left out.
+    """
+    if not get_s3_client():
+        return {}
+    from botocore.exceptions import ClientError
+    
+    try:
+        if S3_CONFIG['use_presigned_urls']:
+            # Presigned URLs (temporary, secure), served from cache where possible
+            return presigned_url_cache.get_many(list(s3_keys))
         else:
-            # Generate public URL (if bucket is public)
-            url = f"https://{S3_CONFIG['bucket_name']}.s3.{S3_CONFIG['region']}.amazonaws.com/{s3_key}"
-            print(f"Generated public URL for {filename}")
-            return url
+            # Public URLs (if bucket is public)
+            urls = {}
+            for s3_key in s3_keys:
+                bucket, key = split_key(s3_key, S3_CONFIG['bucket_name'])
+                urls[s3_key] = f"https://{bucket}.s3.{S3_CONFIG['region']}.amazonaws.com/{key}"
+            return urls
     except ClientError as e:
         error_code = e.response.get('Error', {}).get('Code', 'Unknown')
         error_msg = e.response.get('Error', {}).get('Message', str(e))
-        print(f"Error generating S3 URL for {filename}: {error_code} - {error_msg}")
-        if error_code == 'AccessDenied':
-            print(f"Access denied to S3 object: {s3_key}. Check IAM permissions.")
-        elif error_code == 'NoSuchKey':
-            print(f"Object not found in S3: {s3_key}")
-        return None
-    except Exception as e:
-        print(f"Unexpected error generating S3 URL for {filename}: {e}")
-        return None
+        hint = " Check IAM permissions." if error_code == 'AccessDenied' else ""
+        logger.error("Error generating S3 URLs: %s - %s.%s", error_code, error_msg, hint,
+                     extra={'event': 's3_presign_error', 'error_code': error_code})
+        return {}
+    except Exception:
+        logger.exception("Unexpected error generating S3 URLs", extra={'event': 's3_presign_error'})
+        return {}
 
-def list_s3_videos():
-    """List all video files from S3 bucket"""
-    if not s3_client or not S3_CONFIG['bucket_name']:
-        print("S3 client not initialized or bucket name not set")
+def get_s3_video_url(filename):
+    """Generate S3 URL for a video file (presigned or public)"""
+    s3_key = get_s3_key(filename)
+    return get_s3_video_urls([s3_key]).get(s3_key)
+
+def get_s3_playlist_url(s3_key):
+    """URL for an HLS playlist in S3
+
+    Relative segment URIs inside a stored playlist cannot carry signatures,
+    so with presigned URLs playlists are served by serve_s3_playlist, which
+    signs each segment; public buckets are linked directly.
+    """
+    if S3_CONFIG['use_presigned_urls']:
+        return url_for('serve_s3_playlist', key=s3_key)
+    return get_s3_video_urls([s3_key]).get(s3_key)
+
+@functools.lru_cache(maxsize=1024)
+def fetch_s3_playlist(s3_key):
+    """Playlist text from S3; HLS keys are versioned by ETag, so it never changes"""
+    return get_s3_client().get_object(Bucket=S3_CONFIG['bucket_name'], Key=s3_key)['Body'].read().decode()
+
+def rewrite_playlist(s3_key, text):
+    """Point a playlist's relative URIs at presigned segments and at this app for sub-playlists
+
+    Returns None if the segment URLs could not be signed.
+    """
+    base = posixpath.dirname(s3_key)
+    lines = text.splitlines()
+    uris = {
+        index: posixpath.normpath(posixpath.join(base, line.strip()))
+        for index, line in enumerate(lines)
+        if line.strip() and not line.startswith('#')
+    }
+    segment_keys = [key for key in uris.values() if not key.endswith('.m3u8')]
+    segment_urls = get_s3_video_urls(segment_keys) if segment_keys else {}
+    for index, key in uris.items():
+        if key.endswith('.m3u8'):
+            lines[index] = url_for('serve_s3_playlist', key=key)
+        elif key in segment_urls:
+            lines[index] = segment_urls[key]
+        else:
+            return None
+    return '\n'.join(lines) + '\n'
+
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mov', '.avi', '.mkv')
+
+# Every S3_SOURCES prefix (and shard) is listed concurrently
+s3_lister = ParallelLister(
+    get_s3_client,
+    S3_CONFIG['sources'],
+    VIDEO_EXTENSIONS,
+    S3_CONFIG['bucket_name'],
+    max_workers=S3_CONFIG['list_concurrency'],
+    shard_depth=S3_CONFIG['list_shard_depth']
+)
+
+def list_s3_objects(allow_partial=False):
+    """List all video objects in the configured S3 sources with their metadata
+
+    Returns dicts with key, filename, etag, size and last_modified, sorted by
+    filename and deduplicated; keys outside S3_BUCKET_NAME are qualified as
+    s3://bucket/key. S3 errors are raised to the caller. With
+    ``allow_partial``, failing sources are logged and skipped as long as
+    the others returned videos; catalog sync leaves it off, so a failing
+    bucket is never mistaken for deleted files.
+    """
+    objects, errors = s3_lister.list()
+    for error in errors:
+        S3_LIST_ERRORS.inc(error['source'])
+        logger.error("Error listing S3 source %s (prefix %s): %s", error['source'], error['prefix'], error['error'],
+                     extra={'event': 's3_list_error'})
+    if errors and (not allow_partial or not objects):
+        raise errors[0]['error']
+    return objects
+
+def load_s3_catalog():
+    """Load the S3 catalog as reel entries, returning [] on S3 errors"""
+    if not get_s3_client():
+        logger.warning("S3 client not initialized or bucket name not set")
         return []
-    
-    video_extensions = ('.mp4', '.webm', '.mov', '.avi', '.mkv')
-    video_files = []
+    from botocore.exceptions import ClientError, NoCredentialsError
     
     try:
-        prefix = S3_CONFIG['folder_prefix'].rstrip('/') + '/'
-        print(f"Listing S3 objects in bucket '{S3_CONFIG['bucket_name']}' with prefix '{prefix}'")
-        paginator = s3_client.get_paginator('list_objects_v2')
-        
-        for page in paginator.paginate(Bucket=S3_CONFIG['bucket_name'], Prefix=prefix):
-            if 'Contents' in page:
-                for obj in page['Contents']:
-                    key = obj['Key']
-                    filename = os.path.basename(key)
-                    if filename.lower().endswith(video_extensions):
-                        video_files.append(filename)
-            elif 'KeyCount' in page and page['KeyCount'] == 0:
-                print(f"No objects found in S3 bucket with prefix '{prefix}'")
-        
-        print(f"Found {len(video_files)} video files in S3")
-        return sorted(video_files)
+        objects = list_s3_objects(allow_partial=True)
     except ClientError as e:
         error_code = e.response.get('Error', {}).get('Code', 'Unknown')
         error_msg = e.response.get('Error', {}).get('Message', str(e))
-        print(f"Error listing S3 videos: {error_code} - {error_msg}")
         if error_code == 'AccessDenied':
-            print("Access denied to S3 bucket. Check IAM permissions.")
+            hint = " Check IAM permissions."
         elif error_code == 'NoSuchBucket':
-            print(f"Bucket '{S3_CONFIG['bucket_name']}' does not exist.")
+            hint = f" Bucket '{S3_CONFIG['bucket_name']}' does not exist."
+        else:
+            hint = ""
+        logger.error("Error listing S3 videos: %s - %s.%s", error_code, error_msg, hint,
+                     extra={'event': 's3_list_error', 'error_code': error_code})
         return []
     except NoCredentialsError:
-        print("Error: AWS credentials not found")
+        logger.error("AWS credentials not found", extra={'event': 's3_list_error'})
         return []
-    except Exception as e:
-        print(f"Unexpected error listing S3 videos: {e}")
+    except Exception:
+        logger.exception("Unexpected error listing S3 videos", extra={'event': 's3_list_error'})
         return []
+    
+    ids = reel_ids.assign('S3', objects)
+    return [
+        {
+            'id': ids[obj['key']],
+            'filename': obj['filename'],
+            'key': obj['key'],
+            'etag': obj['etag'],
+            'created_at': obj['last_modified'],
+            'source': 'S3'
+        }
+        for obj in objects
+    ]
+
+def list_s3_videos():
+    """List all video files from S3 bucket"""
+    return [entry['filename'] for entry in load_s3_catalog()]
+
+def list_local_objects():
+    """List all video files in static/reels with their size and modification time"""
+    return scan_directory(os.path.join(app.static_folder, 'reels'), VIDEO_EXTENSIONS)
 
 def list_local_videos():
     """List all video files from local static/reels folder (fallback)"""
-    reels_dir = os.path.join(app.static_folder, 'reels')
-    video_files = []
+    return local_index.filenames()
+
+def load_db_catalog():
+    """Load the active reels from the database (kept current by catalog_sync.py)"""
+    with db_router.connection(read_only=True) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, source, object_key, filename, etag, created_at, "
+                "duration_seconds, width, height, bitrate, size_bytes, poster_key, hls_key "
+                "FROM reels WHERE deleted_at IS NULL ORDER BY id"
+            )
+            rows = cursor.fetchall()
+    
+    return [
+        {
+            'id': row['id'],
+            'filename': row['filename'],
+            'key': row['object_key'],
+            'etag': row['etag'],
+            'created_at': row['created_at'],
+            'source': row['source'],
+            # Filled in by video_metadata.py
+            'duration': float(row['duration_seconds']) if row['duration_seconds'] is not None else None,
+            'width': row['width'],
+            'height': row['height'],
+            'bitrate': row['bitrate'],
+            'size': row['size_bytes'],
+            'poster_key': row['poster_key'],
+            # Master playlist written by hls_packaging.py
+            'hls_key': row['hls_key']
+        }
+        for row in rows
+    ]
+
+def catalog_fingerprint(entries):
+    """Version string for a catalog: a hash over every entry's key, ETag, poster and HLS playlist"""
+    digest = hashlib.sha1()
+    for entry in entries:
+        digest.update(
+            f"{entry['id']}\0{entry['source']}\0{entry['key']}\0{entry['etag']}\0{entry.get('poster_key')}\0"
+            f"{entry.get('hls_key')}\n".encode()
+        )
+    return digest.hexdigest()
+
+# Shared catalogs, refreshed in the background every CATALOG_CACHE_TTL seconds
+s3_catalog = CatalogCache(load_s3_catalog, ttl=CATALOG_CONFIG['ttl'], name='s3_catalog', fingerprint=catalog_fingerprint)
+db_catalog = CatalogCache(load_db_catalog, ttl=CATALOG_CONFIG['ttl'], name='db_catalog', fingerprint=catalog_fingerprint)
+
+# static/reels is indexed once and then updated from change notifications
+local_index = LocalReelIndex(
+    os.path.join(app.static_folder, 'reels'),
+    VIDEO_EXTENSIONS,
+    fingerprint=catalog_fingerprint,
+    poll_interval=CATALOG_CONFIG['local_poll_interval'],
+    assign_ids=lambda objects: reel_ids.assign('local', objects)
+)
+
+def get_video_catalog():
+    """Return (entries, source, version, changed_at) for the configured catalog source
+
+    With CATALOG_SOURCE=db the synced reels table is used; otherwise S3 is
+    preferred, falling back to local files. ``version`` changes whenever any
+    key or ETag in the catalog changes; ``changed_at`` is a Unix timestamp.
+    """
+    if CATALOG_CONFIG['source'] == 'db':
+        try:
+            entries, version, changed_at = db_catalog.get_versioned()
+            if entries:
+                return entries, 'database', version, changed_at
+        except (pymysql.Error, PoolTimeout) as e:
+            logger.error("Error loading reels from database, falling back to live listing: %s", e,
+                         extra={'event': 'catalog_db_error'})
+        CATALOG_FALLBACKS.inc('database')
     
-    if os.path.exists(reels_dir):
-        video_files = [f for f in os.listdir(reels_dir) 
-                      if f.lower().endswith(('.mp4', '.webm', '.mov', '.avi', '.mkv'))]
+    if get_s3_client():
+        entries, version, changed_at = s3_catalog.get_versioned()
+        # If S3 returns no videos, fallback to local
+        if entries:
+            return entries, 'S3', version, changed_at
+        CATALOG_FALLBACKS.inc('S3')
     
-    return sorted(video_files)
+    entries, version, changed_at = local_index.get_versioned()
+    return entries, 'local', version, changed_at
+
+catalog_ids = (None, frozenset())  # (catalog version, reel IDs in it)
+
+def catalog_reel_ids():
+    """Reel IDs in the current catalog, recomputed once per catalog version"""
+    global catalog_ids
+    catalog, _, version, _ = get_video_catalog()
+    if catalog_ids[0] != version:
+        catalog_ids = (version, frozenset(entry['id'] for entry in catalog))
+    return catalog_ids[1]
+
+def feed_etag(version, *parts):
+    """ETag for a feed response: the catalog version plus everything else the body depends on"""
+    # Presigned URLs in a cached body must not outlive their signature, so
+    # the tag rolls over every safety margin when they are in use
+    if S3_CONFIG['use_presigned_urls'] and get_s3_client():
+        parts += (int(time.time() // max(1, S3_CONFIG['presigned_url_safety_margin'])),)
+    raw = '\0'.join(str(part) for part in (version,) + parts)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def not_modified(etag, changed_at):
+    """True if the request's validators show the client already has this response"""
+    if request.if_none_match:
+        # Compressed responses carry the weak form of the tag
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and changed_at is not None:
+        return int(changed_at) <= request.if_modified_since.timestamp()
+    return False
+
+def feed_response(payload, etag, changed_at):
+    """JSON response carrying the feed validators"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    if changed_at is not None:
+        response.last_modified = int(changed_at)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def feed_not_modified(etag, changed_at):
+    """Empty 304 carrying the same validators as the full response"""
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    if changed_at is not None:
+        response.last_modified = int(changed_at)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def reel_s3_keys(entries):
+    """S3 keys of the videos and posters of catalog entries"""
+    s3_keys = []
+    for entry in entries:
+        if entry['source'] == 'S3':
+            s3_keys.append(entry['key'])
+            if entry.get('poster_key'):
+                s3_keys.append(entry['poster_key'])
+    return s3_keys
+
+def build_reels(entries):
+    """Build reel dicts for catalog entries, signing S3 video and poster URLs in one batch"""
+    s3_urls = get_s3_video_urls(reel_s3_keys(entries))
+    reels_list = []
+    
+    for entry in entries:
+        filename = entry['filename']
+        # Extract title from filename (remove extension and clean up)
+        title = filename.rsplit('.', 1)[0].replace('_', ' ').replace('-', ' ')
+        
+        # Get URL based on source
+        if entry['source'] == 'S3':
+            video_url = s3_urls.get(entry['key'])
+            if not video_url:
+                continue  # Skip if we can't generate URL
+            poster_url = s3_urls.get(entry.get('poster_key'))
+            hls_url = get_s3_playlist_url(entry['hls_key']) if entry.get('hls_key') else None
+        else:
+            # Versioned by ETag so the URL changes whenever the file does
+            video_url = url_for('serve_local_reel', filename=filename, v=entry['etag'])
+            poster_url = url_for('static', filename=f"posters/{entry['poster_key']}") if entry.get('poster_key') else None
+            hls_url = url_for('serve_local_hls', filename=entry['hls_key']) if entry.get('hls_key') else None
+        
+        created_at = entry['created_at'] or datetime.now()
+        reels_list.append({
+            'id': entry['id'],
+            'filename': filename,
+            'title': title,
+            'description': f'Video: {title}',
+            'url': video_url,
+            'created_at': created_at.isoformat(),
+            'source': entry['source'],
+            'duration': entry.get('duration'),
+            'width': entry.get('width'),
+            'height': entry.get('height'),
+            'bitrate': entry.get('bitrate'),
+            'size': entry.get('size'),
+            'poster': poster_url,
+            'hls': hls_url
+        })
+    
+    return reels_list
+
+# Follows get_video_catalog() incrementally: a new catalog version only
+# re-indexes the reels that were added, removed or renamed
+search_index = SearchIndex(cache_size=SEARCH_CONFIG['cache_size'], cache_depth=SEARCH_CONFIG['cache_depth'])
+
+# Optional in-process sync of S3 (or static/reels) into the reels table
+catalog_sync_worker = None
+if CATALOG_CONFIG['sync_interval'] > 0:
+    if get_s3_client():
+        catalog_syncer = CatalogSync(get_db_connection, list_s3_objects, 'S3')
+    else:
+        catalog_syncer = CatalogSync(get_db_connection, list_local_objects, 'local')
+    catalog_sync_worker = CatalogSyncWorker(catalog_syncer, CATALOG_CONFIG['sync_interval'], on_change=db_catalog.invalidate)
+    catalog_sync_worker.start()
+
+# Reloads the DB catalog when anything changed the reels table: the sync
+# above runs only in the gunicorn master, other writers in other processes
+catalog_watcher = None
+if CATALOG_CONFIG['source'] == 'db' and CATALOG_CONFIG['change_check_interval'] > 0:
+    catalog_watcher = CatalogChangeWatcher(
+        lambda: db_router.connection(read_only=True),
+        CATALOG_CONFIG['change_check_interval'],
+        on_change=db_catalog.invalidate
+    )
+    catalog_watcher.start()
+
+def warm_s3_client():
+    """Import the SDK and build the S3 client"""
+    return {'configured': get_s3_client() is not None}
+
+def warm_reel_ids():
+    """Load the stored reel IDs, so the first live catalog does not wait for the background registration"""
+    if CATALOG_CONFIG['source'] == 'db':
+        return {'skipped': True}
+    source = 'S3' if get_s3_client() else 'local'
+    reel_ids.load(source)
+    return {'source': source, 'known': reel_ids.stats()['known']}
+
+def warm_feed():
+    """Load the catalog and sign the URLs the first feed pages will need"""
+    entries, source = get_video_catalog()[:2]
+    s3_keys = reel_s3_keys(entries[:WARMUP_CONFIG['presign_reels']])
+    urls = get_s3_video_urls(s3_keys) if s3_keys else {}
+    return {'source': source, 'reels': len(entries), 'presigned': len(urls)}
+
+def warm_search():
+    """Index the catalog so the first search does not pay for the full build"""
+    entries, source, version = get_video_catalog()[:3]
+    search_index.sync(entries, version)
+    return {'documents': search_index.stats()['documents']}
+
+# Run by the server entry points (gunicorn.conf.py, asgi.py, __main__) before
+# the process reports ready on /readyz; CLIs importing this module skip it
+warmup = WarmUp(
+    [('s3_client', warm_s3_client), ('reel_ids', warm_reel_ids), ('feed', warm_feed), ('search', warm_search)] if WARMUP_CONFIG['enabled'] else [],
+    name='warmup'
+)
+
+def before_fork():
+    """Close the preloaded master's idle MySQL connections, so workers do not inherit their sockets"""
+    db_pool.close_all()
+    db_router.close_all()
+
+def after_fork():
+    """Reset per-process state in a worker forked from a preloaded master
+
+    Sockets and threads do not survive fork(): the worker gets its own S3
+    client and an empty DB pool, and restarts its background threads. The
+    warmed catalog and the presigned URL cache are inherited as they are.
+    """
+    global s3_client, s3_client_lock
+    structured_logging.after_fork()
+    s3_client_lock = threading.Lock()
+    if s3_client is not None:
+        s3_client = create_s3_client()
+        s3_presigners.clear()
+    db_pool.after_fork()
+    db_router.after_fork()
+    view_buffer.after_fork()
+    seen_reels.after_fork()
+    reel_ids.after_fork()
+    s3_catalog.after_fork()
+    db_catalog.after_fork()
+    local_index.after_fork()
+    if catalog_watcher is not None:
+        catalog_watcher.after_fork()
+    search_index.after_fork()
+    warmup.after_fork()
 
 @app.route('/api/reels', methods=['GET'])
 def get_reels():
-    """API endpoint to fetch all reels from S3 bucket or local folder"""
+    """API endpoint to fetch reels from S3 bucket or local folder
+
+    Returns one page of a per-session shuffled feed; pass the returned
+    ``next_cursor`` back as ``?cursor=`` for the next page. ``?all=true``
+    returns the whole catalog in one response instead.
+    """
     try:
         # Get user session info
         user_id = session.get('user_id')
         views_count = session.get('views_count', 0)
         is_logged_in = user_id is not None
+        user_info = {
+            'is_logged_in': is_logged_in,
+            'views_count': views_count,
+            'views_remaining': max(0, 10 - views_count) if not is_logged_in else None
+        }
         
-        reels_list = []
-        
-        # Try to get videos from S3 first, fallback to local
-        if s3_client and S3_CONFIG['bucket_name']:
-            video_files = list_s3_videos()
-            source = 'S3'
-            # If S3 returns no videos, fallback to local
-            if not video_files:
-                print("No videos found in S3, falling back to local files")
-                video_files = list_local_videos()
-                source = 'local'
-        else:
-            video_files = list_local_videos()
-            source = 'local'
+        catalog, source, version, changed_at = get_video_catalog()
+        total = len(catalog)
+        # Logged-in users' pages skip reels they have already watched
+        seen = seen_reels.get(user_id) if is_logged_in else None
+        user_state = (is_logged_in, views_count, len(seen) if seen is not None else None)
+        compact = request.args.get('format') == 'compact'
         
-        for idx, filename in enumerate(video_files, start=1):
-            # Extract title from filename (remove extension and clean up)
-            title = filename.rsplit('.', 1)[0].replace('_', ' ').replace('-', ' ')
-            
-            # Get URL based on source
-            if source == 'S3':
-                video_url = get_s3_video_url(filename)
-                if not video_url:
-                    continue  # Skip if we can't generate URL
-            else:
-                video_url = url_for('static', filename=f'reels/{filename}')
+        if request.args.get('all', 'false').lower() == 'true':
+            etag = feed_etag(version, 'all', compact, user_state)
+            if not_modified(etag, changed_at):
+                return feed_not_modified(etag, changed_at)
             
-            reel_dict = {
-                'id': idx,
-                'filename': filename,
-                'title': title,
-                'description': f'Video: {title}',
-                'url': video_url,
-                'created_at': datetime.now().isoformat(),
-                'source': source
+            reels_list = build_reels(catalog)
+            payload = {
+                'success': True,
+                'reels': reels_list,
+                'count': len(reels_list),
+                'source': source,
+                'version': version,
+                'user': user_info
             }
-            reels_list.append(reel_dict)
+            if compact:
+                payload['format'] = 'compact'
+                payload['url_base'], payload['reels'] = compact_reels(reels_list)
+            return feed_response(payload, etag, changed_at)
+        
+        try:
+            limit = int(request.args.get('limit', FEED_CONFIG['page_size']))
+            cursor = request.args.get('cursor')
+            if cursor:
+                seed, offset = decode_cursor(cursor)
+            else:
+                if 'feed_seed' not in session:
+                    session['feed_seed'] = secrets.randbits(32)
+                seed, offset = session['feed_seed'], 0
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid pagination parameters: {str(e)}'
+            }), 400
+        
+        if limit < 1:
+            return jsonify({
+                'success': False,
+                'error': 'limit must be a positive integer'
+            }), 400
+        limit = min(limit, FEED_CONFIG['max_page_size'])
+        offset = min(offset, total)
+        
+        etag = feed_etag(version, seed, offset, limit, compact, user_state)
+        if not_modified(etag, changed_at):
+            return feed_not_modified(etag, changed_at)
+        
+        if seen:
+            def is_seen(pos):
+                reel_id = catalog[pos]['id']
+                return not is_provisional(reel_id) and reel_id in seen
+            positions, next_offset = page_indices_skipping(total, seed, offset, limit, is_seen, SEEN_CONFIG['max_scan'])
+        if not seen or not positions:
+            # Also when everything left in this shuffle has been watched: show it again rather than nothing
+            positions = page_indices(total, seed, offset, limit)
+            next_offset = offset + len(positions)
+        reels_list = build_reels([catalog[pos] for pos in positions])
+        
+        # Once the whole catalog has been walked, continue with a fresh shuffle
+        if total == 0:
+            next_cursor = None
+        elif next_offset >= total:
+            next_cursor = encode_cursor(seed + 1, 0)
+        else:
+            next_cursor = encode_cursor(seed, next_offset)
+        
+        payload = {
+            'success': True,
+            'reels': reels_list,
+            'count': len(reels_list),
+            'total': total,
+            'next_cursor': next_cursor,
+            'source': source,
+            'version': version,
+            'user': user_info
+        }
+        if compact:
+            payload['format'] = 'compact'
+            payload['url_base'], payload['reels'] = compact_reels(reels_list)
+        return feed_response(payload, etag, changed_at)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/reels/version', methods=['GET'])
+def get_reels_version():
+    """Lightweight endpoint clients can poll to see whether the catalog changed"""
+    try:
+        catalog, source, version, changed_at = get_video_catalog()
+        etag = feed_etag(version, 'version')
+        if not_modified(etag, changed_at):
+            return feed_not_modified(etag, changed_at)
         
+        return feed_response({
+            'success': True,
+            'version': version,
+            'count': len(catalog),
+            'source': source,
+            'last_modified': datetime.fromtimestamp(changed_at).isoformat() if changed_at is not None else None
+        }, etag, changed_at)
+    except Exception as e:
         return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/reels/search', methods=['GET'])
+def search_reels():
+    """Search reel titles: ``?q=`` terms all have to match (as word prefixes), best matches first
+
+    Paginated with ``?limit=`` and ``?offset=``; pass the returned
+    ``next_offset`` back for the next page.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({
+                'success': False,
+                'error': 'q is required'
+            }), 400
+        
+        try:
+            limit = int(request.args.get('limit', FEED_CONFIG['page_size']))
+            offset = int(request.args.get('offset', 0))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid pagination parameters: {str(e)}'
+            }), 400
+        
+        if limit < 1 or offset < 0:
+            return jsonify({
+                'success': False,
+                'error': 'limit must be a positive integer and offset non-negative'
+            }), 400
+        limit = min(limit, FEED_CONFIG['max_page_size'])
+        
+        user_id = session.get('user_id')
+        views_count = session.get('views_count', 0)
+        is_logged_in = user_id is not None
+        user_info = {
+            'is_logged_in': is_logged_in,
+            'views_count': views_count,
+            'views_remaining': max(0, 10 - views_count) if not is_logged_in else None
+        }
+        compact = request.args.get('format') == 'compact'
+        
+        catalog, source, version, changed_at = get_video_catalog()
+        etag = feed_etag(version, 'search', query, offset, limit, compact, (is_logged_in, views_count))
+        if not_modified(etag, changed_at):
+            return feed_not_modified(etag, changed_at)
+        
+        search_index.sync(catalog, version)
+        entries, total = search_index.search(query, offset, limit)
+        reels_list = build_reels(entries)
+        next_offset = offset + len(entries)
+        
+        payload = {
             'success': True,
+            'query': query,
             'reels': reels_list,
             'count': len(reels_list),
+            'total': total,
+            'next_offset': next_offset if next_offset < total else None,
             'source': source,
-            'user': {
-                'is_logged_in': is_logged_in,
-                'views_count': views_count,
-                'views_remaining': max(0, 10 - views_count) if not is_logged_in else None
-            }
-        })
+            'version': version,
+            'user': user_info
+        }
+        if compact:
+            payload['format'] = 'compact'
+            payload['url_base'], payload['reels'] = compact_reels(reels_list)
+        return feed_response(payload, etag, changed_at)
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/media/reels/<path:filename>', methods=['GET'])
+def serve_local_reel(filename):
+    """Serve a local reel with Range/206 support and long-lived caching"""
+    path = safe_join(os.path.join(app.static_folder, 'reels'), filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({
+            'success': False,
+            'error': 'Reel not found'
+        }), 404
+    
+    response = send_local_file(request, path, chunk_size=MEDIA_CONFIG['chunk_size'])
+    # URLs carrying the current ETag as ?v= never change content, so they can be cached forever
+    if request.args.get('v') == response.get_etag()[0]:
+        response.headers['Cache-Control'] = f"public, max-age={MEDIA_CONFIG['max_age']}, immutable"
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+@app.route('/media/hls/<path:filename>', methods=['GET'])
+def serve_local_hls(filename):
+    """Serve locally packaged HLS playlists and segments"""
+    path = safe_join(os.path.join(app.static_folder, 'hls'), filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({
+            'success': False,
+            'error': 'Playlist not found'
+        }), 404
+    
+    response = send_local_file(request, path, chunk_size=MEDIA_CONFIG['chunk_size'])
+    # hls_packaging.py writes each reel version to its own ETag-named directory
+    response.headers['Cache-Control'] = f"public, max-age={MEDIA_CONFIG['max_age']}, immutable"
+    return response
+
+@app.route('/media/s3-hls/<path:key>', methods=['GET'])
+def serve_s3_playlist(key):
+    """Serve an HLS playlist from S3 with presigned segment URLs"""
+    hls_prefix = S3_CONFIG['hls_prefix'].rstrip('/') + '/'
+    if not get_s3_client() or not key.startswith(hls_prefix) or not key.endswith('.m3u8') or '..' in key.split('/'):
+        return jsonify({
+            'success': False,
+            'error': 'Playlist not found'
+        }), 404
+    
+    from botocore.exceptions import ClientError
+    try:
+        body = rewrite_playlist(key, fetch_s3_playlist(key))
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+        if error_code in ('NoSuchKey', '404'):
+            return jsonify({
+                'success': False,
+                'error': 'Playlist not found'
+            }), 404
+        logger.error("Error fetching HLS playlist %s: %s", key, error_code,
+                     extra={'event': 's3_playlist_error', 'error_code': error_code})
+        body = None
+    if body is None:
+        return jsonify({
+            'success': False,
+            'error': 'Could not load playlist'
+        }), 502
+    
+    response = app.response_class(body, mimetype='application/vnd.apple.mpegurl')
+    # Must not outlive the segment signatures inside it
+    response.headers['Cache-Control'] = f"private, max-age={S3_CONFIG['presigned_url_safety_margin']}"
+    return response
+
 @app.route('/api/reels', methods=['POST'])
 def add_reel():
     """API endpoint - reels are now read from S3 bucket or local folder"""
-    if s3_client and S3_CONFIG['bucket_name']:
+    if get_s3_client():
         return jsonify({
             'success': False,
             'error': 'Reels are managed in S3 bucket. Upload video files to the S3 bucket.'
@@ -242,7 +1196,7 @@ def add_reel():
 @app.route('/api/reels/<int:reel_id>', methods=['DELETE'])
 def delete_reel(reel_id):
     """API endpoint - reels are now read from S3 bucket or local folder"""
-    if s3_client and S3_CONFIG['bucket_name']:
+    if get_s3_client():
         return jsonify({
             'success': False,
             'error': 'Reels are managed in S3 bucket. Delete video files from the S3 bucket.'
@@ -257,6 +1211,18 @@ def delete_reel(reel_id):
 def track_view():
     """Track when a user views a reel"""
     try:
+        # Count the view against the reel; persisted in batches by view_buffer
+        data = request.get_json(silent=True) or {}
+        reel_id = data.get('reel_id')
+        # Only reels in the catalog are counted: bool is an int subclass, and
+        # made-up IDs would add reel_views rows (and seen bits) for reels that do not exist.
+        # A provisional ID has no row yet either, so its view is not recorded.
+        if (isinstance(reel_id, int) and not isinstance(reel_id, bool) and reel_id in catalog_reel_ids()
+                and not is_provisional(reel_id)):
+            view_buffer.record(reel_id)
+            if session.get('user_id'):
+                seen_reels.add(session['user_id'], reel_id)
+        
         # Increment view count for non-logged-in users
         if not session.get('user_id'):
             views_count = session.get('views_count', 0)
@@ -307,45 +1273,42 @@ def register():
         # Hash password
         password_hash = hashlib.sha256(password.encode()).hexdigest()
         
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-        except pymysql.Error as e:
-            return jsonify({
-                'success': False,
-                'error': f'Database connection failed: {str(e)}. Please check your MySQL configuration.'
-            }), 500
-        
         try:
             # Check if username or email already exists
-            cursor.execute("SELECT id FROM users WHERE username = %s OR email = %s", (username, email))
-            if cursor.fetchone():
-                cursor.close()
-                conn.close()
-                return jsonify({
-                    'success': False,
-                    'error': 'Username or email already exists'
-                }), 400
+            exists = db_read_one("SELECT id FROM users WHERE username = %s OR email = %s", (username, email)) is not None
             
-            # Create user
-            cursor.execute(
-                "INSERT INTO users (username, email, password_hash, created_at) VALUES (%s, %s, %s, %s)",
-                (username, email, password_hash, datetime.now())
-            )
-            conn.commit()
-            user_id = cursor.lastrowid
-            cursor.close()
-            conn.close()
+            if not exists:
+                with db_write() as conn:
+                    with conn.cursor() as cursor:
+                        # Create user
+                        cursor.execute(
+                            "INSERT INTO users (username, email, password_hash, created_at) VALUES (%s, %s, %s, %s)",
+                            (username, email, password_hash, datetime.now())
+                        )
+                        conn.commit()
+                        user_id = cursor.lastrowid
+        except pymysql.IntegrityError as e:
+            # A replica that has not caught up yet can miss a just-registered user; the unique keys do not
+            if e.args[0] != 1062:
+                raise
+            exists = True
+        except PoolTimeout:
+            return jsonify({
+                'success': False,
+                'error': 'Database is busy, please try again shortly'
+            }), 503
         except pymysql.Error as e:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
             return jsonify({
                 'success': False,
                 'error': f'Database error: {str(e)}'
             }), 500
         
+        if exists:
+            return jsonify({
+                'success': False,
+                'error': 'Username or email already exists'
+            }), 400
+        
         # Set session
         session['user_id'] = user_id
         session['username'] = username
@@ -382,30 +1345,19 @@ def login():
         # Hash password
         password_hash = hashlib.sha256(password.encode()).hexdigest()
         
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-        except pymysql.Error as e:
-            return jsonify({
-                'success': False,
-                'error': f'Database connection failed: {str(e)}. Please check your MySQL configuration.'
-            }), 500
-        
         try:
             # Check if input is email (contains @) or username
             # Try both username and email
-            cursor.execute(
+            user = db_read_one(
                 "SELECT id, username, email FROM users WHERE (username = %s OR email = %s) AND password_hash = %s",
                 (username_or_email, username_or_email, password_hash)
             )
-            user = cursor.fetchone()
-            cursor.close()
-            conn.close()
+        except PoolTimeout:
+            return jsonify({
+                'success': False,
+                'error': 'Database is busy, please try again shortly'
+            }), 503
         except pymysql.Error as e:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
             return jsonify({
                 'success': False,
                 'error': f'Database error: {str(e)}'
@@ -462,6 +1414,32 @@ def auth_status():
         'views_remaining': max(0, 10 - views_count) if not user_id else None
     })
 
+@app.route('/healthz', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and answering requests"""
+    return jsonify({
+        'success': True,
+        'status': 'alive'
+    })
+
+@app.route('/readyz', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once the warm-up steps have run, 503 until then"""
+    # A process started without a server entry point (e.g. `flask run`) warms up on the first probe
+    warmup.start()
+    if not warmup.ready:
+        return jsonify({
+            'success': False,
+            'error': 'Warm-up in progress',
+            'warmup': warmup.stats()
+        }), 503
+    
+    return jsonify({
+        'success': True,
+        'status': 'ready',
+        'warmup': warmup.stats()
+    })
+
 @app.route('/api/debug/s3', methods=['GET'])
 def debug_s3():
     """Debug endpoint to check S3 configuration and connectivity"""
@@ -470,12 +1448,15 @@ def debug_s3():
         'bucket_name': S3_CONFIG['bucket_name'],
         'region': S3_CONFIG['region'],
         'folder_prefix': S3_CONFIG['folder_prefix'],
+        'listing': s3_lister.stats(),
         'use_presigned_urls': S3_CONFIG['use_presigned_urls'],
-        's3_client_initialized': s3_client is not None,
+        's3_client_initialized': get_s3_client() is not None,
         'aws_credentials_set': bool(os.getenv('AWS_ACCESS_KEY_ID') and os.getenv('AWS_SECRET_ACCESS_KEY'))
     }
     
-    if s3_client and S3_CONFIG['bucket_name']:
+    s3_client = get_s3_client()
+    if s3_client:
+        from botocore.exceptions import ClientError
         try:
             # Test bucket access
             s3_client.head_bucket(Bucket=S3_CONFIG['bucket_name'])
@@ -502,10 +1483,109 @@ def debug_s3():
     
     return jsonify(debug_info)
 
+# Component counters, read from their stats() snapshots at scrape time
+def catalog_cache_stats(key, results=None):
+    """Callback reading one stats key per catalog cache, or one per result label"""
+    def collect():
+        values = {}
+        for name, cache in (('s3', s3_catalog), ('database', db_catalog)):
+            stats = cache.stats()
+            if results is None:
+                values[(name,)] = stats[key]
+            else:
+                for result, result_key in results.items():
+                    values[(name, result)] = stats[result_key]
+        return values
+    return collect
+
+metrics.Callback('catalog_cache_lookups_total', 'Catalog cache lookups by result',
+                 catalog_cache_stats(None, {'hit': 'hits', 'stale': 'stale_hits', 'miss': 'misses'}),
+                 type='counter', labelnames=('cache', 'result'))
+metrics.Callback('catalog_cache_refreshes_total', 'Catalog loads, including background refreshes',
+                 catalog_cache_stats('refreshes'), type='counter', labelnames=('cache',))
+metrics.Callback('catalog_cache_refresh_errors_total', 'Catalog loads that failed',
+                 catalog_cache_stats('refresh_errors'), type='counter', labelnames=('cache',))
+metrics.Callback('catalog_size', 'Reels in each catalog', lambda: {
+    ('s3',): s3_catalog.stats()['size'],
+    ('database',): db_catalog.stats()['size'],
+    ('local',): local_index.stats()['size']
+}, labelnames=('catalog',))
+metrics.Callback('presigned_url_cache_lookups_total', 'Presigned URL lookups by result', lambda: {
+    ('hit',): presigned_url_cache.stats()['hits'],
+    ('miss',): presigned_url_cache.stats()['misses']
+}, type='counter', labelnames=('result',))
+metrics.Callback('presigned_url_cache_size', 'Presigned URLs held in memory', lambda: presigned_url_cache.stats()['size'])
+metrics.Callback('db_pool_connections', 'Open pooled MySQL connections by state', lambda: {
+    ('idle',): db_pool.stats()['idle'],
+    ('in_use',): db_pool.stats()['in_use']
+}, labelnames=('state',))
+metrics.Callback('db_replica_healthy', '1 while a MySQL replica is in rotation', lambda: {
+    (replica['name'],): replica['healthy'] for replica in db_router.stats()['replicas']
+}, labelnames=('replica',))
+metrics.Callback('db_replica_reads_total', 'Read checkouts served by each MySQL replica', lambda: {
+    (replica['name'],): replica['reads'] for replica in db_router.stats()['replicas']
+}, type='counter', labelnames=('replica',))
+metrics.Callback('db_replica_fallback_reads_total', 'Reads sent to the primary because no replica was usable',
+                 lambda: db_router.stats()['fallback_reads'], type='counter')
+metrics.Callback('db_pool_timeouts_total', 'Checkouts that gave up waiting for a connection',
+                 lambda: db_pool.stats()['timeouts'], type='counter')
+metrics.Callback('log_records_dropped_total', 'Log records dropped by sampling/rate limits or a full queue', lambda: {
+    ('sampled',): structured_logging.stats()['dropped_sampled'],
+    ('queue_full',): structured_logging.stats()['dropped_queue_full']
+}, type='counter', labelnames=('reason',))
+metrics.Callback('reel_views_recorded_total', 'Reel views recorded', lambda: view_buffer.stats()['recorded'], type='counter')
+metrics.Callback('reel_views_pending', 'Reel views buffered but not yet written', lambda: view_buffer.stats()['pending_events'])
+metrics.Callback('search_queries_total', 'Title searches by result cache outcome', lambda: {
+    ('hit',): search_index.stats()['cache_hits'],
+    ('miss',): search_index.stats()['queries'] - search_index.stats()['cache_hits']
+}, type='counter', labelnames=('result',))
+metrics.Callback('search_index_documents', 'Reels in the title search index', lambda: search_index.stats()['documents'])
+metrics.Callback('seen_reels_cache_lookups_total', 'Seen-reels bitmap lookups by result', lambda: {
+    ('hit',): seen_reels.stats()['hits'],
+    ('miss',): seen_reels.stats()['misses']
+}, type='counter', labelnames=('result',))
+metrics.Callback('seen_reels_cached_bytes', 'Memory held by cached seen-reels bitmaps', lambda: seen_reels.stats()['cached_bytes'])
+metrics.Callback('seen_reels_flush_errors_total', 'Failed seen-reels flushes', lambda: seen_reels.stats()['flush_errors'], type='counter')
+metrics.Callback('process_ready', '1 once the startup warm-up has finished', lambda: warmup.ready)
+metrics.Callback('process_warmup_duration_seconds', 'Time the startup warm-up took',
+                 lambda: warmup.stats()['duration'])
+metrics.Callback('reel_views_flush_errors_total', 'Failed reel view flushes', lambda: view_buffer.stats()['flush_errors'], type='counter')
+metrics.Callback('reel_views_dropped_total', 'Reel views dropped because MySQL rejected their row', lambda: view_buffer.stats()['dropped'], type='counter')
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics for this process"""
+    return app.response_class(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/debug/cache', methods=['GET'])
+def debug_cache():
+    """Debug endpoint to inspect the S3 catalog cache counters"""
+    return jsonify({
+        'success': True,
+        's3_catalog': s3_catalog.stats(),
+        'db_catalog': db_catalog.stats(),
+        'local_index': local_index.stats(),
+        'views': view_buffer.stats(),
+        'seen_reels': seen_reels.stats(),
+        'reel_ids': reel_ids.stats(),
+        'logging': structured_logging.stats(),
+        'last_sync': catalog_sync_worker.last_result if catalog_sync_worker else None,
+        'catalog_watch': catalog_watcher.stats() if catalog_watcher else None,
+        'db_pool': db_pool.stats(),
+        'db_routing': db_router.stats(),
+        'json_encoder': encoder_name(app),
+        'presigned_urls': presigned_url_cache.stats(),
+        'search': search_index.stats(),
+        'assets': assets.stats(),
+        'warmup': warmup.stats()
+    })
+
 if __name__ == '__main__':
     import sys
     # Use port 5001 by default to avoid conflicts with AirPlay on macOS
     port = int(os.getenv('PORT', 5001))
-    print(f"Starting Flask app on http://localhost:{port}")
-    app.run(debug=True, host='0.0.0.0', port=port)
+    logger.info("Starting Flask app on http://localhost:%s", port)
+    warmup.start()
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(debug=os.getenv('FLASK_ENV') != 'production', host='0.0.0.0', port=port)
 
@@ -0,0 +1,56 @@
+"""
+ASGI entry point
+Runs the Flask app behind an ASGI server, e.g. `uvicorn asgi:application`.
+This is a thread pool behind an ASGI server, not concurrent I/O: the app is
+still synchronous, and a2wsgi's WSGIMiddleware runs each request on a
+bounded pool of ASGI_THREADS threads, which it holds for the request's S3
+and MySQL calls and while the body is produced. The server's event loop
+owns the client connections, so idle keep-alive connections cost no
+thread; a slow reader does once more than ASGI_SEND_QUEUE_SIZE body chunks
+are waiting for it.
+"""
+import asyncio
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app, seen_reels, view_buffer, warmup
+
+ASGI_CONFIG = {
+    'threads': int(os.getenv('ASGI_THREADS', '32')),  # Requests running app code at once
+    'send_queue_size': int(os.getenv('ASGI_SEND_QUEUE_SIZE', '10'))  # Body chunks buffered ahead of a slow client
+}
+
+
+class Application:
+    """a2wsgi's WSGI adapter plus the app's startup and shutdown hooks"""
+
+    def __init__(self, wsgi_app, threads=32, send_queue_size=10):
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=threads, send_queue_size=send_queue_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Warm up in the background: /healthz answers at once, /readyz once it is done
+                warmup.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.to_thread(view_buffer.close)
+                await asyncio.to_thread(seen_reels.close)
+                self.wsgi.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = Application(
+    app,
+    threads=ASGI_CONFIG['threads'],
+    send_queue_size=ASGI_CONFIG['send_queue_size']
+)
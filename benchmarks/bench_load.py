@@ -0,0 +1,293 @@
+"""
+Endpoint load test
+Starts the app in a separate process against an in-process S3 bucket seeded
+with N objects and an in-memory MySQL stand-in (see standins.py), then
+drives /api/reels, /api/auth/login and /api/track-view with a fixed number
+of concurrent keep-alive clients. It reports throughput and p50/p95/p99
+latency per catalog size, endpoint and concurrency level.
+
+Usage: python benchmarks/bench_load.py [--objects 10 1000] [--concurrency 1 8 32]
+                                       [--duration 5] [--output results.json]
+                                       [--compare baseline.json] [--mysql]
+
+With --mysql the app talks to the MySQL server from the environment (run
+init_db.py first) instead of the stand-in; S3 is always the stand-in.
+"""
+import argparse
+import http.client
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_USER = {'username': 'bench_user', 'email': 'bench@example.com', 'password': 'bench-password'}
+ENDPOINTS = ('reels', 'login', 'track-view')
+
+
+def serve(objects, options, pipe):
+    """Server process: configure the stand-ins, import the app and serve it"""
+    os.environ.update({
+        'S3_BUCKET_NAME': 'bench-reels',
+        'S3_REGION': 'us-east-1',
+        'S3_REELS_FOLDER': 'reels/',
+        'S3_USE_PRESIGNED_URLS': 'true' if options['presigned'] else 'false',
+        'AWS_ACCESS_KEY_ID': 'AKIABENCHMARK0000000',
+        'AWS_SECRET_ACCESS_KEY': 'bench-secret-key',
+        'SECRET_KEY': 'bench-secret',
+        'DB_POOL_MIN_SIZE': '0',
+    })
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import pymysql
+    from standins import FakeMySQL, FakeS3
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    if not options['mysql']:
+        pymysql.connect = FakeMySQL(latency=options['db_latency']).connect
+
+    import app as reels_app
+    FakeS3('bench-reels', 'reels/', objects, latency=options['s3_latency']).install(reels_app.get_s3_client())
+
+    class Handler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like a browser behind a proxy
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, reels_app.app, threaded=True, request_handler=Handler)
+    pipe.send(server.server_port)
+    server.serve_forever()
+
+
+class Client:
+    """One keep-alive HTTP connection with its own session cookie"""
+
+    def __init__(self, port):
+        self.port = port
+        self.cookie = None
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+    def request(self, method, path, body=None, compressed=True):
+        headers = {'Accept-Encoding': 'gzip' if compressed else 'identity'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+            return 0, b''
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status, data
+
+
+def make_request(endpoint, rng, reel_count):
+    if endpoint == 'reels':
+        return 'GET', '/api/reels?limit=10&format=compact', None
+    if endpoint == 'login':
+        return 'POST', '/api/auth/login', {'username': BENCH_USER['username'], 'password': BENCH_USER['password']}
+    return 'POST', '/api/track-view', {'reel_id': rng.randint(1, max(1, reel_count))}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))]
+
+
+def drive(port, endpoint, concurrency, duration, warmup, reel_count):
+    """Run ``concurrency`` clients for warmup + duration seconds and summarise"""
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+
+    def worker(slot):
+        client = Client(port)
+        rng = random.Random(slot)
+        while True:
+            method, path, body = make_request(endpoint, rng, reel_count)
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                break
+            status, _ = client.request(method, path, body)
+            done = time.perf_counter()
+            if sent >= measure_from:
+                if 200 <= status < 400:
+                    latencies[slot].append((done - sent) * 1000)
+                else:
+                    errors[slot] += 1
+        client.conn.close()
+
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    values = sorted(value for slot in latencies for value in slot)
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(values),
+        'errors': sum(errors),
+        'rps': len(values) / duration,
+        'p50_ms': percentile(values, 50),
+        'p95_ms': percentile(values, 95),
+        'p99_ms': percentile(values, 99),
+        'max_ms': values[-1] if values else None,
+    }
+
+
+def run_catalog(objects, args):
+    """Start a server seeded with ``objects`` S3 objects and run every scenario against it"""
+    context = multiprocessing.get_context('spawn')
+    parent, child = context.Pipe()
+    options = {
+        'presigned': not args.public_urls,
+        'mysql': args.mysql,
+        'db_latency': args.db_latency_ms / 1000,
+        's3_latency': args.s3_latency_ms / 1000,
+    }
+    process = context.Process(target=serve, args=(objects, options, child), daemon=True)
+    process.start()
+    try:
+        if not parent.poll(60):
+            raise RuntimeError('App server did not start within 60s')
+        port = parent.recv()
+
+        client = Client(port)
+        started = time.perf_counter()
+        status, _ = client.request('GET', '/api/reels?limit=10&format=compact')
+        cold_ms = (time.perf_counter() - started) * 1000
+        if status != 200:
+            raise RuntimeError(f'/api/reels returned {status} on a cold catalog')
+        client.request('POST', '/api/auth/register', BENCH_USER)
+        _, body = client.request('GET', '/api/debug/cache', compressed=False)
+        catalog_stats = json.loads(body).get('s3_catalog', {})
+
+        catalog = {
+            'objects': objects,
+            'cold_reels_ms': cold_ms,
+            'catalog_load_ms': catalog_stats.get('last_refresh_duration', 0) * 1000,
+        }
+        results = []
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                row = drive(port, endpoint, concurrency, args.duration, args.warmup, objects)
+                row['objects'] = objects
+                results.append(row)
+                print_row(row, file=sys.stderr)
+        return catalog, results
+    finally:
+        process.terminate()
+        process.join()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_row(row, file=sys.stdout):
+    def ms(value):
+        return f'{value:>8.2f}' if value is not None else f"{'-':>8}"
+    print(
+        f"{row['objects']:>7} {row['endpoint']:>10} {row['concurrency']:>5} {row['requests']:>8} "
+        f"{row['errors']:>6} {row['rps']:>9.1f} {ms(row['p50_ms'])} {ms(row['p95_ms'])} {ms(row['p99_ms'])}",
+        file=file
+    )
+
+
+def compare(report, baseline_path):
+    """Print throughput and p99 changes against a previous --output file"""
+    with open(baseline_path) as f:
+        baseline = {(row['objects'], row['endpoint'], row['concurrency']): row for row in json.load(f)['results']}
+
+    print(f"\n{'objects':>7} {'endpoint':>10} {'conc':>5} {'rps':>9} {'rps Δ':>8} {'p99 ms':>8} {'p99 Δ':>8}")
+    for row in report['results']:
+        old = baseline.get((row['objects'], row['endpoint'], row['concurrency']))
+        if old is None:
+            continue
+        rps_delta = (row['rps'] / old['rps'] - 1) * 100 if old['rps'] else 0.0
+        p99_delta = ((row['p99_ms'] / old['p99_ms'] - 1) * 100
+                     if row['p99_ms'] is not None and old['p99_ms'] else 0.0)
+        print(
+            f"{row['objects']:>7} {row['endpoint']:>10} {row['concurrency']:>5} {row['rps']:>9.1f} "
+            f"{rps_delta:>+7.1f}% {row['p99_ms'] or 0:>8.2f} {p99_delta:>+7.1f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--objects', type=int, nargs='+', default=[10, 1000, 10000, 100000],
+                        help='S3 catalog sizes to test')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=5.0, help='Measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=1.0, help='Unmeasured seconds before each scenario')
+    parser.add_argument('--s3-latency-ms', type=float, default=20.0, help='Simulated latency per S3 list page')
+    parser.add_argument('--db-latency-ms', type=float, default=0.5, help='Simulated latency per MySQL statement')
+    parser.add_argument('--public-urls', action='store_true', help='Serve public S3 URLs instead of presigned ones')
+    parser.add_argument('--mysql', action='store_true', help='Use the real MySQL server from the environment')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Compare against a JSON report from an earlier run')
+    parser.add_argument('--json', action='store_true', help='Print the JSON report instead of a table')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': vars(args),
+        },
+        'catalogs': [],
+        'results': [],
+    }
+
+    print(f"{'objects':>7} {'endpoint':>10} {'conc':>5} {'requests':>8} {'errors':>6} {'rps':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}", file=sys.stderr)
+    for objects in args.objects:
+        catalog, results = run_catalog(objects, args)
+        report['catalogs'].append(catalog)
+        report['results'].extend(results)
+        print(f"{objects:>7} catalog: cold /api/reels {catalog['cold_reels_ms']:.1f} ms, "
+              f"S3 listing {catalog['catalog_load_ms']:.1f} ms", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
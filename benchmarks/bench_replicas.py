@@ -0,0 +1,159 @@
+"""
+Replica routing check
+Runs the app against a primary and two replica MySQL stand-ins (see
+standins.py) whose copies of the users table trail the primary by a
+replication lag, and exercises the read/write routing end to end:
+
+  read-your-writes  register, then log in straight away from the same
+                    session (pinned to the primary) and from a fresh one
+                    (served by a lagging replica)
+  distribution      how logins are spread over the replicas
+  failover          one replica goes down mid-run and comes back; logins
+                    must keep succeeding throughout
+
+Usage: python benchmarks/bench_replicas.py [--users 50] [--lag-ms 500]
+                                           [--output results.json] [--json]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRIMARY = ('db-primary', 3306)
+REPLICAS = [('db-replica-1', 3306), ('db-replica-2', 3306)]
+
+
+def setup(args):
+    os.environ.update({
+        'S3_BUCKET_NAME': '',
+        'SECRET_KEY': 'bench-secret',
+        'DB_POOL_MIN_SIZE': '0',
+        'LOG_LEVEL': 'WARNING',
+        'MYSQL_HOST': PRIMARY[0],
+        'MYSQL_PORT': str(PRIMARY[1]),
+        'MYSQL_REPLICA_HOSTS': ','.join(f'{host}:{port}' for host, port in REPLICAS),
+        'DB_REPLICA_HEALTH_INTERVAL': str(args.health_interval_ms / 1000),
+        'WARMUP_ENABLED': 'false',
+    })
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import pymysql
+    from standins import FakeMySQL, routed_connect
+
+    primary = FakeMySQL(latency=args.db_latency_ms / 1000)
+    instances = {PRIMARY: primary}
+    for replica in REPLICAS:
+        instances[replica] = primary.replica(lag=args.lag_ms / 1000)
+    pymysql.connect = routed_connect(instances)
+
+    import app as reels_app
+    return reels_app, instances
+
+
+def login(client, user):
+    return client.post('/api/auth/login', json={'username': user['username'], 'password': user['password']})
+
+
+def read_your_writes(reels_app, args):
+    """Login success right after registering, from the same session and from a fresh one"""
+    same_ok = fresh_ok = 0
+    for index in range(args.users):
+        user = {'username': f'ryw_{index}', 'email': f'ryw_{index}@example.com', 'password': 'bench-password'}
+        client = reels_app.app.test_client()
+        if client.post('/api/auth/register', json=user).status_code != 201:
+            raise SystemExit(f'registering {user["username"]} failed')
+        same_ok += login(client, user).status_code == 200
+        fresh_ok += login(reels_app.app.test_client(), user).status_code == 200
+    return {'users': args.users, 'same_session_ok': same_ok, 'fresh_session_ok': fresh_ok}
+
+
+def distribution(reels_app, args):
+    """Spread of logins (from fresh sessions, once replicated) over the replicas"""
+    time.sleep(args.lag_ms / 1000)
+    user = {'username': 'ryw_0', 'password': 'bench-password'}
+    before = {replica['name']: replica['reads'] for replica in reels_app.db_router.stats()['replicas']}
+    fallback_before = reels_app.db_router.stats()['fallback_reads']
+    for _ in range(args.users):
+        login(reels_app.app.test_client(), user)
+    stats = reels_app.db_router.stats()
+    reads = {replica['name']: replica['reads'] - before[replica['name']] for replica in stats['replicas']}
+    reads['primary'] = stats['fallback_reads'] - fallback_before
+    return reads
+
+
+def failover(reels_app, instances, args):
+    """Take a replica down for a while and count failed logins"""
+    user = {'username': 'ryw_0', 'password': 'bench-password'}
+    router = reels_app.db_router
+    failures = requests = 0
+
+    def run(seconds):
+        nonlocal failures, requests
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            requests += 1
+            failures += login(reels_app.app.test_client(), user).status_code != 200
+
+    down = instances[REPLICAS[0]]
+    down.down = True
+    started = time.monotonic()
+    run(args.health_interval_ms / 1000 * 2)
+    out_of_rotation = not router.stats()['replicas'][0]['healthy']
+    down.down = False
+    run(args.health_interval_ms / 1000 * 3)
+    back = router.stats()['replicas'][0]['healthy']
+    return {
+        'requests': requests,
+        'failed': failures,
+        'taken_out': out_of_rotation,
+        'back_in_rotation': back,
+        'seconds': time.monotonic() - started,
+        'failovers': router.stats()['failovers'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=50, help='Users registered (and logins per scenario)')
+    parser.add_argument('--lag-ms', type=float, default=500.0, help='Replication lag of the replica stand-ins')
+    parser.add_argument('--db-latency-ms', type=float, default=0.5, help='Simulated latency per MySQL statement')
+    parser.add_argument('--health-interval-ms', type=float, default=200.0, help='DB_REPLICA_HEALTH_INTERVAL')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--json', action='store_true', help='Print the JSON report instead of a table')
+    args = parser.parse_args()
+
+    reels_app, instances = setup(args)
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'args': vars(args),
+        },
+        'read_your_writes': read_your_writes(reels_app, args),
+        'distribution': distribution(reels_app, args),
+        'failover': failover(reels_app, instances, args),
+    }
+
+    ryw, reads, fail = report['read_your_writes'], report['distribution'], report['failover']
+    print(f"read-your-writes  same session {ryw['same_session_ok']}/{ryw['users']} logins ok, "
+          f"fresh session {ryw['fresh_session_ok']}/{ryw['users']} (replica lag {args.lag_ms:.0f} ms)",
+          file=sys.stderr)
+    print('distribution      ' + ', '.join(f'{name} {count}' for name, count in reads.items()), file=sys.stderr)
+    print(f"failover          {fail['failed']}/{fail['requests']} logins failed, replica taken out: "
+          f"{fail['taken_out']}, back in rotation: {fail['back_in_rotation']}", file=sys.stderr)
+    if ryw['same_session_ok'] != ryw['users'] or fail['failed'] or not fail['taken_out'] or not fail['back_in_rotation']:
+        print('  warning: routing did not behave as expected', file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
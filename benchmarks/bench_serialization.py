@@ -0,0 +1,124 @@
+"""
+Feed serialization benchmark
+Compares encode time and bytes-on-wire of the /api/reels payload for the
+stdlib and fast JSON encoders, the full and compact feed formats, and
+identity / gzip / brotli content-codings.
+
+Usage: python benchmarks/bench_serialization.py [--reels 10 100 1000] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import brotli, compact_reels, compress_body, orjson  # noqa: E402
+
+
+def make_reels(count, presigned=True):
+    """Synthetic reel dicts shaped like get_reels() output"""
+    base = 'https://example-reels-bucket.s3.us-east-1.amazonaws.com/reels/'
+    query = (
+        '?X-Amz-Algorithm=AWS4-HMAC-SHA256&X-Amz-Credential=AKIAEXAMPLEKEY%2F20240101%2Fus-east-1%2Fs3%2Faws4_request'
+        '&X-Amz-Date=20240101T000000Z&X-Amz-Expires=3600&X-Amz-SignedHeaders=host&X-Amz-Signature='
+    )
+    reels = []
+    for idx in range(1, count + 1):
+        filename = f'summer_trip-clip_{idx:06d}.mp4'
+        title = filename.rsplit('.', 1)[0].replace('_', ' ').replace('-', ' ')
+        url = base + filename
+        if presigned:
+            url += query + f'{idx:064x}'
+        reels.append({
+            'id': idx,
+            'filename': filename,
+            'title': title,
+            'description': f'Video: {title}',
+            'url': url,
+            'created_at': '2024-01-01T12:00:00',
+            'source': 'S3'
+        })
+    return reels
+
+
+def encoders():
+    # Flask's default provider: sorted keys, ASCII-escaped
+    yield 'stdlib', lambda obj: json.dumps(obj, sort_keys=True, ensure_ascii=True).encode()
+    if orjson is not None:
+        yield 'orjson', orjson.dumps
+
+
+def payload(reels, compact):
+    data = {'success': True, 'count': len(reels), 'source': 'S3'}
+    if compact:
+        data['format'] = 'compact'
+        data['url_base'], data['reels'] = compact_reels(reels)
+    else:
+        data['reels'] = reels
+    return data
+
+
+def time_call(func, arg, min_time=0.2):
+    """Best-of-5 seconds per call"""
+    best = float('inf')
+    for _ in range(5):
+        loops = 0
+        started = time.perf_counter()
+        while True:
+            result = func(arg)
+            loops += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time / 5:
+                break
+        best = min(best, elapsed / loops)
+    return best, result
+
+
+def run(counts):
+    results = []
+    for count in counts:
+        reels = make_reels(count)
+        for fmt in ('full', 'compact'):
+            data = payload(reels, fmt == 'compact')
+            for name, dumps in encoders():
+                encode_seconds, body = time_call(dumps, data)
+                row = {
+                    'reels': count,
+                    'format': fmt,
+                    'encoder': name,
+                    'encode_ms': encode_seconds * 1000,
+                    'identity_bytes': len(body),
+                }
+                for encoding in ('gzip', 'br'):
+                    if encoding == 'br' and brotli is None:
+                        continue
+                    compress_seconds, compressed = time_call(lambda b: compress_body(b, encoding), body)
+                    row[f'{encoding}_bytes'] = len(compressed)
+                    row[f'{encoding}_ms'] = compress_seconds * 1000
+                results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reels', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.reels)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'reels':>6} {'format':>8} {'encoder':>8} {'encode ms':>10} {'bytes':>10} {'gzip':>9} {'br':>9}")
+    for row in results:
+        print(
+            f"{row['reels']:>6} {row['format']:>8} {row['encoder']:>8} {row['encode_ms']:>10.3f} "
+            f"{row['identity_bytes']:>10} {row.get('gzip_bytes', '-'):>9} {row.get('br_bytes', '-'):>9}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Startup benchmark
+Measures how long a fresh process takes to become useful: importing app.py,
+building the S3 client, the warm-up phase and the first /api/reels
+response. Every run is a new interpreter against an in-process S3 bucket
+and the MySQL stand-in (see standins.py), so nothing is cached between runs.
+
+Two scenarios are timed per catalog size:
+  warm  warm-up runs first (what the server entry points do), then the
+        first feed request is served from the warmed caches
+  cold  no warm-up: the first feed request lists the bucket and signs URLs
+
+Usage: python benchmarks/bench_startup.py [--objects 10 1000] [--runs 5]
+                                          [--output results.json] [--json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ('warm', 'cold')
+
+
+def child(scenario, objects, s3_latency):
+    """One measurement in this (fresh) interpreter; prints a JSON result"""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import pymysql
+    from standins import FakeMySQL
+
+    pymysql.connect = FakeMySQL().connect
+
+    started = time.perf_counter()
+    import app as reels_app
+    imported = time.perf_counter()
+    sdk_loaded_on_import = 'boto3' in sys.modules
+
+    # Installing the stand-in needs the client, so it is built (and timed) up front
+    from standins import FakeS3
+    FakeS3('bench-reels', 'reels/', objects, latency=s3_latency).install(reels_app.get_s3_client())
+    sdk_ready = time.perf_counter()
+
+    if scenario == 'warm':
+        reels_app.warmup.run()
+    warmed = time.perf_counter()
+
+    client = reels_app.app.test_client()
+    response = client.get('/api/reels?limit=10')
+    first_feed = time.perf_counter()
+    if response.status_code != 200 or not response.get_json()['reels']:
+        raise SystemExit(f'/api/reels returned {response.status_code} without reels')
+
+    print(json.dumps({
+        'scenario': scenario,
+        'objects': objects,
+        'import_ms': (imported - started) * 1000,
+        'sdk_ms': (sdk_ready - imported) * 1000,
+        'warmup_ms': (warmed - sdk_ready) * 1000,
+        'first_feed_ms': (first_feed - warmed) * 1000,
+        'time_to_first_feed_ms': (first_feed - started) * 1000,
+        'sdk_loaded_on_import': sdk_loaded_on_import,
+    }))
+
+
+def measure(scenario, objects, args):
+    env = dict(
+        os.environ,
+        S3_BUCKET_NAME='bench-reels',
+        S3_REGION='us-east-1',
+        S3_REELS_FOLDER='reels/',
+        S3_USE_PRESIGNED_URLS='false' if args.public_urls else 'true',
+        AWS_ACCESS_KEY_ID='AKIABENCHMARK0000000',
+        AWS_SECRET_ACCESS_KEY='bench-secret-key',
+        SECRET_KEY='bench-secret',
+        DB_POOL_MIN_SIZE='0',
+        LOG_LEVEL='WARNING',
+    )
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', scenario,
+         '--objects', str(objects), '--s3-latency-ms', str(args.s3_latency_ms)],
+        env=env, cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarise(rows):
+    """Median of every timing over the runs of one scenario"""
+    summary = {key: rows[0][key] for key in ('scenario', 'objects', 'sdk_loaded_on_import')}
+    for key in ('import_ms', 'sdk_ms', 'warmup_ms', 'first_feed_ms', 'time_to_first_feed_ms'):
+        summary[key] = statistics.median(row[key] for row in rows)
+    summary['runs'] = len(rows)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--objects', type=int, nargs='+', default=[10, 1000, 10000],
+                        help='S3 catalog sizes to test')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per scenario (median is reported)')
+    parser.add_argument('--s3-latency-ms', type=float, default=20.0, help='Simulated latency per S3 list page')
+    parser.add_argument('--public-urls', action='store_true', help='Serve public S3 URLs instead of presigned ones')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--json', action='store_true', help='Print the JSON report instead of a table')
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.objects[0], args.s3_latency_ms / 1000)
+        return
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': vars(args),
+        },
+        'results': [],
+    }
+
+    print(f"{'objects':>7} {'scenario':>8} {'import':>8} {'sdk':>8} {'warmup':>8} {'1st feed':>9} {'total':>8}  (ms)",
+          file=sys.stderr)
+    for objects in args.objects:
+        for scenario in SCENARIOS:
+            row = summarise([measure(scenario, objects, args) for _ in range(args.runs)])
+            report['results'].append(row)
+            print(
+                f"{objects:>7} {scenario:>8} {row['import_ms']:>8.1f} {row['sdk_ms']:>8.1f} {row['warmup_ms']:>8.1f} "
+                f"{row['first_feed_ms']:>9.1f} {row['time_to_first_feed_ms']:>8.1f}",
+                file=sys.stderr
+            )
+            if row['sdk_loaded_on_import']:
+                print('  warning: importing app.py loaded boto3', file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
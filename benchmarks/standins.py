@@ -0,0 +1,225 @@
+"""
+Local S3 and MySQL stand-ins for benchmarks
+FakeS3 answers ListObjectsV2 for a real boto3 client through botocore's
+before-send hook, so the SDK still builds, signs and parses every request
+and only the network round-trip is simulated. FakeMySQL replaces
+pymysql.connect with in-memory connections that understand the queries the
+benchmarked endpoints issue; FakeMySQL.replica() adds read-only instances
+that see the primary's rows after a replication lag, and routed_connect()
+serves several instances by host and port.
+"""
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+import pymysql
+from botocore.awsrequest import AWSResponse
+
+PAGE_SIZE = 1000  # S3 returns at most 1000 keys per ListObjectsV2 page
+
+
+class _Body:
+    def __init__(self, data):
+        self._data = data
+
+    def stream(self, **kwargs):
+        yield self._data
+
+
+class FakeS3:
+    """In-memory bucket answering ListObjectsV2 for a boto3 S3 client.
+
+    ``latency`` seconds are slept per page to stand in for the network.
+    """
+
+    def __init__(self, bucket, prefix, count, latency=0.02):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.latency = latency
+        self.pages = 0
+        self._keys = [f'{prefix}clip_{idx:06d}.mp4' for idx in range(count)]
+        # Pre-rendered <Contents> elements so building pages stays cheap
+        self._contents = [
+            f'<Contents><Key>{escape(key)}</Key><LastModified>2024-01-01T00:00:00.000Z</LastModified>'
+            f'<ETag>&quot;{idx:032x}&quot;</ETag><Size>{1048576 + idx}</Size>'
+            f'<StorageClass>STANDARD</StorageClass></Contents>'
+            for idx, key in enumerate(self._keys)
+        ]
+
+    def install(self, s3_client):
+        """Route the client's ListObjectsV2 calls to this bucket"""
+        s3_client.meta.events.register('before-send.s3.ListObjectsV2', self._handle)
+
+    def _handle(self, request, **kwargs):
+        query = parse_qs(urlsplit(request.url).query)
+        prefix = query.get('prefix', [''])[0]
+        start = int(query.get('continuation-token', ['0'])[0])
+        max_keys = min(int(query.get('max-keys', [PAGE_SIZE])[0]), PAGE_SIZE)
+
+        if prefix == self.prefix or self.prefix.startswith(prefix):
+            stop = min(start + max_keys, len(self._keys))
+        else:
+            start = stop = 0
+        truncated = stop < len(self._keys) and stop > start
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f'<Name>{escape(self.bucket)}</Name><Prefix>{escape(prefix)}</Prefix>'
+            f'<KeyCount>{stop - start}</KeyCount><MaxKeys>{max_keys}</MaxKeys>'
+            f'<IsTruncated>{"true" if truncated else "false"}</IsTruncated>'
+            + ''.join(self._contents[start:stop])
+            + (f'<NextContinuationToken>{stop}</NextContinuationToken>' if truncated else '')
+            + '</ListBucketResult>'
+        ).encode()
+
+        time.sleep(self.latency)
+        self.pages += 1
+        return AWSResponse(request.url, 200, {'Content-Type': 'application/xml'}, _Body(body))
+
+
+class FakeMySQL:
+    """Shared in-memory state behind FakeConnection objects.
+
+    Every statement sleeps ``latency`` seconds, roughly one LAN round-trip.
+    Setting ``down`` makes new connections and pings fail like an
+    unreachable server.
+    """
+
+    def __init__(self, latency=0.0005):
+        self.latency = latency
+        self.users = {}       # username -> row dict
+        self.views = Counter()
+        self.reels = {}       # (source, object_key) -> id
+        self.seen = {}        # user_id -> compressed seen bitmap
+        self.statements = 0
+        self.lag = 0.0
+        self.read_only = False
+        self.down = False
+        self._lock = threading.Lock()
+
+    def replica(self, lag=0.0):
+        """Read-only instance over this one's data; user rows show up ``lag`` seconds after they were written"""
+        replica = FakeMySQL(self.latency)
+        replica.users, replica.views, replica.reels, replica.seen = self.users, self.views, self.reels, self.seen
+        replica.lag = lag
+        replica.read_only = True
+        replica._lock = self._lock
+        return replica
+
+    def visible(self, row):
+        return time.monotonic() - row['written_at'] >= self.lag
+
+    def connect(self, **kwargs):
+        if self.down:
+            raise pymysql.err.OperationalError(2003, "Can't connect to MySQL server (stand-in is down)")
+        return FakeConnection(self)
+
+
+def routed_connect(instances):
+    """A pymysql.connect replacement dispatching on (host, port) to FakeMySQL instances"""
+    def connect(**kwargs):
+        return instances[(kwargs.get('host'), kwargs.get('port', 3306))].connect(**kwargs)
+    return connect
+
+
+class FakeConnection:
+    server_status = 0
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        time.sleep(self.db.latency)
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        time.sleep(self.db.latency)
+        if self.db.down:
+            raise pymysql.err.OperationalError(2013, 'Lost connection to MySQL server (stand-in is down)')
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+        self.lastrowid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=()):
+        time.sleep(self.db.latency)
+        db = self.db
+        if db.down:
+            raise pymysql.err.OperationalError(2013, 'Lost connection to MySQL server during query (stand-in is down)')
+        with db._lock:
+            db.statements += 1
+            if db.read_only and not query.lstrip().startswith('SELECT'):
+                raise pymysql.err.OperationalError(
+                    1290, 'The MySQL server is running with the --read-only option so it cannot execute this statement'
+                )
+            if query.startswith('INSERT INTO users'):
+                username, email, password_hash = args[:3]
+                if any(username == row['username'] or email == row['email'] for row in db.users.values()):
+                    raise pymysql.err.IntegrityError(1062, f"Duplicate entry '{username}' for key 'users.username'")
+                row = {'id': len(db.users) + 1, 'username': username, 'email': email,
+                       'password_hash': password_hash, 'written_at': time.monotonic()}
+                db.users[username] = row
+                self.lastrowid = row['id']
+                self._rows = []
+            elif query.startswith('SELECT object_key, id FROM reels'):
+                source, keys = args[0], set(args[1:])
+                self._rows = [
+                    {'object_key': key, 'id': reel_id}
+                    for (row_source, key), reel_id in db.reels.items()
+                    if row_source == source and (not keys or key in keys)
+                ]
+            elif query.startswith('SELECT seen FROM user_seen_reels'):
+                self._rows = [{'seen': db.seen[args[0]]}] if args[0] in db.seen else []
+            elif query.lstrip().startswith('INSERT INTO user_seen_reels'):
+                db.seen[args[0]] = args[1]
+                self._rows = []
+            elif query.startswith('SELECT') and 'FROM users' in query:
+                name = args[0]
+                password_hash = args[2] if len(args) > 2 else None
+                self._rows = [
+                    {'id': row['id'], 'username': row['username'], 'email': row['email']}
+                    for row in db.users.values()
+                    if db.visible(row) and name in (row['username'], row['email'])
+                    and (password_hash is None or row['password_hash'] == password_hash)
+                ]
+            else:
+                self._rows = []
+        return len(self._rows)
+
+    def executemany(self, query, rows):
+        time.sleep(self.db.latency)
+        if self.db.read_only:
+            raise pymysql.err.OperationalError(1290, 'The MySQL server is running with the --read-only option')
+        with self.db._lock:
+            self.db.statements += 1
+            if 'reel_views' in query:
+                for reel_id, views, _ in rows:
+                    self.db.views[reel_id] += views
+            elif 'INSERT INTO reels' in query:
+                for row in rows:
+                    self.db.reels.setdefault((row[0], row[1]), len(self.db.reels) + 1)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
@@ -0,0 +1,506 @@
+"""
+Bulk catalog import
+Backfills the `reels` table from a local directory tree, a live S3 listing
+or an S3 Inventory report, for catalogs too large to load in one go.
+Sources are read as generators by a producer thread that hands fixed-size
+batches to the writer over a bounded queue, so listing/parsing and MySQL
+writes overlap and memory stays flat however large the input is. Batches
+are upserted with multi-row INSERTs, or with LOAD DATA LOCAL INFILE into a
+staging table.
+
+After every committed batch the position in the source is saved to a
+checkpoint file; rerunning the same command resumes after it. Upserts are
+idempotent, so a batch replayed after a crash is harmless. The importer
+never deletes rows: removals are catalog_sync.py's job.
+
+    python bulk_import.py local --dir static/reels
+    python bulk_import.py s3
+    python bulk_import.py inventory s3://inventory-bucket/reels/2024-01-01T00-00Z/manifest.json
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import unquote
+
+from catalog_sync import UPSERT_QUERY, title_from_filename
+from local_index import stat_video
+from s3_listing import QUALIFIED_PREFIX, qualify_key, source_name, split_key
+
+logger = logging.getLogger(__name__)
+
+# Columns of an S3 Inventory CSV when no manifest says otherwise
+DEFAULT_INVENTORY_SCHEMA = 'Bucket, Key, Size, LastModifiedDate, ETag'
+
+STAGE_TABLE_QUERY = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS reels_import (
+        source VARCHAR(10) NOT NULL,
+        object_key VARCHAR(512) NOT NULL,
+        filename VARCHAR(500) NOT NULL,
+        title VARCHAR(200),
+        description TEXT,
+        etag VARCHAR(64),
+        size_bytes BIGINT,
+        last_modified DATETIME
+    ) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+LOAD_QUERY = r"""
+    LOAD DATA LOCAL INFILE %s INTO TABLE reels_import CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY '\t' ESCAPED BY '\\' LINES TERMINATED BY '\n'
+    (source, object_key, filename, title, description, etag, size_bytes, last_modified)
+"""
+
+# Same effect as catalog_sync.UPSERT_QUERY, for the rows staged by LOAD_QUERY
+MERGE_QUERY = """
+    INSERT INTO reels (source, object_key, filename, title, description, etag, size_bytes, last_modified, created_at)
+    SELECT * FROM (
+        SELECT source, object_key, filename, title, description, etag, size_bytes, last_modified,
+               last_modified AS created_at
+        FROM reels_import
+    ) AS new
+    ON DUPLICATE KEY UPDATE
+        filename = new.filename,
+        etag = new.etag,
+        size_bytes = new.size_bytes,
+        last_modified = new.last_modified,
+        deleted_at = NULL
+"""
+
+
+def open_text(path, open_s3=None):
+    """Text stream for a local path or an s3://bucket/key URI, gunzipped if it ends in .gz"""
+    if path.startswith(QUALIFIED_PREFIX):
+        raw = open_s3(path)
+    else:
+        raw = open(path, 'rb')
+    if path.endswith('.gz'):
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+
+class LocalSource:
+    """Video files under a directory, walked depth-first in sorted order.
+
+    Keys are paths relative to ``root``, so a flat directory such as
+    static/reels gets the same keys as the app's local catalog. The walk
+    order matches the order of the keys' path components, which lets a
+    resumed import skip whole directories that were already imported.
+    """
+
+    label = 'local'
+
+    def __init__(self, root, extensions):
+        self.root = os.path.abspath(root)
+        self.extensions = tuple(extensions)
+
+    def describe(self):
+        return f'local:{self.root}'
+
+    def iter(self, cursor=None):
+        """Yield (object, cursor) pairs, starting after ``cursor``"""
+        after = tuple(cursor.split('/')) if cursor else None
+        yield from self._walk(self.root, (), after)
+
+    def _walk(self, directory, parts, after):
+        # Only one directory's names are held at a time
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            key_parts = parts + (name,)
+            if os.path.isdir(path):
+                if after is None or key_parts >= after[:len(key_parts)]:
+                    yield from self._walk(path, key_parts, after)
+            elif name.lower().endswith(self.extensions) and (after is None or key_parts > after):
+                key = '/'.join(key_parts)
+                obj = stat_video(path, key)
+                obj['filename'] = name
+                yield obj, key
+
+
+class S3ListingSource:
+    """Every video object under one or more (bucket, prefix) sources, page by page.
+
+    S3 lists keys in UTF-8 binary order, so the cursor is the source index
+    and the last key imported, and a resumed listing restarts with
+    ``StartAfter``.
+    """
+
+    label = 'S3'
+
+    def __init__(self, client, sources, extensions, default_bucket):
+        self.client = client
+        self.sources = list(sources)
+        self.extensions = tuple(extensions)
+        self.default_bucket = default_bucket
+
+    def describe(self):
+        return 's3:' + ','.join(source_name(bucket, prefix) for bucket, prefix in self.sources)
+
+    def iter(self, cursor=None):
+        start_index, start_after = cursor or (0, None)
+        paginator = self.client.get_paginator('list_objects_v2')
+        for index, (bucket, prefix) in enumerate(self.sources):
+            if index < start_index:
+                continue
+            params = {'Bucket': bucket, 'Prefix': prefix}
+            if index == start_index and start_after:
+                params['StartAfter'] = start_after
+            for page in paginator.paginate(**params):
+                for obj in page.get('Contents', ()):
+                    filename = os.path.basename(obj['Key'])
+                    if not filename.lower().endswith(self.extensions):
+                        continue
+                    yield {
+                        'key': qualify_key(bucket, obj['Key'], self.default_bucket),
+                        'filename': filename,
+                        'etag': obj.get('ETag', '').strip('"'),
+                        'size': obj.get('Size'),
+                        'last_modified': obj['LastModified'].replace(tzinfo=None) if obj.get('LastModified') else None
+                    }, [index, obj['Key']]
+
+
+class InventorySource:
+    """Video objects in an S3 Inventory report (CSV format).
+
+    ``path`` is a manifest.json (local or s3://) or a single CSV(.gz) data
+    file. Data files named by an S3 manifest are read from the inventory's
+    destination bucket; those named by a local manifest are looked up next
+    to it. The cursor is the data file index and the number of lines read
+    from it.
+    """
+
+    label = 'S3'
+
+    def __init__(self, path, extensions, default_bucket, prefix='', open_s3=None):
+        self.path = path
+        self.extensions = tuple(extensions)
+        self.default_bucket = default_bucket
+        self.prefix = prefix
+        self._open_s3 = open_s3
+        self.files, self.schema = self._read_manifest()
+
+    def describe(self):
+        return f'inventory:{self.path}'
+
+    def _read_manifest(self):
+        if not self.path.endswith('.json'):
+            return [self.path], DEFAULT_INVENTORY_SCHEMA
+        with open_text(self.path, self._open_s3) as f:
+            manifest = json.load(f)
+        if manifest.get('fileFormat', 'CSV').upper() != 'CSV':
+            raise ValueError(f"Unsupported inventory format {manifest['fileFormat']!r}; only CSV is supported")
+        if self.path.startswith(QUALIFIED_PREFIX):
+            bucket = manifest['destinationBucket'].split(':::')[-1]
+            files = [f"{QUALIFIED_PREFIX}{bucket}/{entry['key']}" for entry in manifest['files']]
+        else:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            files = [os.path.join(directory, os.path.basename(entry['key'])) for entry in manifest['files']]
+        return files, manifest.get('fileSchema', DEFAULT_INVENTORY_SCHEMA)
+
+    def iter(self, cursor=None):
+        start_file, start_line = cursor or (0, 0)
+        columns = [name.strip() for name in self.schema.split(',')]
+        for file_index, path in enumerate(self.files):
+            if file_index < start_file:
+                continue
+            skip = start_line if file_index == start_file else 0
+            with open_text(path, self._open_s3) as f:
+                for line_number, values in enumerate(csv.reader(f), start=1):
+                    if line_number <= skip:
+                        continue
+                    obj = self._parse(dict(zip(columns, values)))
+                    if obj is not None:
+                        yield obj, [file_index, line_number]
+
+    def _parse(self, row):
+        # Versioned inventories also list old versions and delete markers
+        if row.get('IsLatest', 'true') != 'true' or row.get('IsDeleteMarker', 'false') == 'true':
+            return None
+        key = unquote(row['Key'])  # Keys in inventory CSVs are URL-encoded
+        filename = os.path.basename(key)
+        if not key.startswith(self.prefix) or not filename.lower().endswith(self.extensions):
+            return None
+        modified = row.get('LastModifiedDate')
+        return {
+            'key': qualify_key(row.get('Bucket') or self.default_bucket, key, self.default_bucket),
+            'filename': filename,
+            'etag': row.get('ETag') or None,
+            'size': int(row['Size']) if row.get('Size') else None,
+            'last_modified': datetime.strptime(modified[:19], '%Y-%m-%dT%H:%M:%S') if modified else None
+        }
+
+
+def reel_row(source, obj):
+    """Column values for one reel, in UPSERT_QUERY order"""
+    title = title_from_filename(obj['filename'])
+    return (source, obj['key'], obj['filename'], title, f'Video: {title}',
+            obj['etag'], obj['size'], obj['last_modified'], obj['last_modified'])
+
+
+class BatchWriter:
+    """Upserts each batch with one multi-row INSERT ... ON DUPLICATE KEY UPDATE"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, rows):
+        with self.conn.cursor() as cursor:
+            cursor.executemany(UPSERT_QUERY, rows)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def _tsv_field(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+class LoadDataWriter:
+    """Stages each batch with LOAD DATA LOCAL INFILE and merges it into `reels`
+
+    The connection must be opened with ``local_infile=True`` and the server
+    must allow it (``local_infile=ON``).
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        fd, self.path = tempfile.mkstemp(prefix='reels-import-', suffix='.tsv')
+        os.close(fd)
+        with self.conn.cursor() as cursor:
+            cursor.execute(STAGE_TABLE_QUERY)
+
+    def write(self, rows):
+        with open(self.path, 'w', encoding='utf-8', newline='\n') as f:
+            for row in rows:
+                # created_at is taken from last_modified by MERGE_QUERY
+                f.write('\t'.join(_tsv_field(value) for value in row[:-1]) + '\n')
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(LOAD_QUERY, (self.path,))
+                cursor.execute(MERGE_QUERY)
+                cursor.execute("DELETE FROM reels_import")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def close(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    """Write the checkpoint atomically, so a crash mid-write keeps the previous one"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+_DONE = object()
+
+
+class BulkImporter:
+    """Streams a source into `reels` through a writer, checkpointing after every batch.
+
+    A producer thread reads the source and builds batches of
+    ``batch_size`` rows; at most ``queue_depth`` batches wait for the
+    writer, which bounds memory and lets reading continue while a batch is
+    being written.
+    """
+
+    def __init__(self, source, writer, checkpoint_path, batch_size=5000, queue_depth=4, progress_interval=5.0):
+        self.source = source
+        self.writer = writer
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+        self.progress_interval = progress_interval
+
+    def run(self, restart=False, on_progress=None):
+        """Import everything after the last checkpoint and return a summary"""
+        description = self.source.describe()
+        state = None if restart else load_checkpoint(self.checkpoint_path)
+        if state is not None and state['source'] != description:
+            raise ValueError(
+                f"Checkpoint {self.checkpoint_path} belongs to {state['source']}; pass --restart to start over"
+            )
+        if state is None:
+            state = {'source': description, 'cursor': None, 'rows': 0, 'complete': False}
+        if state['complete']:
+            return {'source': description, 'rows': 0, 'total_rows': state['rows'], 'batches': 0,
+                    'duration': 0.0, 'rows_per_second': 0.0, 'resumed': True, 'complete': True}
+        resumed = state['cursor'] is not None
+
+        batches = queue.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(state['cursor'], batches, stop), name='bulk-import-reader', daemon=True
+        )
+        started = time.monotonic()
+        last_report = started
+        rows = written_batches = 0
+        producer.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                batch, cursor = item
+                self.writer.write(batch)
+                rows += len(batch)
+                written_batches += 1
+                state['cursor'] = cursor
+                state['rows'] += len(batch)
+                save_checkpoint(self.checkpoint_path, state)
+
+                now = time.monotonic()
+                if on_progress and now - last_report >= self.progress_interval:
+                    on_progress({'rows': rows, 'total_rows': state['rows'],
+                                 'rows_per_second': rows / (now - started)})
+                    last_report = now
+        finally:
+            stop.set()
+            # Unblock a producer waiting on a full queue so it can see the stop flag
+            while producer.is_alive():
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+        state['complete'] = True
+        save_checkpoint(self.checkpoint_path, state)
+        duration = time.monotonic() - started
+        return {
+            'source': description,
+            'rows': rows,
+            'total_rows': state['rows'],
+            'batches': written_batches,
+            'duration': duration,
+            'rows_per_second': rows / duration if duration else 0.0,
+            'resumed': resumed,
+            'complete': True,
+        }
+
+    def _produce(self, cursor, batches, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            batch = []
+            for obj, position in self.source.iter(cursor):
+                batch.append(reel_row(self.source.label, obj))
+                if len(batch) >= self.batch_size:
+                    if not put((batch, position)):
+                        return
+                    batch = []
+                cursor = position
+            if batch:
+                if not put((batch, cursor)):
+                    return
+            put(_DONE)
+        except Exception as e:
+            logger.error("Reading %s failed: %s", self.source.describe(), e, extra={'event': 'bulk_import_error'})
+            put(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a large catalog into the reels table')
+    parser.add_argument('source', choices=['local', 's3', 'inventory'])
+    parser.add_argument('inventory', nargs='?',
+                        help='With inventory: manifest.json or CSV(.gz) data file, local or s3://bucket/key')
+    parser.add_argument('--dir', default=None, help='With local: directory to import (default: static/reels)')
+    parser.add_argument('--prefix', default='', help='With inventory: only import keys under this prefix')
+    parser.add_argument('--mode', choices=['batch', 'load-data'], default='batch',
+                        help='Multi-row INSERTs, or LOAD DATA LOCAL INFILE into a staging table')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per transaction')
+    parser.add_argument('--queue-depth', type=int, default=4, help='Batches read ahead of the writer')
+    parser.add_argument('--checkpoint', default=None,
+                        help='Checkpoint file (default: .bulk_import-<source>.json in the working directory)')
+    parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and import from the start')
+    args = parser.parse_args()
+
+    if args.source == 'inventory' and not args.inventory:
+        parser.error('inventory needs a manifest.json or CSV file')
+
+    import app
+    import pymysql
+
+    if args.source == 'local':
+        source = LocalSource(args.dir or os.path.join(app.app.static_folder, 'reels'), app.VIDEO_EXTENSIONS)
+    else:
+        s3_client = app.get_s3_client()
+        if not s3_client and (args.source == 's3' or args.inventory.startswith(QUALIFIED_PREFIX)):
+            parser.error('S3 is not configured (set S3_BUCKET_NAME and AWS credentials)')
+        if args.source == 's3':
+            source = S3ListingSource(s3_client, app.S3_CONFIG['sources'], app.VIDEO_EXTENSIONS,
+                                     app.S3_CONFIG['bucket_name'])
+        else:
+            def open_s3(uri):
+                bucket, key = split_key(uri, None)
+                return s3_client.get_object(Bucket=bucket, Key=key)['Body']
+
+            source = InventorySource(args.inventory, app.VIDEO_EXTENSIONS, app.S3_CONFIG['bucket_name'],
+                                     prefix=args.prefix, open_s3=open_s3)
+
+    if args.mode == 'load-data':
+        writer = LoadDataWriter(pymysql.connect(**app.MYSQL_CONFIG, local_infile=True))
+    else:
+        writer = BatchWriter(app.get_db_connection())
+
+    def report(progress):
+        print(f"{progress['total_rows']} rows imported ({progress['rows_per_second']:.0f} rows/s)")
+
+    checkpoint = args.checkpoint or f'.bulk_import-{args.source}.json'
+    importer = BulkImporter(source, writer, checkpoint, batch_size=args.batch_size, queue_depth=args.queue_depth)
+    try:
+        result = importer.run(restart=args.restart, on_progress=report)
+    finally:
+        writer.close()
+
+    if result['batches'] == 0 and result['resumed']:
+        print(f"{result['source']} was already imported ({result['total_rows']} rows); pass --restart to import again")
+        return
+    print(
+        f"Imported {result['rows']} rows from {result['source']} in {result['duration']:.2f}s "
+        f"({result['rows_per_second']:.0f} rows/s, {result['batches']} batches"
+        f"{', resumed from checkpoint' if result['resumed'] else ''}); {result['total_rows']} rows in total"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+In-process catalog cache
+Keeps the result of an expensive listing (e.g. the S3 paginator) in memory,
+refreshes it in the background once it goes stale and makes sure concurrent
+callers hitting a cold cache trigger a single load.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """TTL cache around a zero-argument loader function.
+
+    - Fresh value: returned directly (hit).
+    - Stale value: returned directly while one background thread reloads it.
+    - No value yet: the first caller loads it, everyone else waits for that
+      same load instead of starting their own (single-flight).
+
+    If ``fingerprint`` is given it is called once per load to compute a
+    version string for the value; ``get_versioned()`` returns it together
+    with the wall-clock time the version last changed.
+    """
+
+    def __init__(self, loader, ttl=60, name='catalog', fingerprint=None):
+        self._loader = loader
+        self.ttl = ttl
+        self.name = name
+        self._fingerprint = fingerprint
+
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded_at = None  # time.monotonic() of the last successful load
+        self._inflight = None   # threading.Event while a load is running
+        self._last_error = None
+        self._version = None
+        self._changed_at = None  # time.time() when the version last changed
+
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'last_refresh_duration': 0.0,
+            'total_refresh_duration': 0.0,
+        }
+
+    def get(self):
+        """Return the cached value, loading or refreshing it as needed"""
+        return self.get_versioned()[0]
+
+    def get_versioned(self):
+        """Return (value, version, changed_at), loading or refreshing as needed"""
+        with self._lock:
+            if self._loaded_at is not None:
+                age = time.monotonic() - self._loaded_at
+                if age < self.ttl:
+                    self._stats['hits'] += 1
+                    return self._value, self._version, self._changed_at
+
+                # Stale: serve what we have and refresh in the background
+                self._stats['stale_hits'] += 1
+                if self._inflight is None:
+                    self._inflight = threading.Event()
+                    threading.Thread(
+                        target=self._refresh,
+                        name=f'{self.name}-refresh',
+                        daemon=True
+                    ).start()
+                return self._value, self._version, self._changed_at
+
+            # Cold: only one caller loads, the rest wait on the same event
+            self._stats['misses'] += 1
+            if self._inflight is None:
+                self._inflight = threading.Event()
+                leader = True
+            else:
+                leader = False
+            event = self._inflight
+
+        if leader:
+            self._refresh()
+        else:
+            event.wait()
+
+        with self._lock:
+            if self._loaded_at is None and self._last_error is not None:
+                raise self._last_error
+            return self._value, self._version, self._changed_at
+
+    def _refresh(self):
+        """Run the loader once and publish the result to waiting callers"""
+        started = time.monotonic()
+        try:
+            value = self._loader()
+            version = self._fingerprint(value) if self._fingerprint else None
+            error = None
+        except Exception as e:
+            value = version = None
+            error = e
+        duration = time.monotonic() - started
+
+        with self._lock:
+            self._stats['refreshes'] += 1
+            self._stats['last_refresh_duration'] = duration
+            self._stats['total_refresh_duration'] += duration
+            if error is None:
+                if self._changed_at is None or version != self._version:
+                    self._changed_at = time.time()
+                self._value = value
+                self._version = version
+                self._loaded_at = time.monotonic()
+                self._last_error = None
+            else:
+                self._stats['refresh_errors'] += 1
+                self._last_error = error
+                logger.error("Error refreshing %s cache: %s", self.name, error)
+            event = self._inflight
+            self._inflight = None
+        event.set()
+
+    def invalidate(self):
+        """Mark the cached value stale so the next get() refreshes it"""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._loaded_at = time.monotonic() - self.ttl
+
+    def after_fork(self):
+        """Reset locks in a forked child; a refresh running in the parent does not exist here"""
+        self._lock = threading.Lock()
+        self._inflight = None
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['ttl'] = self.ttl
+            snapshot['loaded'] = self._loaded_at is not None
+            snapshot['age'] = (time.monotonic() - self._loaded_at) if self._loaded_at is not None else None
+            snapshot['size'] = len(self._value) if self._value is not None else 0
+            snapshot['refreshing'] = self._inflight is not None
+            snapshot['version'] = self._version
+        return snapshot
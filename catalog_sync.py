@@ -0,0 +1,270 @@
+"""
+Incremental catalog sync
+Diffs an object listing (S3 or static/reels) against the `reels` table and
+applies only the changes: batched upserts for new or modified objects and
+soft-deletes for objects that disappeared.
+
+Run once:          python catalog_sync.py --source s3
+Run continuously:  python catalog_sync.py --source s3 --interval 60
+"""
+import argparse
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# A changed file gets a fresh metadata retry budget; those columns are compared
+# against the old etag, so they are assigned before it
+UPSERT_QUERY = """
+    INSERT INTO reels (source, object_key, filename, title, description, etag, size_bytes, last_modified, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        filename = VALUES(filename),
+        metadata_attempts = IF(etag <=> VALUES(etag), metadata_attempts, 0),
+        metadata_retry_after = IF(etag <=> VALUES(etag), metadata_retry_after, NULL),
+        etag = VALUES(etag),
+        size_bytes = VALUES(size_bytes),
+        last_modified = VALUES(last_modified),
+        deleted_at = NULL
+"""
+
+
+# updated_at moves on every insert, update and soft-delete (idx_updated_at keeps this cheap)
+CHANGED_QUERY = "SELECT MAX(updated_at) AS changed_at, NOW() AS now FROM reels"
+
+
+def title_from_filename(filename):
+    """Extract title from filename (remove extension and clean up)"""
+    return filename.rsplit('.', 1)[0].replace('_', ' ').replace('-', ' ')
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class CatalogSync:
+    """Keeps the `reels` rows of one source in step with a listing function.
+
+    ``list_objects`` returns dicts with ``key``, ``filename``, ``etag``,
+    ``size`` and ``last_modified``. The last synced state is kept in memory
+    after the first run, so later runs only touch the database for objects
+    that actually changed.
+    """
+
+    def __init__(self, connect, list_objects, source, batch_size=500):
+        self._connect = connect
+        self._list_objects = list_objects
+        self.source = source
+        self.batch_size = batch_size
+        self._snapshot = None  # object_key -> etag of active rows
+        self._lock = threading.Lock()
+
+    def _load_snapshot(self, cursor):
+        cursor.execute(
+            "SELECT object_key, etag FROM reels WHERE source = %s AND deleted_at IS NULL",
+            (self.source,)
+        )
+        return {row['object_key']: row['etag'] for row in cursor.fetchall()}
+
+    def run_once(self):
+        """Sync once and return a summary of what changed"""
+        with self._lock:
+            started = time.monotonic()
+            listing = {obj['key']: obj for obj in self._list_objects()}
+
+            if self._snapshot is None:
+                conn = self._connect()
+                try:
+                    cursor = conn.cursor()
+                    self._snapshot = self._load_snapshot(cursor)
+                    cursor.close()
+                finally:
+                    conn.close()
+            snapshot = self._snapshot
+
+            changed = [obj for key, obj in listing.items() if snapshot.get(key, False) != obj['etag']]
+            inserted = sum(1 for obj in changed if obj['key'] not in snapshot)
+            removed = [key for key in snapshot if key not in listing]
+
+            if changed or removed:
+                self._apply(changed, removed)
+
+            for obj in changed:
+                snapshot[obj['key']] = obj['etag']
+            for key in removed:
+                del snapshot[key]
+
+            return {
+                'source': self.source,
+                'listed': len(listing),
+                'inserted': inserted,
+                'updated': len(changed) - inserted,
+                'deleted': len(removed),
+                'duration': time.monotonic() - started,
+            }
+
+    def _apply(self, changed, removed):
+        """Write upserts and soft-deletes in batches inside one transaction"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            for batch in _batches(changed, self.batch_size):
+                cursor.executemany(UPSERT_QUERY, [
+                    (
+                        self.source,
+                        obj['key'],
+                        obj['filename'],
+                        title_from_filename(obj['filename']),
+                        f"Video: {title_from_filename(obj['filename'])}",
+                        obj['etag'],
+                        obj['size'],
+                        obj['last_modified'],
+                        obj['last_modified'],
+                    )
+                    for obj in batch
+                ])
+
+            for batch in _batches(removed, self.batch_size):
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(
+                    f"UPDATE reels SET deleted_at = NOW() WHERE source = %s AND object_key IN ({placeholders})",
+                    (self.source, *batch)
+                )
+
+            conn.commit()
+            cursor.close()
+        except Exception:
+            conn.rollback()
+            # Re-read the table next time, our view of it may be stale
+            self._snapshot = None
+            raise
+        finally:
+            conn.close()
+
+
+class CatalogSyncWorker:
+    """Runs a CatalogSync every ``interval`` seconds on a daemon thread"""
+
+    def __init__(self, syncer, interval, on_change=None):
+        self.syncer = syncer
+        self.interval = interval
+        self._on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_result = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='catalog-sync', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                result = self.syncer.run_once()
+                self.last_result = result
+                if self._on_change and (result['inserted'] or result['updated'] or result['deleted']):
+                    self._on_change()
+            except Exception as e:
+                logger.error("Catalog sync failed: %s", e)
+            self._stop.wait(self.interval)
+
+
+class CatalogChangeWatcher:
+    """Calls ``on_change`` whenever the `reels` table has changed, polling every ``interval`` seconds
+
+    Notices every writer: a CatalogSyncWorker in another process (such as
+    the gunicorn master), catalog_sync.py, bulk_import.py and the metadata
+    and HLS jobs. ``connection`` is a zero-argument callable returning a
+    context manager that yields a DB connection.
+    """
+
+    def __init__(self, connection, interval, on_change):
+        self._connection = connection
+        self.interval = interval
+        self._on_change = on_change
+        self._last = None
+        self._checked = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'checks': 0, 'changes': 0, 'errors': 0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='catalog-watch', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                self._stats['errors'] += 1
+                logger.error("Catalog change check failed: %s", e)
+
+    def check(self):
+        """Poll once; returns whether the table changed since the previous poll"""
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(CHANGED_QUERY)
+                row = cursor.fetchone()
+        self._stats['checks'] += 1
+        changed = self._checked and row['changed_at'] != self._last
+        self._checked = True
+        # updated_at has one-second resolution: a later write in the same
+        # second would look unchanged, so a recent value is not trusted yet
+        recent = row['changed_at'] is not None and (row['now'] - row['changed_at']).total_seconds() < 1
+        self._last = None if recent else row['changed_at']
+        if changed:
+            self._stats['changes'] += 1
+            self._on_change()
+        return changed
+
+    def after_fork(self):
+        self._stop = threading.Event()
+        self._thread = None
+        self.start()
+
+    def stats(self):
+        return dict(self._stats, interval=self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync the reels table with S3 or static/reels')
+    parser.add_argument('--source', choices=['s3', 'local'], default='s3')
+    parser.add_argument('--interval', type=int, default=0,
+                        help='Seconds between syncs; 0 runs a single sync and exits')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    import app
+
+    if args.source == 's3':
+        s3_client = app.get_s3_client()
+        if not s3_client:
+            parser.error('S3 is not configured (set S3_BUCKET_NAME and AWS credentials)')
+        syncer = CatalogSync(app.get_db_connection, app.list_s3_objects, 'S3', args.batch_size)
+    else:
+        syncer = CatalogSync(app.get_db_connection, app.list_local_objects, 'local', args.batch_size)
+
+    while True:
+        result = syncer.run_once()
+        print(
+            f"Synced {result['listed']} {result['source']} objects in {result['duration']:.2f}s: "
+            f"{result['inserted']} inserted, {result['updated']} updated, {result['deleted']} deleted"
+        )
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
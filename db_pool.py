@@ -0,0 +1,192 @@
+"""
+MySQL connection pool
+Thread-safe, bounded pool of PyMySQL connections so requests reuse open
+connections instead of paying a TCP + auth handshake every time.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from pymysql.constants.SERVER_STATUS import SERVER_STATUS_IN_TRANS
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Bounded pool around a connection factory.
+
+    - Idle connections are reused most-recently-used first.
+    - Connections idle for longer than ``ping_interval`` are pinged before
+      being handed out (``pre_ping``); dead ones are replaced.
+    - Connections older than ``max_lifetime`` seconds are closed instead of
+      being reused.
+    - When ``max_size`` connections are checked out, callers wait up to
+      ``checkout_timeout`` seconds and then get ``PoolTimeout``.
+    - ``on_checkout``, if given, is called with the seconds each successful
+      checkout waited.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, max_lifetime=3600,
+                 checkout_timeout=5, pre_ping=True, ping_interval=5, on_checkout=None):
+        self._connect = connect
+        self._on_checkout = on_checkout
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()       # [conn, created_at, last_used]
+        self._created_at = {}      # id(conn) -> created_at, for checked-out connections
+        self._size = 0             # open connections, idle + in use
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+        }
+
+    def _open(self):
+        """Open a new connection for a slot already reserved in _size"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        return conn, time.monotonic()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """Check out a connection, waiting up to ``timeout`` seconds"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f'No database connection available after {timeout}s')
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+                    conn = None
+
+            if conn is None:
+                conn, created_at = self._open()
+            else:
+                now = time.monotonic()
+                if now - created_at >= self.max_lifetime:
+                    self._discard(conn)
+                    continue
+                if self.pre_ping and now - last_used >= self.ping_interval:
+                    try:
+                        conn.ping(reconnect=False)
+                    except Exception:
+                        self._discard(conn)
+                        continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._created_at[id(conn)] = created_at
+                self._stats['checkouts'] += 1
+                self._stats['total_wait_time'] += waited
+                self._stats['max_wait_time'] = max(self._stats['max_wait_time'], waited)
+            if self._on_checkout is not None:
+                self._on_checkout(waited)
+            return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, ending any open transaction"""
+        with self._cond:
+            created_at = self._created_at.pop(id(conn))
+
+        try:
+            if getattr(conn, 'server_status', SERVER_STATUS_IN_TRANS) & SERVER_STATUS_IN_TRANS:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        if time.monotonic() - created_at >= self.max_lifetime:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append([conn, created_at, time.monotonic()])
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks a connection out and always returns it"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def prefill(self):
+        """Open connections until at least ``min_size`` exist"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn, created_at = self._open()
+            with self._cond:
+                self._idle.append([conn, created_at, time.monotonic()])
+                self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def after_fork(self):
+        """Forget connections inherited from the parent process
+
+        They are dropped without being closed: closing would send COM_QUIT
+        over a socket the parent still owns.
+        """
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+
+    def stats(self):
+        """Return a snapshot of the pool gauges and counters"""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot['size'] = self._size
+            snapshot['idle'] = len(self._idle)
+            snapshot['in_use'] = len(self._created_at)
+            snapshot['min_size'] = self.min_size
+            snapshot['max_size'] = self.max_size
+        return snapshot
@@ -0,0 +1,247 @@
+"""
+MySQL read/write routing
+Sends read-only queries to replica pools and everything else to the
+primary pool. Replicas are health-checked on a background thread (a ping,
+plus replication lag when a limit is set); a replica that cannot be reached
+is taken out of rotation until it passes a check again, and reads fall back
+to the primary while no replica is healthy. A replica whose pool is merely
+busy stays in rotation; that read just goes elsewhere. Read-your-writes is
+up to the caller: it asks for the primary (``read_only=False``) for a while
+after it wrote, see ``db_read_one()`` in app.py.
+"""
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+
+import pymysql
+
+from db_pool import PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+# SHOW REPLICA STATUS needs MySQL 8.0.22+ (MariaDB 10.5.1+); older servers only know the SLAVE form
+LAG_QUERIES = ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS")
+
+
+def is_connection_error(error):
+    """True for errors that mean the server is unreachable, not that a statement failed"""
+    if isinstance(error, pymysql.err.InterfaceError):
+        return True
+    # Client-side error codes (2000-2999: can't connect, server gone away, lost connection)
+    return isinstance(error, pymysql.err.OperationalError) and bool(error.args) and 2000 <= error.args[0] < 3000
+
+
+def parse_hosts(value, default_port=3306):
+    """Parse 'host[:port],...' into a list of (host, port)"""
+    hosts = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        hosts.append((host, int(port) if port else default_port))
+    return hosts
+
+
+class Replica:
+    """One replica endpoint: its pool and health state"""
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = True
+        self.lag = None
+        self.last_error = None
+        self.reads = 0
+
+
+class ReplicaRouter:
+    """Routes connections between a primary pool and replica pools.
+
+    ``replicas`` is a list of ``(name, pool)``. Replicas start out healthy
+    so the first reads do not wait for a check. ``max_lag`` (seconds, 0 =
+    off) also takes replicas out of rotation while they are further behind
+    than that; it needs the REPLICATION CLIENT privilege.
+    """
+
+    def __init__(self, primary, replicas=(), health_interval=5.0, max_lag=0, checkout_timeout=1.0):
+        self.primary = primary
+        self.replicas = [Replica(name, pool) for name, pool in replicas]
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        # Short, so reads move on quickly from a replica whose pool is exhausted
+        self.checkout_timeout = checkout_timeout
+
+        self._lag_query = LAG_QUERIES[0]
+        self._lock = threading.Lock()
+        self._cycle = itertools.cycle(self.replicas)
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            'primary_checkouts': 0,
+            'fallback_reads': 0,   # reads sent to the primary because no replica was usable
+            'failovers': 0,        # replicas taken out of rotation
+            'busy_skips': 0,       # reads sent elsewhere because a replica's pool was exhausted
+        }
+
+    def start(self):
+        if self.replicas and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='replica-health', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.health_interval):
+            self.check()
+
+    def check(self):
+        """Health-check every replica once"""
+        for replica in self.replicas:
+            try:
+                with replica.pool.connection(timeout=self.checkout_timeout) as conn:
+                    conn.ping(reconnect=False)
+                    lag = self._lag(conn) if self.max_lag else None
+                if self.max_lag and lag is None:
+                    raise RuntimeError('replication is not running')
+                if self.max_lag and lag > self.max_lag:
+                    raise RuntimeError(f'replication lag {lag}s exceeds {self.max_lag}s')
+            except PoolTimeout:
+                # Every connection is in use: busy, not broken
+                continue
+            except Exception as e:
+                self._mark_down(replica, e)
+            else:
+                with self._lock:
+                    replica.lag = lag
+                    if not replica.healthy:
+                        replica.healthy = True
+                        replica.last_error = None
+                        logger.info("MySQL replica %s is back in rotation", replica.name,
+                                    extra={'event': 'replica_up', 'replica': replica.name})
+
+    def _lag(self, conn):
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute(self._lag_query)
+            except pymysql.err.ProgrammingError:
+                if self._lag_query == LAG_QUERIES[-1]:
+                    raise
+                self._lag_query = LAG_QUERIES[-1]
+                cursor.execute(self._lag_query)
+            row = cursor.fetchone()
+        if not row:
+            return None
+        # MySQL 8.0.22+ names it Seconds_Behind_Source, older versions Seconds_Behind_Master
+        return row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+
+    def _mark_down(self, replica, error):
+        with self._lock:
+            replica.last_error = str(error)
+            if not replica.healthy:
+                return
+            replica.healthy = False
+            self._stats['failovers'] += 1
+        # Idle connections to it are most likely dead as well
+        replica.pool.close_all()
+        logger.warning("MySQL replica %s taken out of rotation: %s", replica.name, error,
+                       extra={'event': 'replica_down', 'replica': replica.name})
+
+    def _next_replica(self, skip=()):
+        """Next healthy replica not in ``skip``, round robin; None if there is none"""
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self._cycle)
+                if replica.healthy and replica not in skip:
+                    return replica
+        return None
+
+    @contextmanager
+    def connection(self, read_only=False):
+        """Check out a replica connection for reads (when one is healthy), else a primary one"""
+        replica = self._next_replica() if read_only else None
+        conn = None
+        tried = []
+        while replica is not None:
+            try:
+                conn = replica.pool.acquire(self.checkout_timeout)
+                break
+            except PoolTimeout:
+                with self._lock:
+                    self._stats['busy_skips'] += 1
+            except Exception as e:
+                if is_connection_error(e):
+                    self._mark_down(replica, e)
+                else:
+                    logger.warning("Checkout from MySQL replica %s failed: %s", replica.name, e,
+                                   extra={'event': 'replica_checkout_error', 'replica': replica.name})
+            tried.append(replica)
+            replica = self._next_replica(tried)
+
+        if conn is not None:
+            with self._lock:
+                replica.reads += 1
+            try:
+                yield conn
+            except Exception as e:
+                # The failing statement is the caller's to handle; later reads avoid the replica
+                if is_connection_error(e):
+                    self._mark_down(replica, e)
+                raise
+            finally:
+                replica.pool.release(conn)
+            return
+
+        with self._lock:
+            self._stats['primary_checkouts'] += 1
+            if read_only and self.replicas:
+                self._stats['fallback_reads'] += 1
+        with self.primary.connection() as conn:
+            yield conn
+
+    def read(self, func, read_only=True):
+        """Return ``func(conn)`` for an idempotent read, retried once if its server was unreachable
+
+        The failed replica is out of rotation by then, so the retry goes to
+        another replica or the primary.
+        """
+        try:
+            with self.connection(read_only) as conn:
+                return func(conn)
+        except Exception as e:
+            if not (read_only and self.replicas and is_connection_error(e)):
+                raise
+        with self.connection(read_only) as conn:
+            return func(conn)
+
+    def close_all(self):
+        """Close every idle replica connection"""
+        for replica in self.replicas:
+            replica.pool.close_all()
+
+    def after_fork(self):
+        """Forget inherited replica connections and restart the health checks"""
+        self._lock = threading.Lock()
+        for replica in self.replicas:
+            replica.pool.after_fork()
+        self._stop = threading.Event()
+        self._thread = None
+        self.start()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['replicas'] = [
+                {
+                    'name': replica.name,
+                    'healthy': replica.healthy,
+                    'lag': replica.lag,
+                    'reads': replica.reads,
+                    'last_error': replica.last_error,
+                    'pool': replica.pool.stats(),
+                }
+                for replica in self.replicas
+            ]
+            return snapshot
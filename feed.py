@@ -0,0 +1,83 @@
+"""
+Feed pagination helpers
+Walks the catalog in a deterministic, seeded random order one page at a
+time. The order is a keyed permutation of catalog positions, so serving a
+page costs O(page size) no matter how large the catalog is.
+"""
+import base64
+import hashlib
+
+FEISTEL_ROUNDS = 4
+
+
+def _round(seed, round_number, value, mask):
+    digest = hashlib.blake2b(f"{seed}:{round_number}:{value}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') & mask
+
+
+def permute_index(index, size, seed):
+    """Map position ``index`` to its slot in the seeded permutation of range(size).
+
+    Uses a small balanced Feistel network over the next power of four and
+    cycle-walks results that fall outside ``size``, which keeps the mapping
+    a bijection without materialising the whole permutation.
+    """
+    if not 0 <= index < size:
+        raise IndexError(index)
+    if size == 1:
+        return 0
+
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+
+    value = index
+    while True:
+        left, right = value >> half_bits, value & mask
+        for round_number in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ _round(seed, round_number, right, mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+def page_indices(size, seed, offset, limit):
+    """Return catalog positions for ``limit`` items starting at ``offset``"""
+    end = min(size, offset + limit)
+    return [permute_index(i, size, seed) for i in range(offset, end)]
+
+
+def page_indices_skipping(size, seed, offset, limit, skip, max_scan):
+    """Like page_indices, but passing over positions for which ``skip(position)`` is true
+
+    Returns (positions, next_offset). At most ``max_scan`` positions are
+    tested; after that the page is filled without skipping, so a page costs
+    O(limit + max_scan) even when nearly everything would be skipped.
+    """
+    positions = []
+    index = offset
+    while len(positions) < limit and index < size:
+        position = permute_index(index, size, seed)
+        index += 1
+        if index - offset <= max_scan and skip(position):
+            continue
+        positions.append(position)
+    return positions, index
+
+
+def encode_cursor(seed, offset):
+    """Encode a feed position as an opaque URL-safe cursor"""
+    raw = f"{seed}:{offset}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into (seed, offset); raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        seed, offset = base64.urlsafe_b64decode(padded.encode()).decode().split(':')
+        seed, offset = int(seed), int(offset)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if offset < 0:
+        raise ValueError('Invalid cursor')
+    return seed, offset
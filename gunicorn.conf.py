@@ -0,0 +1,87 @@
+"""
+Gunicorn configuration
+Production entry point: `gunicorn -c gunicorn.conf.py app:app`.
+Pre-fork workers with threads, sized from the CPUs the container may use.
+The app is preloaded in the master, which also runs the warm-up phase
+(S3 client, catalog, presigned URLs), so every worker starts ready with
+the catalog already in memory and shares it copy-on-write. The master
+closes its MySQL connections before each fork, and each worker resets its
+sockets and background threads.
+"""
+import os
+
+
+def available_cpus():
+    """CPUs this process may use, honouring cpusets and cgroup CPU quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, -(-int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+
+# Workers handle requests in parallel across cores; threads overlap the
+# S3/MySQL waits inside each worker
+workers = int(os.getenv('GUNICORN_WORKERS', str(available_cpus() * 2 + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Kill workers stuck on a request for longer than this; on reload or shutdown
+# give in-flight requests graceful_timeout seconds to finish
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers after this many requests (0 = never), staggered by the jitter
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Worker heartbeat files on tmpfs; a disk-backed /tmp can stall workers in containers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    """Run the warm-up (SDK, catalog, URL signing) once in the master before any worker forks"""
+    if not preload_app:
+        return
+    from app import warmup
+    for step in warmup.run():
+        if step['error']:
+            server.log.warning("Warm-up step %s failed: %s", step['name'], step['error'])
+        else:
+            server.log.info("Warm-up step %s took %.3fs: %s", step['name'], step['duration'], step['result'])
+
+
+def pre_fork(server, worker):
+    """Close the master's pooled MySQL connections (warm-up and background threads open them) before forking"""
+    if preload_app:
+        from app import before_fork
+        before_fork()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import after_fork
+        after_fork()
+
+
+def post_worker_init(worker):
+    """Without preloading every worker imports the app itself and warms up on its own"""
+    if not preload_app:
+        from app import warmup
+        warmup.start()
@@ -0,0 +1,485 @@
+"""
+HLS packaging jobs
+Turns each source video into a small adaptive-bitrate HLS ladder (up to
+three H.264/AAC renditions cut into 4-second segments, plus a master
+playlist) so players can step down on slow links instead of stalling on the
+original upload.
+
+Jobs live in the `hls_jobs` table, one per (reel, ETag), so enqueueing is
+idempotent and a changed file gets a new job. Workers claim jobs with a
+lease; a job whose worker died is picked up again once the lease expires,
+and failures are retried with exponential backoff up to --max-attempts.
+Output goes to a directory versioned by the ETag and the master playlist
+is written last, so a re-run overwrites the same files and a half-finished
+upload is never referenced. Finished jobs set `reels.hls_key`, which
+/api/reels then returns as `hls`.
+
+Requires ffmpeg and ffprobe on PATH.
+
+Queue new/changed reels:  python hls_packaging.py enqueue --source s3
+Run workers:              python hls_packaging.py work --source s3 [--interval 10]
+Queue and throughput:     python hls_packaging.py stats
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from s3_listing import split_key
+from video_metadata import probe
+
+logger = logging.getLogger(__name__)
+
+# (short side in pixels, video bitrate, audio bitrate); rungs taller than the source are skipped
+LADDER = (
+    (360, 600_000, 64_000),
+    (540, 1_200_000, 96_000),
+    (720, 2_500_000, 128_000),
+)
+SEGMENT_SECONDS = 4
+MASTER_PLAYLIST = 'master.m3u8'
+
+CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+}
+
+ENQUEUE_QUERY = """
+    INSERT IGNORE INTO hls_jobs (reel_id, etag)
+    SELECT id, etag FROM reels
+    WHERE source = %s AND deleted_at IS NULL AND etag IS NOT NULL
+      AND (hls_etag IS NULL OR hls_etag <> etag)
+"""
+
+# Pending jobs of one source that are due, plus running ones whose lease ran
+# out. SKIP LOCKED (MySQL 8.0+) lets concurrent workers pick disjoint jobs.
+PICK_QUERY = """
+    SELECT j.id FROM hls_jobs j JOIN reels r ON r.id = j.reel_id
+    WHERE r.source = %s
+      AND ((j.status = 'pending' AND j.run_after <= NOW())
+        OR (j.status = 'running' AND j.claimed_at < NOW() - INTERVAL %s SECOND))
+    ORDER BY j.id
+    LIMIT %s
+    FOR UPDATE OF j SKIP LOCKED
+"""
+
+CLAIM_QUERY = """
+    UPDATE hls_jobs SET status = 'running', claimed_by = %s, claimed_at = NOW(), attempts = attempts + 1
+    WHERE id IN ({ids})
+"""
+
+CLAIMED_QUERY = """
+    SELECT j.id, j.reel_id, j.etag, j.attempts, r.object_key, r.filename,
+           r.etag AS current_etag, r.deleted_at
+    FROM hls_jobs j JOIN reels r ON r.id = j.reel_id
+    WHERE j.claimed_by = %s AND j.status = 'running'
+"""
+
+DONE_QUERY = """
+    UPDATE hls_jobs SET status = %s, hls_key = %s, error = NULL, finished_at = NOW(),
+        source_seconds = %s, work_seconds = %s
+    WHERE id = %s AND claimed_by = %s
+"""
+
+# Only publish the playlist if the file has not changed since the job was queued
+PUBLISH_QUERY = "UPDATE reels SET hls_key = %s, hls_etag = %s WHERE id = %s AND etag = %s"
+
+RETRY_QUERY = """
+    UPDATE hls_jobs SET
+        status = IF(attempts >= %s, 'failed', 'pending'),
+        run_after = NOW() + INTERVAL %s SECOND,
+        finished_at = IF(attempts >= %s, NOW(), NULL),
+        claimed_by = NULL,
+        error = %s,
+        work_seconds = %s
+    WHERE id = %s AND claimed_by = %s
+"""
+
+
+def renditions(width, height, ladder=LADDER):
+    """Ladder rungs that fit the source, as (width, height, video bitrate, audio bitrate)"""
+    if not width or not height:
+        raise ValueError('Source has no video stream')
+    short = min(width, height)
+    rungs = [rung for rung in ladder if rung[0] <= short] or [ladder[0]]
+    result = []
+    for side, video_bitrate, audio_bitrate in rungs:
+        scale = min(1.0, side / short)
+        # H.264 needs even dimensions
+        result.append((
+            max(2, round(width * scale / 2) * 2),
+            max(2, round(height * scale / 2) * 2),
+            video_bitrate,
+            audio_bitrate,
+        ))
+    return result
+
+
+def ffmpeg_command(source, output_dir, rungs, has_audio, threads=1):
+    """One ffmpeg run that decodes once and encodes every rendition into HLS"""
+    split = f"[0:v]split={len(rungs)}" + ''.join(f'[s{i}]' for i in range(len(rungs)))
+    scales = [f'[s{i}]scale={w}:{h}[v{i}]' for i, (w, h, _, _) in enumerate(rungs)]
+    command = [
+        'ffmpeg', '-v', 'error', '-y', '-threads', str(threads), '-i', source,
+        '-filter_complex', ';'.join([split] + scales), '-filter_complex_threads', str(threads),
+    ]
+    streams = []
+    for i, (_, _, video_bitrate, audio_bitrate) in enumerate(rungs):
+        command += [
+            '-map', f'[v{i}]',
+            f'-b:v:{i}', str(video_bitrate),
+            f'-maxrate:v:{i}', str(int(video_bitrate * 1.1)),
+            f'-bufsize:v:{i}', str(video_bitrate * 2),
+        ]
+        if has_audio:
+            command += ['-map', '0:a:0', f'-b:a:{i}', str(audio_bitrate)]
+            streams.append(f'v:{i},a:{i}')
+        else:
+            streams.append(f'v:{i}')
+    command += [
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+        # A keyframe at every segment boundary so all renditions switch cleanly
+        '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})', '-sc_threshold', '0',
+    ]
+    if has_audio:
+        command += ['-c:a', 'aac', '-ac', '2', '-ar', '48000']
+    command += [
+        '-f', 'hls', '-hls_time', str(SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(output_dir, 'v%v', 'seg_%05d.ts'),
+        '-master_pl_name', MASTER_PLAYLIST,
+        '-var_stream_map', ' '.join(streams),
+        os.path.join(output_dir, 'v%v', 'index.m3u8'),
+    ]
+    return command
+
+
+def package_video(job):
+    """Probe one video and package it into ``job['output_dir']`` (runs in a pool worker)"""
+    started = time.monotonic()
+    try:
+        metadata = probe(job['input'])
+        rungs = renditions(metadata['width'], metadata['height'])
+        duration = metadata['duration'] or 0
+        subprocess.run(
+            ffmpeg_command(job['input'], job['output_dir'], rungs, metadata['has_audio'], job['threads']),
+            capture_output=True, check=True,
+            # Generous: veryfast x264 runs well above real time even on one core
+            timeout=max(600, duration * 20)
+        )
+        return {'id': job['id'], 'error': None, 'duration': duration,
+                'renditions': len(rungs), 'work_seconds': time.monotonic() - started}
+    except subprocess.CalledProcessError as e:
+        error = (e.stderr or b'').decode(errors='replace').strip().splitlines()
+        message = error[-1] if error else str(e)
+    except Exception as e:
+        message = str(e) or e.__class__.__name__
+    return {'id': job['id'], 'error': message[:255], 'duration': None,
+            'renditions': 0, 'work_seconds': time.monotonic() - started}
+
+
+def output_name(row):
+    """Directory for a reel's HLS output, versioned by the ETag it was packaged from"""
+    stem = os.path.splitext(os.path.basename(row['object_key']))[0]
+    return f"{stem}-{row['etag'][:12]}"
+
+
+def output_files(output_dir):
+    """Relative paths of the packaged files, with the master playlist last"""
+    files = []
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(root, name), output_dir).replace(os.sep, '/'))
+    files.sort(key=lambda path: (path == MASTER_PLAYLIST, path))
+    return files
+
+
+class HLSPackager:
+    """Claims queued jobs for one source and packages them on a process pool.
+
+    ``resolve_input(row)`` returns the path or URL ffmpeg should read, and
+    ``store_output(row, output_dir)`` publishes a finished directory,
+    returning the master playlist's ``hls_key``. Each job uses ``threads``
+    ffmpeg threads, so ``workers * threads`` should roughly match the cores
+    available.
+    """
+
+    def __init__(self, connect, source, resolve_input, store_output, workers=None, threads=1,
+                 max_attempts=3, retry_delay=60, lease=1800):
+        self._connect = connect
+        self.source = source
+        self._resolve_input = resolve_input
+        self._store_output = store_output
+        self.threads = max(1, threads)
+        self.workers = workers or max(1, (os.cpu_count() or 1) // self.threads)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+
+    def _execute(self, query, args=(), fetch=False):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            count = cursor.execute(query, args)
+            rows = cursor.fetchall() if fetch else None
+            conn.commit()
+            cursor.close()
+            return rows if fetch else count
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self):
+        """Queue a job for every active reel whose current ETag is not packaged yet"""
+        return self._execute(ENQUEUE_QUERY, (self.source,))
+
+    def claim(self, limit):
+        """Lease up to ``limit`` due jobs; jobs for deleted or changed files are skipped"""
+        token = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(PICK_QUERY, (self.source, self.lease, limit))
+            ids = [row['id'] for row in cursor.fetchall()]
+            if ids:
+                cursor.execute(CLAIM_QUERY.format(ids=', '.join(['%s'] * len(ids))), (token, *ids))
+            conn.commit()
+            cursor.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        if not ids:
+            return []
+
+        jobs = []
+        for row in self._execute(CLAIMED_QUERY, (token,), fetch=True):
+            row['token'] = token
+            if row['deleted_at'] is not None or row['current_etag'] != row['etag']:
+                self._execute(DONE_QUERY, ('skipped', None, None, None, row['id'], token))
+            else:
+                jobs.append(row)
+        return jobs
+
+    def run(self, limit=None, interval=0):
+        """Process jobs until the queue is empty
+
+        With ``interval``, keeps polling instead: newly synced reels are
+        queued and claimed every ``interval`` seconds while idle.
+
+        Returns a throughput summary; ``videos_per_core_hour`` counts every
+        core the pool may use, idle time included.
+        """
+        started = time.monotonic()
+        summary = {'source': self.source, 'processed': 0, 'failed': 0, 'retried': 0, 'source_seconds': 0.0}
+        claimed = 0
+        workroot = tempfile.mkdtemp(prefix='reel-hls-')
+        # spawn, not fork: the parent has the app's threads and sockets
+        context = multiprocessing.get_context('spawn')
+        in_flight = {}
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+                while True:
+                    free = self.workers - len(in_flight)
+                    if limit is not None:
+                        free = min(free, limit - claimed)
+                    if free > 0:
+                        for job in self.claim(free):
+                            claimed += 1
+                            job['output_dir'] = os.path.join(workroot, str(job['id']))
+                            os.makedirs(job['output_dir'])
+                            future = pool.submit(package_video, {
+                                'id': job['id'],
+                                'input': self._resolve_input(job),
+                                'output_dir': job['output_dir'],
+                                'threads': self.threads,
+                            })
+                            in_flight[future] = job
+                    if not in_flight:
+                        if not interval or (limit is not None and claimed >= limit):
+                            break
+                        time.sleep(interval)
+                        self.enqueue()
+                        continue
+                    done, _ = wait(in_flight, timeout=interval or None, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = in_flight.pop(future)
+                        try:
+                            self._finish(job, future.result(), summary)
+                        finally:
+                            shutil.rmtree(job['output_dir'], ignore_errors=True)
+        finally:
+            shutil.rmtree(workroot, ignore_errors=True)
+
+        elapsed = time.monotonic() - started
+        core_hours = elapsed * self.workers * self.threads / 3600
+        summary.update(
+            duration=elapsed,
+            workers=self.workers,
+            threads=self.threads,
+            videos_per_core_hour=summary['processed'] / core_hours if core_hours else 0.0,
+            realtime_factor=summary['source_seconds'] / (elapsed * self.workers * self.threads) if elapsed else 0.0,
+        )
+        return summary
+
+    def _finish(self, job, result, summary):
+        error = result['error']
+        hls_key = None
+        if error is None:
+            try:
+                hls_key = self._store_output(job, job['output_dir'])
+            except Exception as e:
+                error = f'Upload failed: {e}'[:255]
+
+        if error is None:
+            self._execute(DONE_QUERY, ('done', hls_key, result['duration'], result['work_seconds'],
+                                       job['id'], job['token']))
+            self._execute(PUBLISH_QUERY, (hls_key, job['etag'], job['reel_id'], job['etag']))
+            summary['processed'] += 1
+            summary['source_seconds'] += result['duration'] or 0
+            logger.info("Packaged %s into %d renditions in %.1fs", job['object_key'], result['renditions'],
+                        result['work_seconds'], extra={'event': 'hls_packaged'})
+            return
+
+        # Exponential backoff: retry_delay, 2x, 4x, ...
+        delay = self.retry_delay * 2 ** (job['attempts'] - 1)
+        self._execute(RETRY_QUERY, (self.max_attempts, delay, self.max_attempts, error,
+                                    result['work_seconds'], job['id'], job['token']))
+        if job['attempts'] >= self.max_attempts:
+            summary['failed'] += 1
+            logger.error("Packaging %s failed after %d attempts: %s", job['object_key'], job['attempts'], error,
+                         extra={'event': 'hls_error'})
+        else:
+            summary['retried'] += 1
+            logger.warning("Packaging %s failed (attempt %d), retrying in %ds: %s", job['object_key'],
+                           job['attempts'], delay, error, extra={'event': 'hls_error'})
+
+    def stats(self):
+        """Queue depth by status, and throughput of jobs finished in the last hour"""
+        counts = {
+            row['status']: row['jobs']
+            for row in self._execute("SELECT status, COUNT(*) AS jobs FROM hls_jobs GROUP BY status", fetch=True)
+        }
+        recent = self._execute(
+            "SELECT COUNT(*) AS jobs, SUM(work_seconds) AS work, SUM(source_seconds) AS media "
+            "FROM hls_jobs WHERE status = 'done' AND finished_at > NOW() - INTERVAL 1 HOUR",
+            fetch=True
+        )[0]
+        work = float(recent['work'] or 0)
+        return {
+            'jobs': counts,
+            'done_last_hour': recent['jobs'],
+            # Each job occupies ``threads`` cores for its work_seconds
+            'videos_per_core_hour': recent['jobs'] * 3600 / (work * self.threads) if work else None,
+            'realtime_factor': float(recent['media'] or 0) / (work * self.threads) if work else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Package reels into adaptive-bitrate HLS')
+    parser.add_argument('command', choices=['enqueue', 'work', 'stats'])
+    parser.add_argument('--source', choices=['s3', 'local'], default='s3')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Concurrent jobs (default: CPU count / --threads)')
+    parser.add_argument('--threads', type=int, default=1, help='ffmpeg threads per job')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after claiming this many jobs')
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--retry-delay', type=int, default=60, help='Seconds before the first retry, doubling after')
+    parser.add_argument('--lease', type=int, default=1800,
+                        help='Seconds before a running job is considered abandoned and retried')
+    parser.add_argument('--interval', type=int, default=0,
+                        help='With work: seconds between polls for new jobs; 0 exits when the queue is empty')
+    args = parser.parse_args()
+
+    if args.command == 'work' and (not shutil.which('ffprobe') or not shutil.which('ffmpeg')):
+        parser.error('ffmpeg and ffprobe must be installed and on PATH')
+
+    # Imported here so spawned pool workers, which only need package_video, stay light
+    import app
+
+    if args.source == 's3':
+        s3_client = app.get_s3_client()
+        if not s3_client:
+            parser.error('S3 is not configured (set S3_BUCKET_NAME and AWS credentials)')
+        bucket = app.S3_CONFIG['bucket_name']
+        hls_prefix = app.S3_CONFIG['hls_prefix'].rstrip('/') + '/'
+
+        def resolve_input(row):
+            # Reels from other S3_SOURCES buckets have s3://bucket/key object keys
+            source_bucket, key = split_key(row['object_key'], bucket)
+            return s3_client.generate_presigned_url(
+                'get_object', Params={'Bucket': source_bucket, 'Key': key}, ExpiresIn=6 * 3600
+            )
+
+        def store_output(row, output_dir):
+            prefix = hls_prefix + output_name(row) + '/'
+            files = output_files(output_dir)
+
+            def upload(path):
+                s3_client.upload_file(os.path.join(output_dir, path), bucket, prefix + path, ExtraArgs={
+                    'ContentType': CONTENT_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream'),
+                    # The directory is versioned by ETag, so its contents never change
+                    'CacheControl': 'public, max-age=31536000, immutable'
+                })
+
+            with ThreadPoolExecutor(max_workers=8) as uploads:
+                list(uploads.map(upload, files[:-1]))
+            upload(files[-1])
+            return prefix + MASTER_PLAYLIST
+
+        source = 'S3'
+    else:
+        reels_dir = os.path.join(app.app.static_folder, 'reels')
+        hls_dir = os.path.join(app.app.static_folder, 'hls')
+
+        def resolve_input(row):
+            return os.path.join(reels_dir, row['object_key'])
+
+        def store_output(row, output_dir):
+            name = output_name(row)
+            dest = os.path.join(hls_dir, name)
+            os.makedirs(hls_dir, exist_ok=True)
+            # Copy next to the destination, then swap it in with one rename
+            staging = tempfile.mkdtemp(prefix=f'.{name}-', dir=hls_dir)
+            shutil.copytree(output_dir, staging, dirs_exist_ok=True)
+            shutil.rmtree(dest, ignore_errors=True)
+            os.rename(staging, dest)
+            return f'{name}/{MASTER_PLAYLIST}'
+
+        source = 'local'
+
+    packager = HLSPackager(
+        app.get_db_connection, source, resolve_input, store_output,
+        workers=args.workers, threads=args.threads, max_attempts=args.max_attempts,
+        retry_delay=args.retry_delay, lease=args.lease
+    )
+
+    if args.command == 'enqueue':
+        print(f"Queued {packager.enqueue()} {source} reels for packaging")
+    elif args.command == 'stats':
+        stats = packager.stats()
+        print(f"Jobs: {', '.join(f'{status}={count}' for status, count in sorted(stats['jobs'].items())) or 'none'}")
+        if stats['videos_per_core_hour'] is not None:
+            print(f"Last hour: {stats['done_last_hour']} videos, {stats['videos_per_core_hour']:.1f} videos/core-hour, "
+                  f"{stats['realtime_factor']:.2f}x real time per core")
+    else:
+        packager.enqueue()
+        result = packager.run(limit=args.limit, interval=args.interval)
+        print(
+            f"Packaged {result['processed']} {result['source']} reels in {result['duration']:.1f}s "
+            f"({result['failed']} failed, {result['retried']} to retry) on {result['workers']} workers x "
+            f"{result['threads']} threads: {result['videos_per_core_hour']:.1f} videos/core-hour, "
+            f"{result['realtime_factor']:.2f}x real time per core"
+        )
+
+
+if __name__ == '__main__':
+    main()
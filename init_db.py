@@ -65,7 +65,7 @@ try:
     cursor.execute(create_users_table)
     print("Table 'users' created or already exists")
     
-    # Create reels table (updated to use local file paths)
+    # Create reels table (kept in sync with S3/local files by catalog_sync.py)
     create_table_query = """
     CREATE TABLE IF NOT EXISTS reels (
         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -73,36 +73,136 @@ try:
         title VARCHAR(200),
         description TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        INDEX idx_created_at (created_at)
+        source VARCHAR(10) NOT NULL DEFAULT 'local',
+        object_key VARCHAR(512) NOT NULL,
+        etag VARCHAR(64),
+        size_bytes BIGINT,
+        last_modified DATETIME,
+        deleted_at DATETIME NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        duration_seconds DECIMAL(10, 3),
+        width INT,
+        height INT,
+        bitrate INT,
+        poster_key VARCHAR(512),
+        metadata_etag VARCHAR(64),
+        metadata_error VARCHAR(255),
+        metadata_attempts INT NOT NULL DEFAULT 0,
+        metadata_retry_after DATETIME NULL,
+        hls_key VARCHAR(512),
+        hls_etag VARCHAR(64),
+        UNIQUE KEY uniq_source_key (source, object_key),
+        INDEX idx_created_at (created_at),
+        INDEX idx_active (deleted_at, id),
+        INDEX idx_updated_at (updated_at)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
     """
     
     cursor.execute(create_table_query)
     print("Table 'reels' created or already exists")
     
-    # Insert sample data if table is empty
+    # Add catalog sync, video metadata and HLS columns to reels tables created by older versions
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'reels'",
+        (db_name,)
+    )
+    existing_columns = {row[0] for row in cursor.fetchall()}
+    reels_migrations = [
+        ('source', "ADD COLUMN source VARCHAR(10) NOT NULL DEFAULT 'local'"),
+        ('object_key', "ADD COLUMN object_key VARCHAR(512) NULL"),
+        ('etag', "ADD COLUMN etag VARCHAR(64)"),
+        ('size_bytes', "ADD COLUMN size_bytes BIGINT"),
+        ('last_modified', "ADD COLUMN last_modified DATETIME"),
+        ('deleted_at', "ADD COLUMN deleted_at DATETIME NULL"),
+        ('updated_at', "ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+        ('duration_seconds', "ADD COLUMN duration_seconds DECIMAL(10, 3)"),
+        ('width', "ADD COLUMN width INT"),
+        ('height', "ADD COLUMN height INT"),
+        ('bitrate', "ADD COLUMN bitrate INT"),
+        ('poster_key', "ADD COLUMN poster_key VARCHAR(512)"),
+        ('metadata_etag', "ADD COLUMN metadata_etag VARCHAR(64)"),
+        ('metadata_error', "ADD COLUMN metadata_error VARCHAR(255)"),
+        ('metadata_attempts', "ADD COLUMN metadata_attempts INT NOT NULL DEFAULT 0"),
+        ('metadata_retry_after', "ADD COLUMN metadata_retry_after DATETIME NULL"),
+        ('hls_key', "ADD COLUMN hls_key VARCHAR(512)"),
+        ('hls_etag', "ADD COLUMN hls_etag VARCHAR(64)"),
+    ]
+    for column, ddl in reels_migrations:
+        if column not in existing_columns:
+            cursor.execute(f"ALTER TABLE reels {ddl}")
+            print(f"Added column 'reels.{column}'")
+    if 'object_key' not in existing_columns:
+        cursor.execute("UPDATE reels SET object_key = filename WHERE object_key IS NULL")
+        cursor.execute("ALTER TABLE reels MODIFY object_key VARCHAR(512) NOT NULL")
+        cursor.execute("ALTER TABLE reels ADD UNIQUE KEY uniq_source_key (source, object_key)")
+        cursor.execute("ALTER TABLE reels ADD INDEX idx_active (deleted_at, id)")
+    # The app polls MAX(updated_at) to notice catalog changes
+    cursor.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'reels'",
+        (db_name,)
+    )
+    if 'idx_updated_at' not in {row[0] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE reels ADD INDEX idx_updated_at (updated_at)")
+        print("Added index 'reels.idx_updated_at'")
+    
+    # Create reel_views table (per-reel view counts, written in batches by the app)
+    create_views_table = """
+    CREATE TABLE IF NOT EXISTS reel_views (
+        reel_id INT PRIMARY KEY,
+        views BIGINT NOT NULL DEFAULT 0,
+        last_viewed_at DATETIME,
+        INDEX idx_views (views)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """
+    
+    cursor.execute(create_views_table)
+    print("Table 'reel_views' created or already exists")
+    
+    # Create user_seen_reels table (zlib-compressed bitmap of watched reel IDs per user; see seen_reels.py)
+    create_seen_table = """
+    CREATE TABLE IF NOT EXISTS user_seen_reels (
+        user_id INT PRIMARY KEY,
+        seen MEDIUMBLOB NOT NULL,
+        seen_count INT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """
+    
+    cursor.execute(create_seen_table)
+    print("Table 'user_seen_reels' created or already exists")
+    
+    # Create hls_jobs table (HLS packaging queue, one job per reel version; see hls_packaging.py)
+    create_hls_jobs_table = """
+    CREATE TABLE IF NOT EXISTS hls_jobs (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        reel_id INT NOT NULL,
+        etag VARCHAR(64) NOT NULL,
+        status VARCHAR(10) NOT NULL DEFAULT 'pending',
+        attempts INT NOT NULL DEFAULT 0,
+        run_after DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        claimed_by VARCHAR(32),
+        claimed_at DATETIME,
+        hls_key VARCHAR(512),
+        error VARCHAR(255),
+        source_seconds DECIMAL(10, 3),
+        work_seconds DECIMAL(10, 3),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at DATETIME,
+        UNIQUE KEY uniq_reel_etag (reel_id, etag),
+        INDEX idx_claim (status, run_after),
+        INDEX idx_claimed_by (claimed_by)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """
+    
+    cursor.execute(create_hls_jobs_table)
+    print("Table 'hls_jobs' created or already exists")
+    
+    # Reels are loaded by bulk_import.py (streaming, resumable) rather than here
     cursor.execute("SELECT COUNT(*) FROM reels")
     count = cursor.fetchone()[0]
     
     if count == 0:
-        # Get list of video files from static/reels folder
-        import os
-        reels_dir = os.path.join(os.path.dirname(__file__), 'static', 'reels')
-        sample_reels = []
-        
-        if os.path.exists(reels_dir):
-            video_files = [f for f in os.listdir(reels_dir) if f.endswith(('.mp4', '.webm', '.mov'))]
-            for filename in video_files:
-                # Extract title from filename (remove extension and clean up)
-                title = filename.rsplit('.', 1)[0].replace('_', ' ').replace('-', ' ')
-                sample_reels.append((filename, title, f"Video: {title}"))
-        
-        if sample_reels:
-            insert_query = "INSERT INTO reels (filename, title, description) VALUES (%s, %s, %s)"
-            cursor.executemany(insert_query, sample_reels)
-            print(f"Inserted {len(sample_reels)} reels from static/reels folder")
-        else:
-            print("No video files found in static/reels folder")
+        print("The reels table is empty. Load videos with: python bulk_import.py local (or s3 / inventory)")
     
     conn.commit()
     cursor.close()
@@ -0,0 +1,221 @@
+"""
+Local reels index
+In-memory, sorted index of the video files in static/reels. Built once with
+a directory scan and then kept current incrementally: through filesystem
+notifications when the optional `watchdog` package is installed (inotify on
+Linux), otherwise by polling the directory's mtime and rescanning only when
+it changes. Requests read from the index and never touch the filesystem.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+
+def stat_video(path, name):
+    """Metadata dict for one video file, as used by the catalog"""
+    stat = os.stat(path)
+    return {
+        'key': name,
+        'filename': name,
+        'etag': f"{stat.st_size:x}-{stat.st_mtime_ns:x}",
+        'size': stat.st_size,
+        'last_modified': datetime.fromtimestamp(stat.st_mtime)
+    }
+
+
+def scan_directory(directory, extensions):
+    """Return metadata dicts for every video file in ``directory``, sorted by name"""
+    objects = []
+    if os.path.exists(directory):
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.lower().endswith(extensions):
+                objects.append(stat_video(entry.path, entry.name))
+    return sorted(objects, key=lambda obj: obj['filename'])
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, index):
+        self._index = index
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            if path and os.path.dirname(os.path.abspath(path)) == self._index.directory:
+                self._index.refresh_file(os.path.basename(path))
+
+
+class LocalReelIndex:
+    """Sorted index of one directory's video files.
+
+    ``fingerprint`` is called with the catalog entries whenever they change
+    to produce the catalog version, mirroring CatalogCache. ``assign_ids``,
+    if given, is called with the metadata dicts of every file and returns
+    {filename: id} for all of them without blocking; entries are numbered
+    by position otherwise. ``invalidate()`` rebuilds the catalog once files
+    served under a provisional ID have their stored one.
+    """
+
+    def __init__(self, directory, extensions, fingerprint=None, poll_interval=2.0, use_watchdog=True,
+                 assign_ids=None):
+        self.directory = os.path.abspath(directory)
+        self.extensions = extensions
+        self.poll_interval = poll_interval
+        self._fingerprint = fingerprint
+        self._assign_ids = assign_ids
+        self._use_watchdog = use_watchdog and Observer is not None
+
+        self._lock = threading.Lock()
+        self._objects = {}   # filename -> metadata dict
+        self._names = []     # sorted filenames
+        self._dir_mtime = None
+        self._started = False
+        self._observer = None
+
+        self._catalog = None  # (entries, version, changed_at), rebuilt lazily after changes
+        self._changed_at = None
+        self._stats = {'scans': 0, 'file_updates': 0, 'rebuilds': 0}
+
+    def start(self):
+        """Build the index and start watching the directory (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.rescan()
+        self._watch()
+
+    def _watch(self):
+        if self._use_watchdog and os.path.isdir(self.directory):
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.directory, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        elif self.poll_interval > 0:
+            threading.Thread(target=self._poll, name='local-index-poll', daemon=True).start()
+
+    def after_fork(self):
+        """Restart watching in a forked child; the parent's watcher thread is not inherited"""
+        self._lock = threading.Lock()
+        self._observer = None
+        if self._started:
+            self._watch()
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns if os.path.exists(self.directory) else None
+                if mtime != self._dir_mtime:
+                    self.rescan()
+            except Exception as e:
+                logger.error("Error polling %s: %s", self.directory, e)
+
+    def rescan(self):
+        """Full scan of the directory, replacing the index contents"""
+        mtime = os.stat(self.directory).st_mtime_ns if os.path.exists(self.directory) else None
+        objects = scan_directory(self.directory, self.extensions)
+        with self._lock:
+            old = self._objects
+            self._objects = {obj['filename']: obj for obj in objects}
+            self._names = [obj['filename'] for obj in objects]
+            self._dir_mtime = mtime
+            self._stats['scans'] += 1
+            if old.keys() != self._objects.keys() or any(
+                    old[name]['etag'] != obj['etag'] for name, obj in self._objects.items() if name in old):
+                self._catalog = None
+
+    def refresh_file(self, name):
+        """Re-stat a single file after a change notification"""
+        if not name.lower().endswith(self.extensions):
+            return
+        path = os.path.join(self.directory, name)
+        try:
+            obj = stat_video(path, name) if os.path.isfile(path) else None
+        except FileNotFoundError:
+            obj = None
+
+        with self._lock:
+            self._stats['file_updates'] += 1
+            existing = self._objects.get(name)
+            if obj is None:
+                if existing is None:
+                    return
+                del self._objects[name]
+                del self._names[bisect.bisect_left(self._names, name)]
+            else:
+                if existing is not None and existing['etag'] == obj['etag']:
+                    return
+                if existing is None:
+                    bisect.insort(self._names, name)
+                self._objects[name] = obj
+            self._catalog = None
+
+    def get_versioned(self):
+        """Return (entries, version, changed_at) in the same shape as CatalogCache"""
+        self.start()
+        with self._lock:
+            if self._catalog is None:
+                if self._assign_ids is not None:
+                    ids = self._assign_ids([self._objects[name] for name in self._names])
+                else:
+                    ids = {name: idx for idx, name in enumerate(self._names, start=1)}
+                entries = [
+                    {
+                        'id': ids[name],
+                        'filename': name,
+                        'key': name,
+                        'etag': self._objects[name]['etag'],
+                        'created_at': self._objects[name]['last_modified'],
+                        'source': 'local'
+                    }
+                    for name in self._names
+                ]
+                version = self._fingerprint(entries) if self._fingerprint else None
+                self._changed_at = time.time()
+                self._catalog = (entries, version, self._changed_at)
+                self._stats['rebuilds'] += 1
+            return self._catalog
+
+    def get(self):
+        return self.get_versioned()[0]
+
+    def invalidate(self):
+        """Rebuild the catalog on the next read, e.g. once new reel IDs are known"""
+        with self._lock:
+            self._catalog = None
+
+    def objects(self):
+        """Metadata dicts for every indexed file, sorted by name"""
+        self.start()
+        with self._lock:
+            return [self._objects[name] for name in self._names]
+
+    def filenames(self):
+        """Sorted list of indexed filenames"""
+        self.start()
+        with self._lock:
+            return list(self._names)
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['size'] = len(self._names)
+            snapshot['mode'] = 'watchdog' if self._observer is not None else 'poll'
+        return snapshot
@@ -0,0 +1,160 @@
+"""
+Local media serving
+Serves video files from disk with full HTTP Range support (single and
+multiple ranges), strong validators and long-lived caching. Full files and
+single ranges are handed to the server's wsgi.file_wrapper (sendfile under
+gunicorn); otherwise bytes are streamed from a memory map so files are never
+buffered whole in Python.
+"""
+import mimetypes
+import mmap
+import os
+import secrets
+
+from flask import Response
+
+MAX_RANGES = 16  # More ranges than this are answered with the full file
+
+# HLS output from hls_packaging.py; many systems map .ts to TypeScript or Qt Linguist
+mimetypes.add_type('video/mp2t', '.ts')
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+
+
+def file_etag(stat):
+    """Strong validator for a file: size and modification time"""
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def resolve_ranges(range_header, size):
+    """Turn a parsed Range header into sorted, merged (start, stop) byte ranges
+
+    Returns None when the whole file should be sent and [] when none of the
+    ranges can be satisfied (416).
+    """
+    if range_header is None or range_header.units != 'bytes':
+        return None
+    if len(range_header.ranges) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for start, stop in range_header.ranges:
+        if start < 0:
+            # Suffix range: the last -start bytes
+            start, stop = max(0, size + start), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append((start, stop))
+
+    ranges.sort()
+    merged = []
+    for start, stop in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def _mmap_chunks(fileobj, ranges, chunk_size, parts=None):
+    """Yield bytes for the given ranges from a read-only memory map
+
+    ``parts`` optionally gives a (header, footer) pair per range for
+    multipart/byteranges bodies.
+    """
+    try:
+        with mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for index, (start, stop) in enumerate(ranges):
+                    if parts:
+                        yield parts[index][0]
+                    for offset in range(start, stop, chunk_size):
+                        yield bytes(view[offset:min(offset + chunk_size, stop)])
+                    if parts:
+                        yield parts[index][1]
+            finally:
+                view.release()
+    finally:
+        fileobj.close()
+
+
+def send_local_file(request, path, chunk_size=256 * 1024):
+    """Build a (possibly partial) response for a file on disk"""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    response = Response(mimetype=mimetype)
+    response.set_etag(etag)
+    response.last_modified = int(stat.st_mtime)
+    response.accept_ranges = 'bytes'
+
+    if request.if_none_match:
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+    elif request.if_modified_since and int(stat.st_mtime) <= request.if_modified_since.timestamp():
+        response.status_code = 304
+        return response
+
+    # If-Range: only honour Range when the client's copy is still current
+    if_range = request.if_range
+    if if_range.etag is not None:
+        range_allowed = if_range.etag == etag
+    elif if_range.date is not None:
+        range_allowed = int(stat.st_mtime) <= if_range.date.timestamp()
+    else:
+        range_allowed = True
+    ranges = resolve_ranges(request.range, size) if range_allowed else None
+
+    if ranges == []:
+        response.status_code = 416
+        response.headers['Content-Range'] = f'bytes */{size}'
+        response.content_length = 0
+        return response
+
+    fileobj = open(path, 'rb')
+    # Also covers HEAD requests, where the body is never iterated
+    response.call_on_close(fileobj.close)
+    if ranges is None or len(ranges) == 1 or size == 0:
+        start, stop = ranges[0] if ranges else (0, size)
+        if ranges:
+            response.status_code = 206
+            response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        response.content_length = stop - start
+
+        file_wrapper = request.environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            # The server sends Content-Length bytes from the current offset,
+            # using sendfile() where it can
+            fileobj.seek(start)
+            response.response = file_wrapper(fileobj, chunk_size)
+            response.direct_passthrough = True
+        elif size == 0:
+            fileobj.close()
+        else:
+            response.response = _mmap_chunks(fileobj, [(start, stop)], chunk_size)
+        return response
+
+    # Multiple ranges: multipart/byteranges
+    boundary = secrets.token_hex(16)
+    parts = [
+        (
+            f"\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n".encode(),
+            b''
+        )
+        for start, stop in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    parts[-1] = (parts[-1][0], closing)
+
+    response.status_code = 206
+    response.mimetype = 'multipart/byteranges'
+    response.headers['Content-Type'] = f'multipart/byteranges; boundary={boundary}'
+    response.content_length = sum(len(head) + (stop - start) + len(tail)
+                                  for (head, tail), (start, stop) in zip(parts, ranges))
+    response.response = _mmap_chunks(fileobj, ranges, chunk_size, parts)
+    return response
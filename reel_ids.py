@@ -0,0 +1,204 @@
+"""
+Stable reel IDs
+Live catalogs (S3 listings and static/reels) have no IDs of their own, and
+numbering them by listing position shifts every ID after an upload or a
+delete. This registry hands out the `reels` table's AUTO_INCREMENT ID for
+each (source, object key) instead, registering keys it has not seen with
+the same upsert catalog_sync.py uses. IDs therefore survive catalog
+changes, stay small and dense (which the per-user seen bitmaps rely on),
+agree across worker processes and match CATALOG_SOURCE=db.
+
+Lookups never wait on MySQL: keys without a known ID are registered by a
+background thread (retrying with backoff while MySQL is unreachable), which
+reports each source it has new IDs for so the catalog can be rebuilt.
+Until then such a key is served under a provisional ID, a hash of source
+and key above every stored ID, so a cold start without MySQL still has a
+feed. Nothing is stored against a provisional ID.
+"""
+import hashlib
+import logging
+import threading
+
+from catalog_sync import UPSERT_QUERY, title_from_filename
+
+logger = logging.getLogger(__name__)
+
+# Far above any AUTO_INCREMENT value, and base + 2**40 stays below 2**53 so
+# browsers read provisional IDs exactly
+PROVISIONAL_ID_BASE = 1 << 48
+
+
+def provisional_id(source, key):
+    """Stable stand-in ID for a key that has no stored ID yet"""
+    digest = hashlib.blake2b(f"{source}\0{key}".encode(), digest_size=5).digest()
+    return PROVISIONAL_ID_BASE + int.from_bytes(digest, 'big')
+
+
+def is_provisional(reel_id):
+    return reel_id >= PROVISIONAL_ID_BASE
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ReelIdRegistry:
+    """Maps (source, object key) to the reel's ID in the `reels` table.
+
+    ``connection`` is a zero-argument callable returning a context manager
+    that yields a DB connection (e.g. ``db_pool.connection``). Known IDs are
+    kept in memory and keep being served while MySQL is down. Keys without
+    one get a provisional ID and are queued for the background thread, which calls
+    ``on_assigned(source)`` once it has registered them; failed attempts are
+    retried after ``retry_interval`` seconds, doubling up to
+    ``max_retry_interval``.
+    """
+
+    def __init__(self, connection, batch_size=500, on_assigned=None, retry_interval=1.0, max_retry_interval=60.0):
+        self._connection = connection
+        self.batch_size = batch_size
+        self.on_assigned = on_assigned
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+
+        self._lock = threading.Lock()
+        self._ids = {}          # source -> {object_key: id}, once its stored IDs are loaded
+        self._pending = {}      # source -> {object_key: listing dict} waiting for an ID
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            'registered': 0,
+            'errors': 0,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='reel-ids', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def assign(self, source, objects):
+        """Return {object_key: id} for the listing dicts (key, filename, etag, size, last_modified)
+
+        Never touches MySQL: keys without a known ID get a provisional_id()
+        and are queued for the background thread.
+        """
+        with self._lock:
+            known = self._ids.get(source, {})
+            missing = {obj['key']: obj for obj in objects if obj['key'] not in known}
+            if missing:
+                self._pending.setdefault(source, {}).update(missing)
+                self._wake.set()
+            return {
+                obj['key']: known[obj['key']] if obj['key'] in known else provisional_id(source, obj['key'])
+                for obj in objects
+            }
+
+    def load(self, source):
+        """Load the stored IDs of a source now (e.g. during warm-up, ahead of the first catalog)"""
+        ids = self._load(source)
+        with self._lock:
+            self._ids.setdefault(source, {}).update(ids)
+
+    def _run(self):
+        delay = 0
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if self.process():
+                delay = 0
+                continue
+            # MySQL is unreachable or failing: back off, then retry what is still pending
+            delay = min(self.max_retry_interval, delay * 2 or self.retry_interval)
+            self._stop.wait(delay)
+            self._wake.set()
+
+    def process(self):
+        """Register every pending key; returns False if some are still pending because of an error"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            loaded = set(self._ids)
+
+        ok = True
+        for source, objects in pending.items():
+            try:
+                ids = self._load(source) if source not in loaded else {}
+                with self._lock:
+                    known = dict(self._ids.get(source, {}), **ids)
+                missing = [obj for key, obj in objects.items() if key not in known]
+                if missing:
+                    ids.update(self._register(source, missing))
+            except Exception as e:
+                ok = False
+                with self._lock:
+                    self._stats['errors'] += 1
+                    for key, obj in objects.items():
+                        self._pending.setdefault(source, {}).setdefault(key, obj)
+                logger.error("Error assigning reel IDs for %s: %s", source, e, extra={'event': 'reel_id_error'})
+                continue
+
+            with self._lock:
+                self._ids.setdefault(source, {}).update(ids)
+                self._stats['registered'] += len(missing)
+            if self.on_assigned is not None:
+                self.on_assigned(source)
+        return ok
+
+    def _load(self, source):
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT object_key, id FROM reels WHERE source = %s", (source,))
+                return {row['object_key']: row['id'] for row in cursor.fetchall()}
+
+    def _register(self, source, objects):
+        """Upsert rows for new keys and read back their IDs"""
+        ids = {}
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                for batch in _batches(objects, self.batch_size):
+                    cursor.executemany(UPSERT_QUERY, [
+                        (
+                            source,
+                            obj['key'],
+                            obj['filename'],
+                            title_from_filename(obj['filename']),
+                            f"Video: {title_from_filename(obj['filename'])}",
+                            obj['etag'],
+                            obj['size'],
+                            obj['last_modified'],
+                            obj['last_modified'],
+                        )
+                        for obj in batch
+                    ])
+                    placeholders = ', '.join(['%s'] * len(batch))
+                    cursor.execute(
+                        f"SELECT object_key, id FROM reels WHERE source = %s AND object_key IN ({placeholders})",
+                        (source, *[obj['key'] for obj in batch])
+                    )
+                    ids.update((row['object_key'], row['id']) for row in cursor.fetchall())
+            conn.commit()
+        return ids
+
+    def after_fork(self):
+        """Restart the background thread in a forked child; keys pending in the parent stay queued"""
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.start()
+        if self._pending:
+            self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['known'] = sum(len(ids) for ids in self._ids.values())
+            snapshot['pending'] = sum(len(objects) for objects in self._pending.values())
+            return snapshot
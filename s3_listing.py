@@ -0,0 +1,180 @@
+"""
+Parallel S3 listing
+Lists several bucket/prefix sources at once on a bounded thread pool. Each
+source can be split further into the sub-prefixes S3 reports under a "/"
+delimiter, so one large folder becomes many independent paginations.
+Results are merged into one deduplicated catalog sorted by filename. A
+source (or shard) that fails is reported and skipped instead of failing
+the whole listing.
+
+Objects outside the default bucket get qualified keys (s3://bucket/key),
+so the rest of the app can keep treating catalog keys as plain strings.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+QUALIFIED_PREFIX = 's3://'
+
+
+def normalize_prefix(prefix):
+    """'reels' / '/reels/' -> 'reels/'; '' and '/' mean the whole bucket"""
+    prefix = prefix.strip().strip('/')
+    return prefix + '/' if prefix else ''
+
+
+def parse_sources(spec, default_bucket, default_prefix):
+    """Parse S3_SOURCES into a list of (bucket, prefix) pairs
+
+    Entries are comma-separated. ``s3://bucket/prefix`` names any bucket;
+    anything else is a prefix in the default bucket. An empty spec means the
+    default bucket and prefix.
+    """
+    sources = []
+    for entry in (spec or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry.startswith(QUALIFIED_PREFIX):
+            bucket, _, prefix = entry[len(QUALIFIED_PREFIX):].partition('/')
+        else:
+            bucket, prefix = default_bucket, entry
+        if bucket:
+            sources.append((bucket, normalize_prefix(prefix)))
+    if not sources and default_bucket:
+        sources.append((default_bucket, normalize_prefix(default_prefix)))
+    return list(dict.fromkeys(sources))
+
+
+def qualify_key(bucket, key, default_bucket):
+    """Catalog key for an object: plain in the default bucket, s3://bucket/key elsewhere"""
+    if bucket == default_bucket:
+        return key
+    return f'{QUALIFIED_PREFIX}{bucket}/{key}'
+
+
+def split_key(key, default_bucket):
+    """Inverse of qualify_key: (bucket, key)"""
+    if key.startswith(QUALIFIED_PREFIX):
+        bucket, _, key = key[len(QUALIFIED_PREFIX):].partition('/')
+        return bucket, key
+    return default_bucket, key
+
+
+def source_name(bucket, prefix):
+    return f'{QUALIFIED_PREFIX}{bucket}/{prefix}'
+
+
+class ParallelLister:
+    """Lists video objects across (bucket, prefix) sources concurrently.
+
+    ``get_client`` returns the S3 client to use (it is looked up per call so
+    a client replaced after fork is picked up). With ``shard_depth`` > 0 each
+    source is first listed with a delimiter, and every sub-prefix found is
+    listed as its own task, recursively up to that many levels.
+
+    ``list()`` returns ``(objects, errors)``: objects are dicts with key,
+    bucket, filename, etag, size and last_modified. Errors are dicts with
+    the configured source the failure belongs to, the prefix (source or
+    shard) that failed and the exception.
+    """
+
+    def __init__(self, get_client, sources, extensions, default_bucket, max_workers=8, shard_depth=0):
+        self._get_client = get_client
+        self.sources = list(sources)
+        self.extensions = tuple(extensions)
+        self.default_bucket = default_bucket
+        self.max_workers = max(1, max_workers)
+        self.shard_depth = max(0, shard_depth)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'listings': 0,
+            'tasks': 0,
+            'pages': 0,
+            'errors': 0,
+            'last_duration': 0.0,
+            'last_tasks': 0,
+            'last_errors': [],
+        }
+
+    def list(self):
+        started = time.monotonic()
+        client = self._get_client()
+        merged = {}
+        errors = []
+        tasks = 0
+        pages = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='s3-list') as pool:
+            # Tasks never wait on each other: shards they discover come back here to be submitted
+            pending = {
+                pool.submit(self._list_prefix, client, bucket, prefix, self.shard_depth):
+                    (bucket, prefix, source_name(bucket, prefix))
+                for bucket, prefix in self.sources
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    bucket, prefix, source = pending.pop(future)
+                    tasks += 1
+                    try:
+                        objects, shards, task_pages = future.result()
+                    except Exception as e:
+                        errors.append({'source': source, 'prefix': prefix, 'error': e})
+                        continue
+                    pages += task_pages
+                    for obj in objects:
+                        merged[obj['key']] = obj
+                    for shard_prefix, depth in shards:
+                        future = pool.submit(self._list_prefix, client, bucket, shard_prefix, depth)
+                        pending[future] = (bucket, shard_prefix, source)
+
+        objects = sorted(merged.values(), key=lambda obj: (obj['filename'], obj['key']))
+        with self._lock:
+            self._stats['listings'] += 1
+            self._stats['tasks'] += tasks
+            self._stats['pages'] += pages
+            self._stats['errors'] += len(errors)
+            self._stats['last_duration'] = time.monotonic() - started
+            self._stats['last_tasks'] = tasks
+            self._stats['last_errors'] = [
+                {'source': error['source'], 'prefix': error['prefix'], 'error': str(error['error'])}
+                for error in errors
+            ]
+        return objects, errors
+
+    def _list_prefix(self, client, bucket, prefix, depth):
+        """One task: returns (objects, [(sub_prefix, depth)], pages)"""
+        paginator = client.get_paginator('list_objects_v2')
+        params = {'Bucket': bucket, 'Prefix': prefix}
+        if depth > 0:
+            params['Delimiter'] = '/'
+        objects = []
+        shards = []
+        pages = 0
+        for page in paginator.paginate(**params):
+            pages += 1
+            for obj in page.get('Contents', ()):
+                filename = os.path.basename(obj['Key'])
+                if filename.lower().endswith(self.extensions):
+                    objects.append({
+                        'key': qualify_key(bucket, obj['Key'], self.default_bucket),
+                        'bucket': bucket,
+                        'filename': filename,
+                        'etag': obj.get('ETag', '').strip('"'),
+                        'size': obj.get('Size'),
+                        'last_modified': obj['LastModified'].replace(tzinfo=None) if obj.get('LastModified') else None
+                    })
+            for common in page.get('CommonPrefixes', ()):
+                shards.append((common['Prefix'], depth - 1))
+        return objects, shards, pages
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot['sources'] = [source_name(bucket, prefix) for bucket, prefix in self.sources]
+        snapshot['max_workers'] = self.max_workers
+        snapshot['shard_depth'] = self.shard_depth
+        return snapshot
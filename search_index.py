@@ -0,0 +1,274 @@
+"""
+Title search index
+In-memory inverted index over normalized reel title tokens, plus a sorted
+list of every distinct token so prefix queries are a bisect away. Posting
+lists hold integer doc ids assigned in catalog order, so appending keeps
+them sorted and the best page of a one-word query is read off the front of
+a few lists. The index follows the catalog incrementally: when the catalog
+version changes only entries that were added, removed or renamed are
+re-indexed, and queries never scan the catalog.
+"""
+import bisect
+import heapq
+import itertools
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from catalog_sync import title_from_filename
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Prefixes up to this length get posting lists of their own; a one-letter
+# query would otherwise merge the lists of thousands of tokens
+PREFIX_LENGTH = 3
+
+
+def normalize(text):
+    """Lowercase and strip accents, so 'Café' and 'cafe' match"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text).replace('_', ' '))
+
+
+def _merge(lists):
+    """Lazy sorted, deduplicated union of sorted doc id lists"""
+    if len(lists) == 1:
+        return iter(lists[0])
+    return (doc_id for doc_id, _ in itertools.groupby(heapq.merge(*lists)))
+
+
+def _index_keys(tokens):
+    """Keys a title is filed under: (tokens, first token, short prefixes, short prefixes of the first token)"""
+    if not tokens:
+        return (), (), (), ()
+    prefixes = {token[:length] for token in tokens for length in range(1, min(len(token), PREFIX_LENGTH) + 1)}
+    first = tokens[0]
+    return tokens, (first,), prefixes, [first[:length] for length in range(1, min(len(first), PREFIX_LENGTH) + 1)]
+
+
+class SearchIndex:
+    """Ranked AND search over the titles of catalog entries.
+
+    Every query term matches title tokens it is a prefix of, so partial
+    words work while typing. Matches are ranked in four tiers: the title
+    starts with the first term as a whole word; every term is a whole word;
+    the title starts with the first term; the rest. Within a tier reels
+    keep catalog order, with reels added by later syncs after the rest.
+
+    One-term queries (the common case while typing) walk the posting lists
+    tier by tier and stop once the page is full, so their cost follows the
+    page size rather than the number of matches. Multi-term queries
+    intersect posting sets. The first ``cache_depth`` ranked ids of the
+    last ``cache_size`` queries are kept until the catalog changes, so
+    repeated queries and further pages are a slice.
+    """
+
+    def __init__(self, cache_size=256, cache_depth=200):
+        self.cache_size = cache_size
+        self.cache_depth = cache_depth
+        self._lock = threading.Lock()
+        self._version = None
+        self._doc_ids = {}          # (source, key) -> doc id
+        self._docs = {}             # doc id -> (entry, tokens)
+        self._postings = {}         # token -> sorted doc ids containing it
+        self._leading = {}          # token -> sorted doc ids whose title starts with it
+        self._prefix_postings = {}  # short prefix -> sorted doc ids with a token starting with it
+        self._prefix_leading = {}   # short prefix -> sorted doc ids whose first token starts with it
+        self._indexes = (self._postings, self._leading, self._prefix_postings, self._prefix_leading)
+        self._tokens = []           # sorted distinct tokens
+        self._next_id = 0
+        self._results = OrderedDict()  # query terms -> (ranked doc ids, total matches)
+        self._stats = {
+            'syncs': 0,
+            'last_sync_duration': 0.0,
+            'last_sync_changes': 0,
+            'queries': 0,
+            'cache_hits': 0,
+        }
+
+    def sync(self, entries, version):
+        """Bring the index up to date with a catalog version (no-op if it already is)"""
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            started = time.perf_counter()
+            changes = 0
+            seen = set()
+            created, dropped = [], []  # tokens whose posting list appeared / emptied
+            for entry in entries:
+                doc_key = (entry['source'], entry['key'])
+                seen.add(doc_key)
+                doc_id = self._doc_ids.get(doc_key)
+                if doc_id is not None and self._docs[doc_id][0]['filename'] == entry['filename']:
+                    # Same title: only refresh the entry (id, ETag and metadata may have changed)
+                    self._docs[doc_id] = (entry, self._docs[doc_id][1])
+                    continue
+                if doc_id is not None:
+                    # Renamed: re-file the title under the same id, keeping its place in the order
+                    self._remove(doc_id, dropped)
+                self._add(doc_key, entry, created, doc_id)
+                changes += 1
+            for doc_key in [doc_key for doc_key in self._doc_ids if doc_key not in seen]:
+                self._remove(self._doc_ids.pop(doc_key), dropped)
+                changes += 1
+            self._update_tokens(created, dropped)
+            if changes:
+                self._results.clear()
+
+            self._version = version
+            self._stats['syncs'] += 1
+            self._stats['last_sync_duration'] = time.perf_counter() - started
+            self._stats['last_sync_changes'] = changes
+
+    def _add(self, doc_key, entry, created, doc_id=None):
+        tokens = tuple(dict.fromkeys(tokenize(title_from_filename(entry['filename']))))
+        if doc_id is None:
+            # New ids only grow, so appending keeps every posting list sorted
+            doc_id = self._next_id
+            self._next_id += 1
+            add = list.append
+        else:
+            add = bisect.insort
+        self._doc_ids[doc_key] = doc_id
+        self._docs[doc_id] = (entry, tokens)
+        for index, keys in zip(self._indexes, _index_keys(tokens)):
+            for key in keys:
+                posting = index.get(key)
+                if posting is None:
+                    posting = index[key] = []
+                    if index is self._postings:
+                        created.append(key)
+                add(posting, doc_id)
+
+    def _remove(self, doc_id, dropped):
+        _, tokens = self._docs.pop(doc_id)
+        for index, keys in zip(self._indexes, _index_keys(tokens)):
+            for key in keys:
+                posting = index[key]
+                del posting[bisect.bisect_left(posting, doc_id)]
+                if not posting:
+                    del index[key]
+                    if index is self._postings:
+                        dropped.append(key)
+
+    def _update_tokens(self, created, dropped):
+        """Apply token additions/removals to the sorted token list"""
+        if len(created) + len(dropped) > 64:
+            # Each insert/delete shifts the list, so big changes re-sort once
+            self._tokens = sorted(self._postings)
+            return
+        for token in dropped:
+            index = bisect.bisect_left(self._tokens, token)
+            if token not in self._postings and index < len(self._tokens) and self._tokens[index] == token:
+                del self._tokens[index]
+        for token in created:
+            index = bisect.bisect_left(self._tokens, token)
+            if token in self._postings and (index == len(self._tokens) or self._tokens[index] != token):
+                self._tokens.insert(index, token)
+
+    def _prefixed(self, term, leading=False):
+        """Posting lists that together hold every doc with a token (or first token) starting with ``term``"""
+        if len(term) <= PREFIX_LENGTH:
+            posting = (self._prefix_leading if leading else self._prefix_postings).get(term)
+            return [posting] if posting else []
+        postings = self._leading if leading else self._postings
+        start = bisect.bisect_left(self._tokens, term)
+        end = bisect.bisect_left(self._tokens, term + '\U0010ffff', start)
+        return [postings[token] for token in self._tokens[start:end] if token in postings]
+
+    def search(self, query, offset=0, limit=10):
+        """Return (matching entries for this page, total matches)"""
+        terms = tuple(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0
+        with self._lock:
+            self._stats['queries'] += 1
+            cached = self._results.get(terms)
+            if cached is not None and (offset + limit <= len(cached[0]) or len(cached[0]) == cached[1]):
+                self._stats['cache_hits'] += 1
+                self._results.move_to_end(terms)
+                ranked, total = cached
+            else:
+                depth = max(offset + limit, self.cache_depth)
+                if len(terms) == 1:
+                    ranked, total = self._rank_term(terms[0], depth)
+                else:
+                    ranked, total = self._rank(terms, depth)
+                if offset + limit <= self.cache_depth:
+                    self._results[terms] = (ranked, total)
+                    if len(self._results) > self.cache_size:
+                        self._results.popitem(last=False)
+            return [self._docs[doc_id][0] for doc_id in ranked[offset:offset + limit]], total
+
+    def _rank_term(self, term, depth):
+        """The first ``depth`` doc ids matching one term, best first, and the number of matches
+
+        Each tier streams a posting list and only skips docs that belong to
+        an earlier tier. A tier is only reached when the earlier ones held
+        fewer than ``depth`` docs, so the walk stays within a few ``depth``.
+        """
+        docs = self._docs
+        matching = self._prefixed(term)
+        if not matching:
+            return [], 0
+        tiers = (
+            self._leading.get(term, ()),
+            (doc_id for doc_id in self._postings.get(term, ()) if docs[doc_id][1][0] != term),
+            (doc_id for doc_id in _merge(self._prefixed(term, leading=True)) if term not in docs[doc_id][1]),
+            (doc_id for doc_id in _merge(matching)
+             if term not in docs[doc_id][1] and not docs[doc_id][1][0].startswith(term)),
+        )
+        ranked = list(itertools.islice(itertools.chain(*tiers), depth))
+        if len(matching) == 1:
+            return ranked, len(matching[0])
+        # Several tokens share the prefix and a title can hold more than one
+        return ranked, len(set().union(*matching))
+
+    def _rank(self, terms, depth):
+        """The first ``depth`` doc ids matching every term, best first, and the number of matches"""
+        prefixed = {term: self._prefixed(term) for term in terms}
+        # Start from the term with the fewest postings; the rest only filter
+        # it, and intersecting a set with a list runs in C without copying the list
+        seed = min(terms, key=lambda term: sum(map(len, prefixed[term])))
+        matches = set().union(*prefixed[seed])
+        for term in terms:
+            if term != seed and matches:
+                matches = set().union(*(matches.intersection(posting) for posting in prefixed[term]))
+        if not matches:
+            return [], 0
+
+        whole = matches
+        for term in terms:
+            posting = self._postings.get(term, ())
+            # The postings of the term itself are a subset of its prefix postings,
+            # so equal sizes mean every match holds the term as a whole word
+            if sum(map(len, prefixed[term])) != len(posting):
+                whole = whole.intersection(posting)
+        leading = set().union(*(matches.intersection(posting)
+                                for posting in self._prefixed(terms[0], leading=True)))
+        first_word = whole.intersection(self._leading.get(terms[0], ()))
+        ranked = []
+        for tier in (first_word, whole - first_word, leading - whole, matches - whole - leading):
+            ranked.extend(heapq.nsmallest(depth - len(ranked), tier))
+            if len(ranked) >= depth:
+                break
+        return ranked, len(matches)
+
+    def after_fork(self):
+        """A lock held by another thread at fork() would never be released in the child"""
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['documents'] = len(self._docs)
+            snapshot['tokens'] = len(self._tokens)
+            return snapshot
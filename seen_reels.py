@@ -0,0 +1,260 @@
+"""
+Per-user seen reels
+Remembers which reels each logged-in user has watched, so the feed can skip
+them. A user's set is a bitmap over reel IDs (bit n = reel n), which needs
+one bit per reel in the catalog however many have been watched: 12.5 KB at
+100k reels. Bitmaps are stored zlib-compressed in the `user_seen_reels`
+table and held uncompressed for the most recently active users in an
+in-process LRU. New views are written behind in batches; each flush merges
+with the stored bitmap, so views recorded by other worker processes are
+never overwritten.
+"""
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+LOAD_QUERY = "SELECT seen FROM user_seen_reels WHERE user_id = %s"
+LOCK_QUERY = "SELECT seen FROM user_seen_reels WHERE user_id = %s FOR UPDATE"
+SAVE_QUERY = """
+    INSERT INTO user_seen_reels (user_id, seen, seen_count)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        seen = VALUES(seen),
+        seen_count = VALUES(seen_count)
+"""
+
+
+class SeenSet:
+    """Bitmap over reel IDs; grows to the highest ID added"""
+
+    __slots__ = ('bits', 'count')
+
+    def __init__(self, bits=b''):
+        self.bits = bytearray(bits)
+        self.count = int.from_bytes(self.bits, 'little').bit_count()
+
+    @classmethod
+    def from_blob(cls, blob):
+        return cls(zlib.decompress(blob) if blob else b'')
+
+    def to_blob(self):
+        return zlib.compress(bytes(self.bits))
+
+    def __contains__(self, reel_id):
+        byte = reel_id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (reel_id & 7)))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, reel_id):
+        """Set the bit for ``reel_id``; returns whether it was new"""
+        byte = reel_id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        mask = 1 << (reel_id & 7)
+        if self.bits[byte] & mask:
+            return False
+        self.bits[byte] |= mask
+        self.count += 1
+        return True
+
+    def update(self, bits):
+        """OR another bitmap into this one"""
+        if len(bits) > len(self.bits):
+            self.bits.extend(bytes(len(bits) - len(self.bits)))
+        merged = int.from_bytes(self.bits, 'little') | int.from_bytes(bits, 'little')
+        self.bits[:] = merged.to_bytes(len(self.bits), 'little')
+        self.count = merged.bit_count()
+
+
+class SeenReels:
+    """LRU of per-user SeenSets backed by MySQL, with write-behind flushing.
+
+    ``connection`` is a zero-argument callable returning a context manager
+    that yields a DB connection (e.g. ``db_pool.connection``). At most
+    ``max_users`` sets are cached; an evicted set with unwritten views is
+    kept until the next flush writes it. After a failed load, cache misses
+    skip MySQL for ``retry_interval`` seconds, doubling up to
+    ``max_retry_interval`` while loads keep failing, so an outage does not
+    hold every request up for a connection timeout.
+    """
+
+    def __init__(self, connection, max_users=1000, flush_interval=5.0, max_pending=500,
+                 retry_interval=1.0, max_retry_interval=60.0):
+        self._connection = connection
+        self.max_users = max_users
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._users = OrderedDict()  # user_id -> SeenSet, least recently used first
+        self._dirty = {}             # user_id -> SeenSet with views not yet written
+        self._retry_delay = 0
+        self._retry_at = 0.0         # monotonic time before which misses do not query MySQL
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'load_errors': 0,
+            'loads_skipped': 0,
+            'recorded': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'last_flush_duration': 0.0,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='seen-flush', daemon=True)
+            self._thread.start()
+
+    def get(self, user_id):
+        """The user's SeenSet, loaded from MySQL on a cache miss
+
+        If MySQL cannot be reached, or a recent load failed, an empty set is
+        returned (and not cached), so the feed simply stops excluding seen
+        reels for a while.
+        """
+        with self._lock:
+            seen = self._users.get(user_id)
+            if seen is not None:
+                self._users.move_to_end(user_id)
+                self._stats['hits'] += 1
+                return seen
+            self._stats['misses'] += 1
+            if time.monotonic() < self._retry_at:
+                self._stats['loads_skipped'] += 1
+                return self._dirty.get(user_id, SeenSet())
+
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(LOAD_QUERY, (user_id,))
+                    row = cursor.fetchone()
+            loaded = SeenSet.from_blob(row['seen'] if row else None)
+        except Exception as e:
+            logger.error("Error loading seen reels for user %s: %s", user_id, e, extra={'event': 'seen_load_error'})
+            with self._lock:
+                self._stats['load_errors'] += 1
+                self._retry_delay = min(self.max_retry_interval, self._retry_delay * 2 or self.retry_interval)
+                self._retry_at = time.monotonic() + self._retry_delay
+                # Views recorded meanwhile still count
+                seen = self._users.get(user_id)
+                if seen is None:
+                    seen = self._dirty.get(user_id, SeenSet())
+                return seen
+
+        with self._lock:
+            self._retry_delay = 0
+            seen = self._users.get(user_id)
+            if seen is None:
+                seen = self._dirty.get(user_id)
+            if seen is None:
+                seen = loaded
+            else:
+                seen.update(loaded.bits)
+            self._cache(user_id, seen)
+            return seen
+
+    def _cache(self, user_id, seen):
+        self._users[user_id] = seen
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            # Unwritten views stay in _dirty until the next flush
+            self._users.popitem(last=False)
+
+    def add(self, user_id, reel_id):
+        """Mark a reel as seen by the user; never blocks on writing"""
+        seen = self.get(user_id)
+        with self._lock:
+            if not seen.add(reel_id):
+                return
+            self._dirty[user_id] = seen
+            self._stats['recorded'] += 1
+            full = len(self._dirty) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every set with new views, merged with what is stored"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                pending, self._dirty = self._dirty, {}
+                snapshots = {user_id: bytes(seen.bits) for user_id, seen in pending.items()}
+
+            started = time.monotonic()
+            stored = {}
+            try:
+                with self._connection() as conn:
+                    with conn.cursor() as cursor:
+                        for user_id, bits in snapshots.items():
+                            cursor.execute(LOCK_QUERY, (user_id,))
+                            row = cursor.fetchone()
+                            merged = SeenSet(bits)
+                            if row and row['seen']:
+                                stored[user_id] = zlib.decompress(row['seen'])
+                                merged.update(stored[user_id])
+                            cursor.execute(SAVE_QUERY, (user_id, merged.to_blob(), merged.count))
+                    conn.commit()
+            except Exception as e:
+                with self._lock:
+                    for user_id, seen in pending.items():
+                        self._dirty.setdefault(user_id, seen)
+                    self._stats['flush_errors'] += 1
+                logger.error("Error flushing seen reels: %s", e, extra={'event': 'seen_flush_error'})
+                return 0
+
+            with self._lock:
+                # Pick up views other processes wrote for these users
+                for user_id, bits in stored.items():
+                    pending[user_id].update(bits)
+                self._stats['flushes'] += 1
+                self._stats['last_flush_duration'] = time.monotonic() - started
+            return len(snapshots)
+
+    def close(self):
+        """Stop the flush thread and write out whatever is still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def after_fork(self):
+        """Start afresh in a forked child: the parent writes its own pending views"""
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._users = OrderedDict()
+        self._dirty = {}
+        self._retry_delay = 0
+        self._retry_at = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.start()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['cached_users'] = len(self._users)
+            snapshot['pending_users'] = len(self._dirty)
+            snapshot['cached_bytes'] = sum(len(seen.bits) for seen in self._users.values())
+        return snapshot
@@ -0,0 +1,137 @@
+"""
+Response serialization helpers
+Fast JSON encoding (orjson when installed, stdlib otherwise), gzip/brotli
+compression negotiated from Accept-Encoding, and the compact feed format
+that sends the shared URL prefix once per page.
+"""
+import gzip
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is available.
+
+    Falls back to the stdlib encoder when orjson is not installed or when
+    a caller passes stdlib-specific options (indent, separators, ...).
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # Skip the str round-trip and hand orjson's bytes straight to the response
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default) + b'\n',
+            mimetype=self.mimetype
+        )
+
+
+def encoder_name(app):
+    """Name of the JSON encoder the app is using"""
+    if isinstance(app.json, FastJSONProvider) and orjson is not None:
+        return 'orjson'
+    return 'stdlib'
+
+
+def choose_encoding(accept_encoding, allowed=('br', 'gzip')):
+    """Pick the best supported content-coding from an Accept-Encoding header"""
+    for encoding in allowed:
+        if encoding == 'br' and brotli is None:
+            continue
+        if accept_encoding[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress_body(body, encoding, level=6):
+    """Compress bytes with the given content-coding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level)
+
+
+def compress_response(response, accept_encoding, min_size=1024, level=6):
+    """Compress a buffered response in place if the client accepts it"""
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    response.set_data(compress_body(body, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity body, so only a weak
+    # validator still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def compact_reels(reels_list):
+    """Split reel URLs into one shared base and per-item remainders
+
+    ``url_base`` is the longest prefix, cut after a ``/``, shared by every
+    video and poster URL on the page. Each item's ``url`` (and ``poster``)
+    keeps everything after it, including any query string, such as a
+    presigned signature or the ``?v=<etag>`` of local files, so
+    ``url_base + url`` is the full URL. Items leave out ``description``,
+    which is always ``"Video: " + title``, and ``filename``, as well as
+    unknown metadata fields. HLS playlist URLs are kept whole, since they
+    are often served from the app rather than the bucket.
+
+    Returns (url_base, items).
+    """
+    urls = [reel['url'] for reel in reels_list]
+    urls.extend(reel['poster'] for reel in reels_list if reel.get('poster'))
+    url_base = ''
+    if urls:
+        prefix = min(urls)
+        last = max(urls)
+        length = 0
+        while length < len(prefix) and prefix[length] == last[length]:
+            length += 1
+        url_base = prefix[:prefix.rfind('/', 0, length) + 1]
+
+    items = []
+    for reel in reels_list:
+        item = {
+            'id': reel['id'],
+            'title': reel['title'],
+            'url': reel['url'][len(url_base):],
+            'created_at': reel['created_at'],
+            'source': reel['source']
+        }
+        for field in ('duration', 'width', 'height', 'size'):
+            if reel.get(field) is not None:
+                item[field] = reel[field]
+        if reel.get('poster'):
+            item['poster'] = reel['poster'][len(url_base):]
+        if reel.get('hls'):
+            item['hls'] = reel['hls']
+        items.append(item)
+    return url_base, items
@@ -1,5 +1,13 @@
 let reels = [];
-let originalReels = []; // Store original order
+let totalReels = 0; // Number of reels in the catalog
+let nextCursor = null; // Cursor for the next page of the shuffled feed
+const REELS_PAGE_SIZE = 10;
+const FIRST_PAGE_SIZE = 4; // Enough for the first reel and the ones mounted after it
+// Only reels within this many positions of currentReelIndex are in the DOM, so
+// memory and network use stay flat however large the catalog is
+const WINDOW_BEHIND = 1;
+const WINDOW_AHEAD = 2;
+const PREFETCH_AHEAD = 1; // Reels after the current one that buffer video, not just metadata
 let currentReelIndex = 0;
 let isScrolling = false;
 let viewsCount = 0;
@@ -7,6 +15,12 @@ let isLoggedIn = false;
 let viewsRemaining = 10;
 let viewedReelIds = new Set(); // Track which reels have been viewed
 let allReelsViewed = false; // Flag to indicate all reels have been viewed
+let mountedReels = new Map(); // Reel index -> mounted .reel-item element
+let spareReelItems = []; // Unmounted .reel-item elements kept for reuse
+let topSpacer = null; // Stands in for the reels above the window
+let bottomSpacer = null; // Stands in for the reels below the window
+let reelHeight = 0;
+let feedHandlersReady = false; // Scroll, keyboard and touch handlers are only added once
 
 // Fetch and display reels
 async function loadReels() {
@@ -17,9 +31,14 @@ async function loadReels() {
     }
     
     container.innerHTML = '<div class="loading">Loading reels...</div>';
+    // The old window is gone with the container's contents; renderReels builds a new one
+    topSpacer = null;
+    bottomSpacer = null;
     
     try {
-        const response = await fetch('/api/reels');
+        // The server returns reels already shuffled, one page at a time; the
+        // first page is kept small so the first video can start sooner
+        const response = await fetch(`/api/reels?limit=${FIRST_PAGE_SIZE}&format=compact`);
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
@@ -28,16 +47,11 @@ async function loadReels() {
         console.log('API Response:', data);
         
         if (data.success) {
-            originalReels = data.reels || [];
+            reels = expandReels(data);
+            totalReels = data.total || 0;
+            nextCursor = data.next_cursor || null;
             
-            // Shuffle reels randomly from the start
-            if (originalReels.length > 0) {
-                reels = shuffleArray(originalReels);
-            } else {
-                reels = [...originalReels];
-            }
-            
-            console.log(`Loaded ${reels.length} reels (randomly shuffled)`);
+            console.log(`Loaded ${reels.length} of ${totalReels} reels (randomly shuffled)`);
             
             // Update user status
             if (data.user) {
@@ -60,32 +74,10 @@ async function loadReels() {
                 return;
             }
             
-            // Create reel items
+            // Mount the first few reels; the rest are mounted as the user scrolls
             try {
-                container.innerHTML = reels.map((reel, index) => `
-                <div class="reel-item" data-index="${index}">
-                    <div class="reel-video-wrapper">
-                        <video 
-                            class="reel-video" 
-                            preload="auto"
-                            playsinline
-                            webkit-playsinline
-                            ${index === 0 ? 'autoplay muted' : ''}
-                            loop
-                            data-reel-id="${reel.id}">
-                            <source src="${reel.url}" type="video/mp4">
-                            Your browser does not support the video tag.
-                        </video>
-                    </div>
-                    <div class="reel-info-overlay">
-                        <div class="reel-title">${reel.title || 'Untitled Reel'}</div>
-                        ${reel.description ? `<div class="reel-description">${reel.description}</div>` : ''}
-                        <div class="reel-meta">
-                            <span>${formatDate(reel.created_at)}</span>
-                        </div>
-                    </div>
-                </div>
-            `).join('');
+                currentReelIndex = 0;
+                renderReels();
             } catch (renderError) {
                 console.error('Error rendering reels:', renderError);
                 container.innerHTML = `<div class="error">Error rendering reels: ${renderError.message}</div>`;
@@ -150,9 +142,11 @@ async function loadReels() {
                 
                 // Also try when user interacts with page
                 const enableOnInteraction = () => {
-                    if (firstVideo && firstVideo.paused) {
-                        firstVideo.muted = false;
-                        firstVideo.play().catch(e => {
+                    const currentItem = mountedReels.get(currentReelIndex);
+                    const currentVideo = currentItem ? currentItem.querySelector('.reel-video') : null;
+                    if (currentVideo && currentVideo.paused) {
+                        currentVideo.muted = false;
+                        currentVideo.play().catch(e => {
                             console.log('Error playing after interaction:', e);
                         });
                     }
@@ -166,25 +160,30 @@ async function loadReels() {
                 console.error('Error setting up video autoplay:', e);
             }
             
-            // Setup scroll handling
-            try {
-                setupScrollHandling();
-            } catch (e) {
-                console.error('Error setting up scroll handling:', e);
-            }
-            
-            // Setup keyboard navigation
-            try {
-                setupKeyboardNavigation();
-            } catch (e) {
-                console.error('Error setting up keyboard navigation:', e);
-            }
-            
-            // Setup touch handling
-            try {
-                setupTouchHandling();
-            } catch (e) {
-                console.error('Error setting up touch handling:', e);
+            // Scroll, keyboard and touch handlers stay in place across reloads (e.g. after login)
+            if (!feedHandlersReady) {
+                feedHandlersReady = true;
+                
+                // Setup scroll handling
+                try {
+                    setupScrollHandling();
+                } catch (e) {
+                    console.error('Error setting up scroll handling:', e);
+                }
+                
+                // Setup keyboard navigation
+                try {
+                    setupKeyboardNavigation();
+                } catch (e) {
+                    console.error('Error setting up keyboard navigation:', e);
+                }
+                
+                // Setup touch handling
+                try {
+                    setupTouchHandling();
+                } catch (e) {
+                    console.error('Error setting up touch handling:', e);
+                }
             }
             
             // Update views counter after everything is set up
@@ -203,6 +202,20 @@ async function loadReels() {
     }
 }
 
+// Expand a compact feed page (shared url_base, relative URLs, derived description)
+function expandReels(data) {
+    const reelsPage = data.reels || [];
+    if (data.format !== 'compact') return reelsPage;
+    
+    const base = data.url_base || '';
+    return reelsPage.map(reel => ({
+        ...reel,
+        url: base + reel.url,
+        poster: reel.poster ? base + reel.poster : null,
+        description: `Video: ${reel.title}`
+    }));
+}
+
 // Setup intersection observer for video autoplay
 function setupVideoAutoplay() {
     const container = document.getElementById('reelsContainer');
@@ -255,18 +268,16 @@ function setupVideoAutoplay() {
                     // Track view if not already viewed
                     if (reelId && !viewedReelIds.has(reelId)) {
                         viewedReelIds.add(reelId);
-                        console.log(`Viewed reel ${reelId}. Total viewed: ${viewedReelIds.size}/${originalReels.length}`);
+                        console.log(`Viewed reel ${reelId}. Total viewed: ${viewedReelIds.size}/${totalReels}`);
                         
                         // Check if all reels have been viewed
-                        if (viewedReelIds.size >= originalReels.length && !allReelsViewed) {
+                        if (viewedReelIds.size >= totalReels && !allReelsViewed) {
                             allReelsViewed = true;
                             console.log('All reels viewed! Continuing with continuous random playback...');
                         }
                         
-                        // Track view for non-logged-in users (for 10-reel limit)
-                        if (!isLoggedIn) {
-                            trackReelView();
-                        }
+                        // Track the view (per-reel counts, and the 10-reel limit for non-logged-in users)
+                        trackReelView(reelId);
                     }
                 } else {
                     // Video is out of view - pause it
@@ -314,22 +325,12 @@ function setupVideoAutoplay() {
     });
 }
 
-// Shuffle array using Fisher-Yates algorithm
-function shuffleArray(array) {
-    const shuffled = [...array];
-    for (let i = shuffled.length - 1; i > 0; i--) {
-        const j = Math.floor(Math.random() * (i + 1));
-        [shuffled[i], shuffled[j]] = [shuffled[j], shuffled[i]];
-    }
-    return shuffled;
-}
-
 // Global video observer for all videos
 let globalVideoObserver = null;
 
-// Append more shuffled reels for continuous infinite scroll
-function appendMoreReels() {
-    if (originalReels.length === 0) return;
+// Fetch the next page of the shuffled feed for continuous infinite scroll
+async function appendMoreReels() {
+    if (!nextCursor) return;
     
     const container = document.getElementById('reelsContainer');
     if (!container) return;
@@ -338,124 +339,196 @@ function appendMoreReels() {
     if (container.hasAttribute('data-appending')) return;
     container.setAttribute('data-appending', 'true');
     
-    // Shuffle original reels
-    const shuffledReels = shuffleArray(originalReels);
+    try {
+        const response = await fetch(`/api/reels?limit=${REELS_PAGE_SIZE}&format=compact&cursor=${encodeURIComponent(nextCursor)}`);
+        const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.error || 'Unknown error');
+        }
+        const newReels = expandReels(data);
+        totalReels = data.total || totalReels;
+        nextCursor = data.next_cursor || null;
+        
+        // Only the data is kept; reels are mounted when they come into the window
+        reels.push(...newReels);
+        renderReelWindow();
+        
+        console.log(`Appended ${newReels.length} more reels. Total: ${reels.length}`);
+    } catch (error) {
+        console.error('Error loading more reels:', error);
+    } finally {
+        container.removeAttribute('data-appending');
+    }
+}
+
+// Render reels in the container, starting over from currentReelIndex
+function renderReels() {
+    const container = document.getElementById('reelsContainer');
+    if (!container) return;
+    
+    mountedReels.forEach(item => {
+        unloadReelVideo(item.querySelector('.reel-video'));
+        spareReelItems.push(item);
+    });
+    mountedReels.clear();
     
-    // Get current scroll position to maintain it
-    const currentScroll = container.scrollTop;
+    // Spacers stand in for the reels outside the window, so the scroll height stays right
+    topSpacer = document.createElement('div');
+    topSpacer.className = 'reel-spacer';
+    bottomSpacer = document.createElement('div');
+    bottomSpacer.className = 'reel-spacer';
+    container.replaceChildren(topSpacer, bottomSpacer);
     
-    // Append new reels to existing ones
-    const newReelsHTML = shuffledReels.map((reel, index) => {
-        const globalIndex = reels.length + index;
-        return `
-            <div class="reel-item" data-index="${globalIndex}">
-                <div class="reel-video-wrapper">
-                    <video 
-                        class="reel-video" 
-                        preload="metadata"
-                        playsinline
-                        webkit-playsinline
-                        loop
-                        data-reel-id="${reel.id}">
-                        <source src="${reel.url}" type="video/mp4">
-                        Your browser does not support the video tag.
-                    </video>
-                </div>
-                <div class="reel-info-overlay">
-                    <div class="reel-title">${reel.title || 'Untitled Reel'}</div>
-                    ${reel.description ? `<div class="reel-description">${reel.description}</div>` : ''}
-                    <div class="reel-meta">
-                        <span>${formatDate(reel.created_at)}</span>
-                    </div>
-                </div>
-            </div>
-        `;
-    }).join('');
+    measureReelHeight();
+    renderReelWindow();
+    container.scrollTo({ top: currentReelIndex * reelHeight, behavior: 'instant' });
+}
+
+// Mount the reels around currentReelIndex, recycling elements that fall out of the window
+function renderReelWindow() {
+    const container = document.getElementById('reelsContainer');
+    if (!container || !topSpacer) return;
     
-    // Append to container
-    container.insertAdjacentHTML('beforeend', newReelsHTML);
+    const start = Math.max(0, currentReelIndex - WINDOW_BEHIND);
+    const end = Math.min(reels.length, currentReelIndex + WINDOW_AHEAD + 1);
     
-    // Add to reels array
-    reels = [...reels, ...shuffledReels];
+    mountedReels.forEach((item, index) => {
+        if (index < start || index >= end) {
+            unloadReelVideo(item.querySelector('.reel-video'));
+            item.remove();
+            mountedReels.delete(index);
+            spareReelItems.push(item);
+        }
+    });
     
-    // Restore scroll position immediately to prevent jump
-    container.scrollTop = currentScroll;
+    // Mounted reels are always contiguous, so going backwards each new one
+    // goes right before the reel after it (or the bottom spacer)
+    for (let index = end - 1; index >= start; index--) {
+        let item = mountedReels.get(index);
+        if (!item) {
+            item = spareReelItems.pop() || createReelItem();
+            container.insertBefore(item, mountedReels.get(index + 1) || bottomSpacer);
+            mountedReels.set(index, item);
+            bindReelItem(item, index);
+        }
+        item.querySelector('.reel-video').preload = preloadFor(index);
+    }
     
-    // Setup observers for new videos using the global observer
-    const newVideos = Array.from(container.querySelectorAll('.reel-video'))
-        .filter(v => !v.hasAttribute('data-observed'));
+    // The spacers change by exactly the height of the reels moved in and out,
+    // so the scroll position does not jump
+    topSpacer.style.height = `${start * reelHeight}px`;
+    bottomSpacer.style.height = `${(reels.length - end) * reelHeight}px`;
+}
+
+// Build an empty reel element; bindReelItem points it at a reel
+function createReelItem() {
+    const template = document.createElement('template');
+    template.innerHTML = `
+        <div class="reel-item">
+            <div class="reel-video-wrapper">
+                <video 
+                    class="reel-video" 
+                    preload="none"
+                    playsinline
+                    webkit-playsinline
+                    loop>
+                    Your browser does not support the video tag.
+                </video>
+            </div>
+            <div class="reel-info-overlay">
+                <div class="reel-title"></div>
+                <div class="reel-description"></div>
+                <div class="reel-meta">
+                    <span></span>
+                </div>
+            </div>
+        </div>
+    `.trim();
     
+    const item = template.content.firstElementChild;
+    const video = item.querySelector('.reel-video');
     if (globalVideoObserver) {
-        newVideos.forEach(video => {
-            video.setAttribute('data-observed', 'true');
-            globalVideoObserver.observe(video);
-        });
+        video.setAttribute('data-observed', 'true');
+        globalVideoObserver.observe(video);
     }
+    return item;
+}
+
+// Fill a new or recycled reel element with reels[index]
+function bindReelItem(item, index) {
+    const reel = reels[index];
+    const video = item.querySelector('.reel-video');
+    item.setAttribute('data-index', index);
     
-    // Remove the flag
-    container.removeAttribute('data-appending');
+    unloadReelVideo(video);
+    video.setAttribute('data-reel-id', reel.id);
+    if (reel.poster) {
+        video.poster = reel.poster;
+    }
+    const sources = [];
+    if (reel.hls) {
+        sources.push(createSource(reel.hls, 'application/vnd.apple.mpegurl'));
+    }
+    sources.push(createSource(reel.url, 'video/mp4'));
+    video.prepend(...sources);
+    video.preload = preloadFor(index);
+    // The first reel of a fresh feed starts muted so autoplay is allowed
+    if (index === 0) {
+        video.muted = true;
+        video.autoplay = true;
+    }
+    video.load();
     
-    console.log(`Appended ${shuffledReels.length} more reels. Total: ${reels.length}`);
+    item.querySelector('.reel-title').textContent = reel.title || 'Untitled Reel';
+    const description = item.querySelector('.reel-description');
+    description.textContent = reel.description || '';
+    description.style.display = reel.description ? '' : 'none';
+    item.querySelector('.reel-meta span').textContent = formatDate(reel.created_at);
 }
 
-// Render reels in the container
-function renderReels() {
+function createSource(src, type) {
+    const source = document.createElement('source');
+    source.src = src;
+    source.type = type;
+    return source;
+}
+
+// Stop a video and drop its sources so the browser releases its buffers
+function unloadReelVideo(video) {
+    if (!video.hasAttribute('data-reel-id')) return;
+    video.pause();
+    video.querySelectorAll('source').forEach(source => source.remove());
+    video.removeAttribute('poster');
+    video.removeAttribute('data-reel-id');
+    video.autoplay = false;
+    video.load();
+}
+
+// The current reel and the next PREFETCH_AHEAD buffer video; the others only load metadata
+function preloadFor(index) {
+    return index >= currentReelIndex && index <= currentReelIndex + PREFETCH_AHEAD ? 'auto' : 'metadata';
+}
+
+function measureReelHeight() {
     const container = document.getElementById('reelsContainer');
-    if (!container) return;
-    
-    try {
-        container.innerHTML = reels.map((reel, index) => `
-            <div class="reel-item" data-index="${index}">
-                <div class="reel-video-wrapper">
-                    <video 
-                        class="reel-video" 
-                        preload="metadata"
-                        playsinline
-                        webkit-playsinline
-                        loop
-                        data-reel-id="${reel.id}">
-                        <source src="${reel.url}" type="video/mp4">
-                        Your browser does not support the video tag.
-                    </video>
-                </div>
-                <div class="reel-info-overlay">
-                    <div class="reel-title">${reel.title || 'Untitled Reel'}</div>
-                    ${reel.description ? `<div class="reel-description">${reel.description}</div>` : ''}
-                    <div class="reel-meta">
-                        <span>${formatDate(reel.created_at)}</span>
-                    </div>
-                </div>
-            </div>
-        `).join('');
-        
-        // Re-setup all handlers
-        setupVideoAutoplay();
-        setupScrollHandling();
-        setupKeyboardNavigation();
-        setupTouchHandling();
-        updateViewsCounter();
-        
-        console.log('Reels re-rendered with random order');
-    } catch (renderError) {
-        console.error('Error rendering reels:', renderError);
-    }
+    reelHeight = container.clientHeight || window.innerHeight - 60;
 }
 
 // Track when a reel is viewed
-async function trackReelView() {
-    if (isLoggedIn) return; // Logged in users have unlimited views
-    
+async function trackReelView(reelId) {
     try {
         const response = await fetch('/api/track-view', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
-            }
+            },
+            body: JSON.stringify({ reel_id: reelId })
         });
         
         const data = await response.json();
         
-        if (data.success) {
+        // Logged in users have unlimited views
+        if (data.success && !isLoggedIn) {
             viewsCount = data.views_count;
             viewsRemaining = data.views_remaining;
             updateViewsCounter();
@@ -473,153 +546,78 @@ async function trackReelView() {
 // Setup scroll handling for smooth navigation
 function setupScrollHandling() {
     const container = document.getElementById('reelsContainer');
-    let scrollTimeout;
+    let frameRequested = false;
     
+    // Follow the visible reel at most once per frame, so the window keeps up with fast scrolling
     container.addEventListener('scroll', () => {
-        if (isScrolling) return;
+        if (isScrolling || frameRequested) return;
         
-        clearTimeout(scrollTimeout);
-        scrollTimeout = setTimeout(() => {
-            // Just check if we need to append more reels, don't snap
-            checkAndAppendReels();
-        }, 150);
-    });
-    
-    // Handle wheel events for better control
-    let wheelTimeout;
-    container.addEventListener('wheel', (e) => {
-        clearTimeout(wheelTimeout);
-        wheelTimeout = setTimeout(() => {
-            // Just check if we need to append more reels, don't snap
-            checkAndAppendReels();
-        }, 100);
+        frameRequested = true;
+        requestAnimationFrame(() => {
+            frameRequested = false;
+            updateCurrentReel();
+        });
     }, { passive: true });
+    
+    window.addEventListener('resize', () => {
+        measureReelHeight();
+        renderReelWindow();
+        container.scrollTo({ top: currentReelIndex * reelHeight, behavior: 'instant' });
+    });
 }
 
-// Check if we're near the end and append more reels if needed
-function checkAndAppendReels() {
+// Work out which reel is in view from the scroll offset, move the window to it and fetch ahead
+function updateCurrentReel() {
     const container = document.getElementById('reelsContainer');
-    const reelItems = document.querySelectorAll('.reel-item');
-    
-    if (reelItems.length === 0) return;
-    
-    // Calculate which reel is currently in view
-    let nearestIndex = 0;
-    let nearestDistance = Infinity;
-    
-    reelItems.forEach((item, index) => {
-        const rect = item.getBoundingClientRect();
-        const containerRect = container.getBoundingClientRect();
-        const distance = Math.abs(rect.top - containerRect.top);
-        
-        if (distance < nearestDistance) {
-            nearestDistance = distance;
-            nearestIndex = index;
-        }
-    });
+    if (!container || reelHeight === 0 || reels.length === 0) return;
     
-    // Update current index without scrolling
-    if (nearestIndex !== currentReelIndex) {
-        currentReelIndex = nearestIndex;
+    const index = Math.min(reels.length - 1, Math.max(0, Math.round(container.scrollTop / reelHeight)));
+    if (index !== currentReelIndex) {
+        currentReelIndex = index;
+        renderReelWindow();
     }
     
     // If we're near the end (last 3 reels), append more for infinite scroll
-    if (nearestIndex >= reels.length - 3) {
+    if (currentReelIndex >= reels.length - 3) {
         appendMoreReels();
     }
-    
-    // If reel is not properly aligned (more than 50px off), snap to it
-    const currentItem = reelItems[nearestIndex];
-    if (currentItem) {
-        const rect = currentItem.getBoundingClientRect();
-        const containerRect = container.getBoundingClientRect();
-        const offset = Math.abs(rect.top - containerRect.top);
-        
-        // If misaligned by more than 50px, snap to it
-        if (offset > 50 && !isScrolling) {
-            isScrolling = true;
-            currentItem.scrollIntoView({ 
-                behavior: 'smooth',
-                block: 'start'
-            });
-            setTimeout(() => {
-                isScrolling = false;
-            }, 500);
-        }
-    }
-}
-
-// Snap to nearest reel (only used for keyboard/touch navigation, not automatic)
-function snapToNearestReel() {
-    const container = document.getElementById('reelsContainer');
-    const reelItems = document.querySelectorAll('.reel-item');
-    
-    if (reelItems.length === 0) return;
-    
-    let nearestIndex = 0;
-    let nearestDistance = Infinity;
-    
-    reelItems.forEach((item, index) => {
-        const rect = item.getBoundingClientRect();
-        const containerRect = container.getBoundingClientRect();
-        const distance = Math.abs(rect.top - containerRect.top);
-        
-        if (distance < nearestDistance) {
-            nearestDistance = distance;
-            nearestIndex = index;
-        }
-    });
-    
-    if (nearestIndex !== currentReelIndex) {
-        currentReelIndex = nearestIndex;
-        
-        // If we're near the end (last 3 reels), append more reels for infinite scroll
-        if (nearestIndex >= reels.length - 3) {
-            appendMoreReels();
-        }
-    }
 }
 
 // Scroll to specific reel
 function scrollToReel(index) {
     const container = document.getElementById('reelsContainer');
-    const reelItems = document.querySelectorAll('.reel-item');
     
     if (index < 0) {
         return;
     }
     
-    // If index is beyond current reels, append more
-    if (index >= reelItems.length) {
-        appendMoreReels();
-        // Wait a bit for DOM to update, then scroll
-        setTimeout(() => {
-            const newItems = document.querySelectorAll('.reel-item');
-            if (index < newItems.length) {
+    // If index is beyond the loaded reels, fetch the next page first
+    if (index >= reels.length) {
+        appendMoreReels().then(() => {
+            if (index < reels.length) {
                 scrollToReel(index);
+            } else {
+                currentReelIndex = Math.max(0, reels.length - 1);
             }
-        }, 100);
+        });
         return;
     }
     
-    // Scroll to specific reel with proper alignment
-    const targetItem = reelItems[index];
-    if (targetItem) {
-        isScrolling = true;
-        targetItem.scrollIntoView({ 
-            behavior: 'smooth',
-            block: 'start'
-        });
-        
-        setTimeout(() => {
-            isScrolling = false;
-            
-            // If we're near the end, append more reels for infinite scroll
-            if (index >= reelItems.length - 3) {
-                appendMoreReels();
-            }
-        }, 500);
-    }
+    // Neighbouring reels scroll smoothly; longer jumps go straight there
+    // instead of animating past unmounted reels
+    const visibleIndex = Math.round(container.scrollTop / reelHeight);
+    isScrolling = true;
+    currentReelIndex = index;
+    renderReelWindow();
+    container.scrollTo({
+        top: index * reelHeight,
+        behavior: Math.abs(index - visibleIndex) > 1 ? 'instant' : 'smooth'
+    });
+    
+    setTimeout(() => {
+        isScrolling = false;
+        updateCurrentReel();
+    }, 500);
 }
 
 // Setup keyboard navigation
@@ -647,14 +645,11 @@ function setupKeyboardNavigation() {
         } else if (e.key === 'End') {
             e.preventDefault();
             // Append more reels and go to the new end
-            appendMoreReels();
-            setTimeout(() => {
-                const reelItems = document.querySelectorAll('.reel-item');
-                if (reelItems.length > 0) {
-                    currentReelIndex = reelItems.length - 1;
-                    scrollToReel(currentReelIndex);
+            appendMoreReels().then(() => {
+                if (reels.length > 0) {
+                    scrollToReel(reels.length - 1);
                 }
-            }, 100);
+            });
         }
     });
 }
@@ -0,0 +1,209 @@
+"""
+Fingerprinted static assets
+Build step for the page's CSS and JavaScript. Each file is copied to
+static/dist under a name that carries a hash of its content
+(css/style.3f2a9c1b0d4e.css) and written alongside precompressed .gz and
+.br variants, plus a manifest.json that maps the source name to the built
+one. Templates resolve asset URLs through the manifest, and the app serves
+built files with a one-year immutable Cache-Control: a changed file gets a
+new name, so a cached copy never goes stale and repeat visits make no asset
+requests. Compression happens once here rather than on every response.
+
+Build:  python static_assets.py [--clean]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+
+from flask import send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIRS = ('css', 'js')
+SOURCE_EXTENSIONS = ('.css', '.js')
+MANIFEST_NAME = 'manifest.json'
+# Best preferred first; each is only offered if the build wrote it
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=6).hexdigest()
+
+
+def fingerprinted_name(name, digest):
+    """css/style.css -> css/style.<digest>.css"""
+    root, ext = os.path.splitext(name)
+    return f"{root}.{digest}{ext}"
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename, so a running server never serves a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_folder, output_folder, clean=False):
+    """Fingerprint and precompress the assets under static_folder; returns the manifest
+
+    Files of earlier builds are kept unless ``clean`` is set, so pages
+    rendered by a previous release can still load their assets.
+    """
+    assets = {}
+    for directory in SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(static_folder, directory)):
+            for filename in sorted(files):
+                if not filename.endswith(SOURCE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+
+                digest = content_hash(data)
+                built = fingerprinted_name(name, digest)
+                target = os.path.join(output_folder, built)
+                _write(target, data)
+
+                variants = {}
+                # mtime=0 keeps the .gz bytes identical across builds
+                compressed = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    compressed['br'] = brotli.compress(data, quality=11)
+                for encoding, suffix in ENCODINGS:
+                    body = compressed.get(encoding)
+                    # Tiny files can grow when compressed
+                    if body is not None and len(body) < len(data):
+                        _write(target + suffix, body)
+                        variants[encoding] = len(body)
+
+                assets[name] = {'file': built, 'hash': digest, 'size': len(data), 'encodings': variants}
+
+    manifest = {'assets': assets}
+    _write(os.path.join(output_folder, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+    if clean:
+        keep = {MANIFEST_NAME}
+        for entry in assets.values():
+            keep.add(entry['file'])
+            keep.update(entry['file'] + suffix for encoding, suffix in ENCODINGS if encoding in entry['encodings'])
+        for root, _, files in os.walk(output_folder):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if os.path.relpath(path, output_folder).replace(os.sep, '/') not in keep:
+                    os.remove(path)
+    return manifest
+
+
+class AssetManifest:
+    """Resolves asset names to built, fingerprinted files.
+
+    Without a build (development checkouts) ``url()`` returns None and
+    callers link the source file instead. An entry whose source has changed
+    since the build is ignored the same way, so an edited script is never
+    shadowed by a stale built copy.
+    """
+
+    def __init__(self, static_folder, output_folder, url_prefix='/assets/'):
+        self.static_folder = static_folder
+        self.output_folder = output_folder
+        self.url_prefix = url_prefix
+        self._assets = {}   # source name -> manifest entry
+        self._files = {}    # built name -> manifest entry
+
+    def load(self):
+        path = os.path.join(self.output_folder, MANIFEST_NAME)
+        try:
+            with open(path, 'rb') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            logger.info("No asset build in %s; serving static files unfingerprinted", self.output_folder,
+                        extra={'event': 'assets_unbuilt'})
+            manifest = {'assets': {}}
+
+        assets = {}
+        for name, entry in manifest['assets'].items():
+            try:
+                with open(os.path.join(self.static_folder, name), 'rb') as f:
+                    current = content_hash(f.read())
+            except OSError:
+                current = None
+            if current != entry['hash']:
+                logger.warning("Built asset %s is out of date; run python static_assets.py", name,
+                               extra={'event': 'asset_stale'})
+                continue
+            assets[name] = entry
+        self._assets = assets
+        self._files = {entry['file']: entry for entry in assets.values()}
+        return self
+
+    def url(self, name):
+        """URL of the built copy of ``name`` (e.g. 'js/script.js'), or None"""
+        entry = self._assets.get(name)
+        return self.url_prefix + entry['file'] if entry else None
+
+    def send(self, request, filename, max_age=31536000):
+        """Response for a built file, precompressed if the client accepts it; None if unknown"""
+        entry = self._files.get(filename)
+        if entry is None:
+            return None
+
+        path = os.path.join(self.output_folder, filename)
+        encoding = None
+        for candidate, suffix in ENCODINGS:
+            if candidate in entry['encodings'] and request.accept_encodings[candidate] > 0:
+                encoding, path = candidate, path + suffix
+                break
+
+        response = send_file(
+            path,
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            conditional=True,
+            max_age=max_age
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def stats(self):
+        return {
+            'built': len(self._assets),
+            'bytes': sum(entry['size'] for entry in self._assets.values()),
+            'compressed_bytes': sum(
+                min(entry['encodings'].values(), default=entry['size']) for entry in self._assets.values()
+            ),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress static CSS/JS')
+    parser.add_argument('--static-folder', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    parser.add_argument('--output', help='Build directory (default: <static folder>/dist)')
+    parser.add_argument('--clean', action='store_true', help='Remove files of earlier builds')
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(args.static_folder, 'dist')
+    manifest = build_assets(args.static_folder, output, clean=args.clean)
+    for name, entry in sorted(manifest['assets'].items()):
+        sizes = ', '.join(f"{encoding} {size}" for encoding, size in entry['encodings'].items())
+        print(f"{name} -> {entry['file']} ({entry['size']} bytes; {sizes or 'not compressed'})")
+    if brotli is None:
+        print("brotli is not installed: only .gz variants were written")
+
+
+if __name__ == '__main__':
+    main()
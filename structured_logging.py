@@ -0,0 +1,198 @@
+"""
+Structured logging
+JSON log lines written by a background listener thread. Request threads only
+put records on a bounded in-memory queue (dropping them if it is full), so
+they never block on log I/O. Per-event rate limits and 1-in-N sampling
+keep hot, repetitive messages from flooding the output, and every line
+logged while handling a request carries that request's ID.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'request_id'}
+
+
+def clean_request_id(value):
+    """Accept a client-supplied request ID only if it is short and safe to log"""
+    if value and _REQUEST_ID_RE.match(value):
+        return value
+    return None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request ID and extras"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode()
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request's ID (runs in the logging thread's caller)"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Per-event rate limiting and sampling.
+
+    Records are grouped by their ``event`` extra, falling back to the
+    unformatted message template. Events listed in ``sample_rates`` are
+    logged one in N times (errors are never sampled). Every group is capped
+    at ``rate_limit`` records per second; the first record after a capped
+    second reports how many were suppressed.
+    """
+
+    def __init__(self, sample_rates=None, rate_limit=0):
+        super().__init__()
+        self.sample_rates = dict(sample_rates or {})
+        self.rate_limit = rate_limit
+        self._lock = threading.Lock()
+        self._seen = {}     # key -> records seen, for sampling
+        self._windows = {}  # key -> [window second, records logged, records suppressed]
+        self.dropped = 0
+
+    def filter(self, record):
+        key = getattr(record, 'event', None) or str(record.msg)
+        with self._lock:
+            rate = self.sample_rates.get(key)
+            if rate and rate > 1 and record.levelno < logging.ERROR:
+                seen = self._seen.get(key, 0)
+                self._seen[key] = seen + 1
+                if seen % rate:
+                    self.dropped += 1
+                    return False
+                record.sampled = rate
+
+            if self.rate_limit > 0:
+                second = int(time.monotonic())
+                window = self._windows.get(key)
+                if window is None or window[0] != second:
+                    if window is not None and window[2]:
+                        record.suppressed = window[2]
+                    window = self._windows[key] = [second, 0, 0]
+                if window[1] >= self.rate_limit:
+                    window[2] += 1
+                    self.dropped += 1
+                    return False
+                window[1] += 1
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now; the formatter runs on the listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_state = {}
+
+
+def setup_logging(level='INFO', fmt='json', queue_size=10000, sample_rates=None, rate_limit=0):
+    """Route all logging through a bounded queue to a JSON (or text) stdout handler"""
+    output = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    _state.update(output=output, queue_size=queue_size,
+                  sampler=SamplingFilter(sample_rates, rate_limit), request_ids=RequestIdFilter())
+    _start()
+    atexit.register(shutdown)
+
+
+def _start():
+    root = logging.getLogger()
+    old = _state.get('handler')
+    if old is not None:
+        root.removeHandler(old)
+
+    handler = DroppingQueueHandler(queue.Queue(_state['queue_size']))
+    handler.addFilter(_state['request_ids'])
+    handler.addFilter(_state['sampler'])
+    listener = logging.handlers.QueueListener(handler.queue, _state['output'], respect_handler_level=True)
+    listener.start()
+    root.addHandler(handler)
+    _state.update(handler=handler, listener=listener)
+
+
+def after_fork():
+    """Give a forked worker its own queue and listener thread"""
+    if 'handler' in _state:
+        _state['sampler']._lock = threading.Lock()
+        _start()
+
+
+def shutdown():
+    """Flush queued records and stop the listener thread"""
+    listener = _state.get('listener')
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+def stats():
+    handler = _state.get('handler')
+    sampler = _state.get('sampler')
+    return {
+        'queued': handler.queue.qsize() if handler else 0,
+        'dropped_queue_full': handler.dropped if handler else 0,
+        'dropped_sampled': sampler.dropped if sampler else 0,
+    }
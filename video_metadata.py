@@ -0,0 +1,349 @@
+"""
+Video metadata and poster pipeline
+Finds reels whose metadata is missing or was extracted from an older
+version of the file (ETag changed), then probes duration, resolution,
+bitrate and size with ffprobe and grabs a small JPEG poster frame with
+ffmpeg, spread over a process pool. Results are stored on the `reels` row.
+Errors about the media itself are final for that version of the file;
+others (timeouts, network errors, failed poster uploads, crashed workers)
+are retried with exponential backoff up to --max-attempts.
+Posters for local reels go to static/posters; posters for S3 reels are
+uploaded under S3_POSTERS_FOLDER in the same bucket.
+
+Requires ffmpeg and ffprobe on PATH. S3 videos are read through presigned
+URLs, so ffprobe and ffmpeg only fetch the byte ranges they need.
+
+Run once:          python video_metadata.py --source s3
+Run continuously:  python video_metadata.py --source s3 --interval 300
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from s3_listing import split_key
+
+logger = logging.getLogger(__name__)
+
+PENDING_QUERY = """
+    SELECT id, object_key, filename, etag, metadata_attempts FROM reels
+    WHERE source = %s AND deleted_at IS NULL
+      AND (metadata_etag IS NULL OR metadata_etag <> etag)
+      AND (metadata_retry_after IS NULL OR metadata_retry_after <= NOW())
+    ORDER BY id
+    LIMIT %s
+"""
+
+# Guarded by etag so a result for a file that changed mid-run is not stored.
+# A NULL metadata_etag keeps the row pending, and a NULL delay clears metadata_retry_after.
+UPDATE_QUERY = """
+    UPDATE reels SET
+        duration_seconds = %s,
+        width = %s,
+        height = %s,
+        bitrate = %s,
+        size_bytes = COALESCE(%s, size_bytes),
+        poster_key = COALESCE(%s, poster_key),
+        metadata_etag = COALESCE(%s, metadata_etag),
+        metadata_error = %s,
+        metadata_attempts = %s,
+        metadata_retry_after = NOW() + INTERVAL %s SECOND
+    WHERE id = %s AND etag = %s
+"""
+
+POSTER_WIDTH = 480
+
+# ffmpeg/ffprobe errors about reaching the input rather than the media itself
+TRANSIENT_ERRORS = (
+    'Server returned', 'Connection refused', 'Connection reset', 'Connection timed out',
+    'Failed to resolve', 'Network is unreachable', 'Input/output error', 'No such file or directory',
+)
+
+
+def probe(source, timeout=60):
+    """Duration, resolution, bitrate, size and audio presence of a video file or URL, via ffprobe"""
+    output = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', source],
+        capture_output=True, check=True, timeout=timeout
+    ).stdout
+    info = json.loads(output)
+    fmt = info.get('format', {})
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+
+    def number(value, cast):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        'duration': number(fmt.get('duration') or video.get('duration'), float),
+        'width': number(video.get('width'), int),
+        'height': number(video.get('height'), int),
+        'bitrate': number(fmt.get('bit_rate') or video.get('bit_rate'), int),
+        'size': number(fmt.get('size'), int),
+        'has_audio': any(s.get('codec_type') == 'audio' for s in streams),
+    }
+
+
+def extract_poster(source, dest, at=1.0, width=POSTER_WIDTH, timeout=60):
+    """Write one frame, scaled to ``width`` pixels wide, as a JPEG"""
+    subprocess.run(
+        ['ffmpeg', '-v', 'error', '-y', '-ss', f'{at:.3f}', '-i', source,
+         '-frames:v', '1', '-vf', f'scale={width}:-2', '-q:v', '5', dest],
+        capture_output=True, check=True, timeout=timeout
+    )
+
+
+def process_video(job):
+    """Probe one video and extract its poster (runs in a pool worker)
+
+    ``permanent`` is set for errors about the media itself, which retrying
+    cannot fix.
+    """
+    try:
+        metadata = probe(job['input'])
+        duration = metadata['duration'] or 0
+        # A frame a little way in is more representative than the first one
+        extract_poster(job['input'], job['poster_path'], at=min(1.0, duration / 2), width=job['poster_width'])
+        return {'id': job['id'], 'metadata': metadata, 'poster_path': job['poster_path'], 'error': None,
+                'permanent': False}
+    except subprocess.CalledProcessError as e:
+        stderr = (e.stderr or b'').decode(errors='replace')
+        error = stderr.strip().splitlines()
+        return {'id': job['id'], 'metadata': None, 'poster_path': None,
+                'error': (error[-1] if error else str(e))[:255],
+                'permanent': not any(marker in stderr for marker in TRANSIENT_ERRORS)}
+    except Exception as e:
+        return {'id': job['id'], 'metadata': None, 'poster_path': None, 'error': str(e)[:255],
+                'permanent': False}
+
+
+def poster_name(row):
+    """Poster filename, versioned by the video's ETag"""
+    stem = os.path.splitext(os.path.basename(row['object_key']))[0]
+    return f"{stem}-{(row['etag'] or 'none')[:12]}.jpg"
+
+
+class MetadataPipeline:
+    """Extracts metadata and posters for one source's pending reels.
+
+    ``resolve_input(row)`` returns the path or URL ffprobe should read, and
+    ``store_poster(row, path)`` moves a finished poster to its final home,
+    returning the ``poster_key`` to record. Errors about the media are
+    recorded in ``metadata_error`` against the current ETag, so they are not
+    retried until the file changes. Other failures are retried after
+    ``retry_delay`` seconds, doubling after each attempt; after
+    ``max_attempts`` they are recorded the same way.
+    """
+
+    def __init__(self, connect, source, resolve_input, store_poster,
+                 workers=None, batch_size=200, poster_width=POSTER_WIDTH, max_attempts=3, retry_delay=60):
+        self._connect = connect
+        self.source = source
+        self._resolve_input = resolve_input
+        self._store_poster = store_poster
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.poster_width = poster_width
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def pending(self, limit):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(PENDING_QUERY, (self.source, limit))
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+        finally:
+            conn.close()
+
+    def run_once(self, limit=1000):
+        """Process up to ``limit`` pending reels and return a summary"""
+        started = time.monotonic()
+        rows = {row['id']: row for row in self.pending(limit)}
+        processed = failed = retried = 0
+        if not rows:
+            return {'source': self.source, 'pending': 0, 'processed': 0, 'failed': 0, 'retried': 0,
+                    'duration': time.monotonic() - started}
+
+        workdir = tempfile.mkdtemp(prefix='reel-posters-')
+        updates = []
+        try:
+            # spawn, not fork: the parent has the app's threads and sockets
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(rows)), mp_context=context) as pool:
+                futures = {
+                    pool.submit(process_video, {
+                        'id': row['id'],
+                        'input': self._resolve_input(row),
+                        'poster_path': os.path.join(workdir, f"{row['id']}.jpg"),
+                        'poster_width': self.poster_width,
+                    }): row
+                    for row in rows.values()
+                }
+                for future in as_completed(futures):
+                    row = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # A crashed worker (BrokenProcessPool) fails every job still queued; that
+                        # says nothing about the file, so it is retried like any transient error
+                        result = {'id': row['id'], 'metadata': None, 'error': f'Worker failed: {e!r}'[:255],
+                                  'permanent': False}
+                    metadata = result['metadata'] or {}
+                    poster_key = None
+                    if result['error'] is None:
+                        try:
+                            poster_key = self._store_poster(row, result['poster_path'])
+                        except Exception as e:
+                            result['error'] = f'Poster upload failed: {e}'[:255]
+
+                    metadata_etag, attempts, delay = row['etag'], 0, None
+                    if result['error'] is None:
+                        processed += 1
+                    elif result['permanent']:
+                        failed += 1
+                        logger.warning("Metadata extraction failed for %s: %s", row['object_key'], result['error'],
+                                       extra={'event': 'metadata_error'})
+                    elif row['metadata_attempts'] + 1 >= self.max_attempts:
+                        failed += 1
+                        logger.error("Metadata extraction failed for %s after %d attempts: %s", row['object_key'],
+                                     row['metadata_attempts'] + 1, result['error'], extra={'event': 'metadata_error'})
+                    else:
+                        # Exponential backoff: retry_delay, 2x, 4x, ...
+                        attempts = row['metadata_attempts'] + 1
+                        delay = self.retry_delay * 2 ** (attempts - 1)
+                        metadata_etag = None
+                        retried += 1
+                        logger.warning("Metadata extraction failed for %s (attempt %d), retrying in %ds: %s",
+                                       row['object_key'], attempts, delay, result['error'],
+                                       extra={'event': 'metadata_error'})
+                    updates.append((
+                        metadata.get('duration'),
+                        metadata.get('width'),
+                        metadata.get('height'),
+                        metadata.get('bitrate'),
+                        metadata.get('size'),
+                        poster_key,
+                        metadata_etag,
+                        result['error'],
+                        attempts,
+                        delay,
+                        row['id'],
+                        row['etag'],
+                    ))
+                    if len(updates) >= self.batch_size:
+                        self._apply(updates)
+                        updates = []
+        finally:
+            try:
+                # Whatever was extracted before an error is still written
+                if updates:
+                    self._apply(updates)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        return {
+            'source': self.source,
+            'pending': len(rows),
+            'processed': processed,
+            'failed': failed,
+            'retried': retried,
+            'duration': time.monotonic() - started,
+        }
+
+    def _apply(self, updates):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(UPDATE_QUERY, updates)
+            conn.commit()
+            cursor.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract video metadata and posters into the reels table')
+    parser.add_argument('--source', choices=['s3', 'local'], default='s3')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--limit', type=int, default=1000, help='Reels to process per run')
+    parser.add_argument('--interval', type=int, default=0,
+                        help='Seconds between runs; 0 runs once and exits')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='Attempts per reel for errors that are not about the media itself')
+    parser.add_argument('--retry-delay', type=int, default=60, help='Seconds before the first retry, doubling after')
+    args = parser.parse_args()
+
+    if not shutil.which('ffprobe') or not shutil.which('ffmpeg'):
+        parser.error('ffmpeg and ffprobe must be installed and on PATH')
+
+    # Imported here so spawned pool workers, which only need process_video, stay light
+    import app
+
+    if args.source == 's3':
+        s3_client = app.get_s3_client()
+        if not s3_client:
+            parser.error('S3 is not configured (set S3_BUCKET_NAME and AWS credentials)')
+        bucket = app.S3_CONFIG['bucket_name']
+        posters_prefix = app.S3_CONFIG['posters_prefix'].rstrip('/') + '/'
+
+        def resolve_input(row):
+            # Reels from other S3_SOURCES buckets have s3://bucket/key object keys
+            source_bucket, key = split_key(row['object_key'], bucket)
+            return s3_client.generate_presigned_url(
+                'get_object', Params={'Bucket': source_bucket, 'Key': key}, ExpiresIn=3600
+            )
+
+        def store_poster(row, path):
+            key = posters_prefix + poster_name(row)
+            s3_client.upload_file(path, bucket, key, ExtraArgs={
+                'ContentType': 'image/jpeg',
+                'CacheControl': 'public, max-age=31536000, immutable'
+            })
+            return key
+
+        source = 'S3'
+    else:
+        reels_dir = os.path.join(app.app.static_folder, 'reels')
+        posters_dir = os.path.join(app.app.static_folder, 'posters')
+        os.makedirs(posters_dir, exist_ok=True)
+
+        def resolve_input(row):
+            return os.path.join(reels_dir, row['object_key'])
+
+        def store_poster(row, path):
+            name = poster_name(row)
+            shutil.move(path, os.path.join(posters_dir, name))
+            return name
+
+        source = 'local'
+
+    pipeline = MetadataPipeline(app.get_db_connection, source, resolve_input, store_poster, workers=args.workers,
+                                max_attempts=args.max_attempts, retry_delay=args.retry_delay)
+    while True:
+        result = pipeline.run_once(args.limit)
+        print(
+            f"Processed {result['processed']} of {result['pending']} pending {result['source']} reels "
+            f"in {result['duration']:.2f}s ({result['failed']} failed, {result['retried']} to retry)"
+        )
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Reel view tracking
+Write-behind buffer for per-reel view counts. View events are aggregated in
+memory and flushed to the `reel_views` table as batched multi-row
+INSERT ... ON DUPLICATE KEY UPDATE statements, either when enough events
+are pending or when the flush interval elapses, and once more on shutdown.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from db_routing import is_connection_error
+
+logger = logging.getLogger(__name__)
+
+FLUSH_QUERY = """
+    INSERT INTO reel_views (reel_id, views, last_viewed_at)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        views = views + VALUES(views),
+        last_viewed_at = GREATEST(COALESCE(last_viewed_at, VALUES(last_viewed_at)), VALUES(last_viewed_at))
+"""
+
+
+class ViewBuffer:
+    """Aggregates view events per reel and persists them in batches.
+
+    ``connection`` is a zero-argument callable returning a context manager
+    that yields a DB connection (e.g. ``db_pool.connection``).
+    """
+
+    def __init__(self, connection, max_pending=1000, flush_interval=5.0, batch_size=500):
+        self._connection = connection
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}       # reel_id -> [views, last_viewed_at]
+        self._pending_events = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            'recorded': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'dropped': 0,            # views in rows MySQL rejected
+            'last_flush_duration': 0.0,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='view-flush', daemon=True)
+            self._thread.start()
+
+    def record(self, reel_id, views=1):
+        """Count a view; never blocks on the database"""
+        now = datetime.now()
+        with self._lock:
+            entry = self._pending.get(reel_id)
+            if entry is None:
+                self._pending[reel_id] = [views, now]
+            else:
+                entry[0] += views
+                entry[1] = now
+            self._pending_events += views
+            self._stats['recorded'] += views
+            full = self._pending_events >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every pending count to the database"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, {}
+                self._pending_events = 0
+
+            started = time.monotonic()
+            rows = [(reel_id, views, last_viewed_at) for reel_id, (views, last_viewed_at) in pending.items()]
+            rejected = []
+            try:
+                with self._connection() as conn:
+                    with conn.cursor() as cursor:
+                        for start in range(0, len(rows), self.batch_size):
+                            batch = rows[start:start + self.batch_size]
+                            try:
+                                cursor.executemany(FLUSH_QUERY, batch)
+                            except Exception as e:
+                                if is_connection_error(e):
+                                    raise
+                                # One bad row fails the whole statement: write the batch row by
+                                # row and drop the rows MySQL rejects instead of retrying them forever
+                                rejected.extend(self._write_rows(cursor, batch))
+                    conn.commit()
+            except Exception as e:
+                # Put the counts back so they go out with the next flush
+                with self._lock:
+                    for reel_id, (views, last_viewed_at) in pending.items():
+                        entry = self._pending.setdefault(reel_id, [0, last_viewed_at])
+                        entry[0] += views
+                        entry[1] = max(entry[1], last_viewed_at)
+                        self._pending_events += views
+                    self._stats['flush_errors'] += 1
+                logger.error("Error flushing reel views: %s", e)
+                return 0
+
+            dropped = sum(row[1] for row in rejected)
+            flushed = sum(row[1] for row in rows) - dropped
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['flushed'] += flushed
+                self._stats['dropped'] += dropped
+                self._stats['last_flush_duration'] = time.monotonic() - started
+            return flushed
+
+    @staticmethod
+    def _write_rows(cursor, rows):
+        """Write rows one at a time; returns the rows MySQL rejected"""
+        rejected = []
+        for row in rows:
+            try:
+                cursor.execute(FLUSH_QUERY, row)
+            except Exception as e:
+                if is_connection_error(e):
+                    raise
+                rejected.append(row)
+                logger.error("Dropping %s views of reel %s: %s", row[1], row[0], e,
+                             extra={'event': 'views_dropped'})
+        return rejected
+
+    def close(self):
+        """Stop the flush thread and write out whatever is still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def after_fork(self):
+        """Start afresh in a forked child: the parent keeps its own pending counts"""
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._pending_events = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.start()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['pending_reels'] = len(self._pending)
+            snapshot['pending_events'] = self._pending_events
+        return snapshot
@@ -0,0 +1,108 @@
+"""
+Startup warm-up and readiness
+Runs a fixed list of warm-up steps (SDK import and client construction,
+catalog listing, URL signing) once per process, ahead of the first
+request, and tracks whether they have finished. The readiness endpoint
+reports ready only after that, so a load balancer or container health
+check does not send traffic to a process that would still pay for a cold
+listing on its first feed request.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """Runs ``steps`` (a list of ``(name, func)`` pairs) once and records the outcome.
+
+    A step that raises is logged and recorded, and the remaining steps
+    still run: a cold cache makes the first requests slower, not wrong, so
+    a failed step does not keep the process unready forever. ``run()`` is
+    idempotent and callers arriving while it runs wait for the same run.
+    """
+
+    def __init__(self, steps, name='warmup'):
+        self.steps = list(steps)
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._running = False
+        self._started_at = None  # time.time() when the run started
+        self._duration = None
+        self._results = []
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def run(self):
+        """Run every step (once per process) and return the step results"""
+        with self._lock:
+            leader = not self._running and not self._done.is_set()
+            if leader:
+                self._running = True
+                self._started_at = time.time()
+        if not leader:
+            self._done.wait()
+            return list(self._results)
+
+        started = time.perf_counter()
+        results = []
+        for name, func in self.steps:
+            step_started = time.perf_counter()
+            try:
+                result, error = func(), None
+            except Exception as e:
+                result, error = None, str(e)
+                logger.exception("Warm-up step %s failed", name, extra={'event': 'warmup_error', 'step': name})
+            results.append({
+                'name': name,
+                'duration': time.perf_counter() - step_started,
+                'result': result,
+                'error': error,
+            })
+
+        with self._lock:
+            self._results = results
+            self._duration = time.perf_counter() - started
+            self._running = False
+            self._done.set()
+        logger.info("Warm-up finished in %.3fs", self._duration,
+                    extra={'event': 'warmup', 'duration_ms': round(self._duration * 1000, 2)})
+        return list(results)
+
+    def start(self):
+        """Run the steps on a background thread unless a run has already started"""
+        with self._lock:
+            if self._running or self._done.is_set():
+                return
+        threading.Thread(target=self.run, name=f'{self.name}-run', daemon=True).start()
+
+    def wait(self, timeout=None):
+        """Block until the steps have run; returns whether they have"""
+        return self._done.wait(timeout)
+
+    def after_fork(self):
+        """A run interrupted by fork() cannot finish in the child: start over there"""
+        self._lock = threading.Lock()
+        if not self._done.is_set():
+            self._done = threading.Event()
+            self._running = False
+
+    def stats(self):
+        with self._lock:
+            if self._done.is_set():
+                state = 'ready'
+            elif self._running:
+                state = 'running'
+            else:
+                state = 'pending'
+            return {
+                'state': state,
+                'started_at': self._started_at,
+                'duration': self._duration,
+                'steps': list(self._results),
+            }